@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from review.models import Review, ReviewTopic, Category, Comment
+from review.slugs import bulk_create_with_unique_slugs
+from users.models import Profile
+
+
+@dataclass
+class BudgetSeed:
+    """The objects whose URLs are requested by the query budget tests."""
+    user: object
+    admin: object
+    category: Category
+    review: Review
+    topic: ReviewTopic
+
+
+def seed_budget_data(size: int) -> BudgetSeed:
+    """
+    Creates `size` users, categories, published and archived reviews,
+    and `size` comments, likes and topics on the first review.
+    All reviews belong to the first category.
+    """
+    User = get_user_model()
+    # Without a password, so that no time is spent hashing it.
+    user = User.objects.create_user(
+        username='budget-user', email='user@example.com')
+    admin = User.objects.create_superuser(
+        username='budget-admin', email='admin@example.com')
+
+    authors = User.objects.bulk_create([
+        User(username=f'budget-author-{i}') for i in range(size)])
+    Profile.objects.bulk_create([
+        Profile(user=profile_user)
+        for profile_user in [user, admin, *authors]])
+
+    categories = Category.objects.bulk_create([
+        Category(name=f'Budget category {i}', slug=f'budget-category-{i}')
+        for i in range(size)])
+    category = categories[0]
+
+    reviews = [
+        Review(
+            title=f'Budget review {i}', description='Seeded review',
+            category=category, author=authors[i % size],
+            is_published=i % 2 == 0)
+        for i in range(size * 2)
+    ]
+    bulk_create_with_unique_slugs(
+        Review, reviews, [review.title for review in reviews])
+    review = reviews[0]
+
+    Comment.objects.bulk_create([
+        Comment(review=review, author=authors[i], text=f'Comment {i}')
+        for i in range(size)])
+    review.likes.add(*authors)
+    topics = ReviewTopic.objects.bulk_create([
+        ReviewTopic(
+            review=review, review_topic_title=f'Topic {i}',
+            text_content='Seeded topic', slug=f'budget-topic-{i}')
+        for i in range(size)])
+
+    return BudgetSeed(user, admin, category, review, topics[0])
+
+
+@pytest.fixture
+def measure_queries(client):
+    """
+    Returns a function which seeds data of the given size, requests the
+    endpoint of a budget with a cold Django cache and returns the response and
+    the captured queries. The seeded rows are rolled back afterwards.
+    """
+    def measure(name, budget, size):
+        with transaction.atomic():
+            seed = seed_budget_data(size)
+            if budget.user:
+                client.force_login(
+                    seed.admin if budget.user == 'admin' else seed.user)
+            url = reverse(
+                name, kwargs=budget.kwargs(seed) if budget.kwargs else None)
+            if budget.method == 'get':
+                # Warms the per-process caches, e.g. of content types and
+                # sites, which are not part of a request's cost.
+                client.get(url, budget.data)
+            cache.clear()
+
+            extra = {'content_type': budget.content_type} \
+                if budget.content_type else {}
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, budget.method)(
+                    url, budget.data, **extra)
+            client.logout()
+            transaction.set_rollback(True)
+        return response, queries
+
+    return measure
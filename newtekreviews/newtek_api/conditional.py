@@ -0,0 +1,120 @@
+import hashlib
+
+from django.db.models import prefetch_related_objects
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from review.caching import get_generation, get_review_version, get_version
+from review.renditions import RENDITIONS_VERSION_KEY
+
+
+def _version_time(version) -> int:
+    """Converts a nanosecond version number to a Unix timestamp."""
+    return int(version) // 10 ** 9
+
+
+class ConditionalGetMixin:
+    """
+    Answers conditional `list` and `retrieve` requests of a viewset
+    with 304 Not Modified before the queryset is evaluated or
+    serialized.
+
+    The validators come from the cached versions maintained by the
+    signals of the `review` app, so checking them costs no query for a
+    list and a single indexed lookup for an object:
+
+    - a list is validated by the generation of `conditional_models`,
+    - an object by `get_object_validators()`, which defaults to the
+      generation as well.
+
+    Responses rendered by the browsable API contain the current user
+    and are never answered conditionally.
+    """
+    conditional_models = ()
+    # Whether the representation exposes image renditions, which appear
+    # after the object was saved.
+    conditional_renditions = False
+
+    def get_list_validators(self):
+        """Returns the version parts and the last modification time."""
+        versions = get_generation(*self.conditional_models).split('-')
+        if self.conditional_renditions:
+            versions.append(str(get_version(RENDITIONS_VERSION_KEY)))
+        return versions, max(_version_time(version) for version in versions)
+
+    def get_object_validators(self):
+        """
+        Returns the version parts and the last modification time of the
+        requested object, or None to skip the conditional check.
+        """
+        return self.get_list_validators()
+
+    def conditional_response(self, request, validators, respond):
+        if validators is None or request.accepted_renderer.format == 'api':
+            return respond()
+
+        versions, last_modified = validators
+        digest = hashlib.md5(
+            ':'.join([
+                *map(str, versions), request.accepted_media_type,
+                request.get_full_path()]).encode(),
+            usedforsecurity=False).hexdigest()
+        etag = quote_etag(digest)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = respond()
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            response.headers['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.get_list_validators(),
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.get_object_validators(),
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs))
+
+
+class ReviewConditionalGetMixin(ConditionalGetMixin):
+    """
+    Validates a review by its own version, which changes when the
+    review, one of its topics, comments or likes changes, and by its
+    `time_updated`.
+
+    The review row read for the check is reused by a 200 response, so
+    only the relations prefetched by the queryset are left to load.
+    """
+    conditional_renditions = True
+
+    def get_object_validators(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        self.conditional_prefetch = queryset._prefetch_related_lookups
+        try:
+            self.conditional_object = queryset.prefetch_related(None).get(**{
+                self.lookup_field: self.kwargs[self.lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            return None
+
+        review = self.conditional_object
+        versions = [
+            get_review_version(review.pk),
+            get_version(RENDITIONS_VERSION_KEY)]
+        return versions, max(
+            int(review.time_updated.timestamp()),
+            *(_version_time(version) for version in versions))
+
+    def get_object(self):
+        review = getattr(self, 'conditional_object', None)
+        if review is None:
+            return super().get_object()
+        self.check_object_permissions(self.request, review)
+        prefetch_related_objects([review], *self.conditional_prefetch)
+        return review
@@ -1,13 +1,21 @@
 import io
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
 from django.utils.text import slugify
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.renderers import JSONRenderer
 from rest_framework.parsers import JSONParser
 
+from review.caching import bump_generation, bump_review_version
+from review.counters import refresh_category_counts
 from review.models import Review, ReviewTopic, Category
-from .utils import create_slug
+from review.renditions import RENDITION_WIDTHS, get_renditions
+from review.search import deferred_indexing, index_reviews
+from review.sitemaps import invalidate_review_sitemap
+from review.slugs import bulk_create_with_unique_slugs
 
 
 # class ReviewSerializer(serializers.Serializer):
@@ -36,6 +44,10 @@ from .utils import create_slug
 #         return instance
 
 
+# The fields of an existing topic a nested write can change.
+TOPIC_UPDATE_FIELDS = ('review_topic_title', 'text_content')
+
+
 class ReviewTopicSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReviewTopic
@@ -47,15 +59,114 @@ class ReviewTopicSerializer(serializers.ModelSerializer):
         ]
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class NestedReviewTopicSerializer(ReviewTopicSerializer):
+    """
+    A topic nested in a review. The slug may be sent back to update
+    an existing topic of the review; topics without a known slug are
+    created.
+    """
+    slug = serializers.SlugField(max_length=255, required=False)
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """
+    Exposes the renditions of an image field as `srcset` strings by
+    format, e.g. {"webp": "https://.../photo.jpg-320w.webp 320w, ...",
+    "jpeg": "..."}, or null while they are not generated yet.
+    """
+
+    def __init__(self, image_field: str, **kwargs):
+        kwargs['source'] = image_field
+        super().__init__(**kwargs)
+
+    def to_representation(self, fieldfile):
+        renditions = get_renditions(
+            fieldfile, RENDITION_WIDTHS[fieldfile.field.name])
+        if not renditions:
+            return None
+        request = self.context.get('request')
+        return {
+            fmt: ', '.join(
+                f'{request.build_absolute_uri(url) if request else url} '
+                f'{width}w'
+                for width, url in items)
+            for fmt, items in renditions.items()
+        }
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients of a read choose the fields of the representation with
+    `?fields=title,slug`. The fields in `expandable_fields`, typically
+    nested relations, are left out unless requested with
+    `?expand=topics` or named in `fields`. Unknown names are ignored.
+
+    Writes always use every field.
+    """
+    expandable_fields = ()
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        selected = self.get_selected_fields(request.query_params)
+        for name in set(self.fields) - set(selected):
+            self.fields.pop(name)
+
+    @classmethod
+    def get_query_names(cls, params, name: str) -> list:
+        return [
+            value.strip()
+            for values in params.getlist(name)
+            for value in values.split(',') if value.strip()]
+
+    @classmethod
+    def get_selected_fields(cls, params) -> list:
+        """Returns the names of the fields requested by `params`."""
+        declared = list(cls.Meta.fields)
+        requested = cls.get_query_names(params, cls.fields_query_param)
+        expanded = cls.get_query_names(params, cls.expand_query_param)
+        if requested:
+            selected = [name for name in declared if name in requested]
+        else:
+            selected = [
+                name for name in declared
+                if name not in cls.expandable_fields]
+        return selected + [
+            name for name in cls.expandable_fields
+            if name in expanded and name not in selected]
+
+    @classmethod
+    def get_model_columns(cls, selected) -> list:
+        """
+        Returns the names of the concrete model fields read by the
+        `selected` serializer fields, for `QuerySet.only()`.
+        """
+        fields = cls().fields
+        model_fields = {
+            field.name for field in cls.Meta.model._meta.concrete_fields}
+        columns = []
+        for name in selected:
+            source = fields[name].source.split('.')[0]
+            if source in model_fields and source not in columns:
+                columns.append(source)
+        return columns
+
+
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    expandable_fields = ('topics',)
     author = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    topics = ReviewTopicSerializer(many=True, required=False)
+    topics = NestedReviewTopicSerializer(many=True, required=False)
+    main_image_renditions = RenditionsField('main_image')
 
     class Meta:
         model = Review
         fields = [
-            'title', 'slug', 'description', 'main_image', 'time_created',
-            'time_updated',
+            'title', 'slug', 'description', 'main_image',
+            'main_image_renditions', 'time_created', 'time_updated',
             'is_published', 'author', 'category', 'topics'
         ]
         read_only_fields = [
@@ -73,21 +184,18 @@ class ReviewSerializer(serializers.ModelSerializer):
           'category', and 'topics'. The 'topics' field should be a list of dictionaries, each containing
           'review_topic_title' and 'text_content'.
 
+        The review and its topics are written in a single transaction, and
+        the topics are inserted with one bulk query.
+
         Returns:
           Review: The newly created Review instance with associated ReviewTopic instances.
         """
-        topics_data = validated_data.pop('topics')
-        review = Review.objects.create(**validated_data)
+        topics_data = validated_data.pop('topics', [])
 
-        if topics_data:
-            for topic_data in topics_data:
-                slug = create_slug(
-                    review.title, topic_data['review_topic_title'])
-                review_topic = ReviewTopic.objects.create(
-                    review=review, slug=slug,
-                    **topic_data)
-                review_topic.save()
-            review.save()
+        with transaction.atomic(), deferred_indexing():
+            review = Review.objects.create(**validated_data)
+            if topics_data:
+                self.write_topics(review, topics_data, existing_topics=[])
 
         return review
 
@@ -101,40 +209,209 @@ class ReviewSerializer(serializers.ModelSerializer):
         - validated_data (dict): The validated data containing the updated
           fields for the Review instance.
 
+        When `topics` is submitted, it replaces the topics of the review:
+        topics with a known slug are updated, the others are created, and
+        existing topics missing from the payload are deleted, each with
+        one bulk query in a single transaction.
+
         Returns:
           Review: The updated Review instance with associated ReviewTopic instances.
         """
+        topics_data = validated_data.pop('topics', None)
 
-        topics_data = validated_data.pop('topics')
-        instance = super().update(instance, validated_data)
+        with transaction.atomic(), deferred_indexing():
+            instance = super().update(instance, validated_data)
+            if topics_data is not None:
+                self.write_topics(
+                    instance, topics_data,
+                    existing_topics=instance.topics.all())
 
-        associated_topics = {
-            topic.slug: topic for topic in instance.topics.all()}
-        updated_topic_slugs = []
+        return instance
 
-        for topic_data in topics_data:
-            topic_slug = topic_data.get('slug')
-            if topic_slug and topic_slug in associated_topics:
-                review_topic = associated_topics[topic_slug]
-                review_topic.review_topic_title = topic_data['review_topic_title']
-                review_topic.save()
-                updated_topic_slugs.append(topic_slug)
+    def write_topics(self, review: Review, topics_data: list,
+                     existing_topics) -> None:
+        """
+        Diffs the submitted topics against `existing_topics` and applies
+        the difference with bulk_update, bulk_create and a bulk delete.
+        """
+        self.write_many_topics([(review, topics_data, existing_topics)])
 
+    @staticmethod
+    def write_many_topics(writes) -> None:
+        """
+        Applies `write_topics` to several reviews at once, given as
+        (review, topics_data, existing_topics) triples, with one query
+        per kind of write for all of them.
+        """
+        to_update, to_create, to_delete = {}, [], []
+        changed_review_ids = set()
+
+        for review, topics_data, existing_topics in writes:
+            existing = {topic.slug: topic for topic in existing_topics}
+            updated_slugs = set()
+            for topic_data in topics_data:
+                topic = existing.get(topic_data.get('slug'))
+                if topic is None:
+                    topic_data = {
+                        name: value for name, value in topic_data.items()
+                        if name != 'slug'}
+                    to_create.append(ReviewTopic(review=review, **topic_data))
+                else:
+                    # Partial updates may leave fields out.
+                    for field in TOPIC_UPDATE_FIELDS:
+                        setattr(topic, field, topic_data.get(
+                            field, getattr(topic, field)))
+                    to_update[topic.pk] = topic
+                    updated_slugs.add(topic.slug)
+                changed_review_ids.add(review.pk)
+
+            to_delete.extend(
+                topic.pk for slug, topic in existing.items()
+                if slug not in updated_slugs)
+
+        if to_update:
+            ReviewTopic.objects.bulk_update(
+                to_update.values(), TOPIC_UPDATE_FIELDS)
+        if to_create:
+            bulk_create_with_unique_slugs(
+                ReviewTopic, to_create,
+                [topic.get_slug_text() for topic in to_create])
+        if to_delete:
+            ReviewTopic.objects.filter(pk__in=to_delete).delete()
+
+        if changed_review_ids:
+            # bulk_create() and bulk_update() do not send post_save
+            bump_generation(ReviewTopic)
+            for review_id in changed_review_ids:
+                bump_review_version(review_id)
+            index_reviews(changed_review_ids)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    A PrimaryKeyRelatedField whose objects can be resolved for a whole
+    list at once: when `objects` is set to a {pk: object} dict, values
+    are looked up in it instead of querying once per item.
+    """
+    objects = None
+
+    def to_internal_value(self, data):
+        if self.objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkReviewListSerializer(serializers.ListSerializer):
+    """
+    Creates or updates a list of reviews with their topics.
+
+    An item whose `slug` names an existing review updates it, keeping
+    its author, and replaces its topics when `topics` is sent. Any
+    other item creates a review, under the sent slug when it is free.
+    The items are validated together, the categories are resolved with
+    one query, and everything is written in one transaction with
+    batched inserts and updates.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            field = self.child.fields['category']
+            pks = set()
+            for item in data:
+                if isinstance(item, dict):
+                    try:
+                        pks.add(int(item.get('category')))
+                    except (TypeError, ValueError):
+                        pass
+            field.objects = field.get_queryset().in_bulk(pks)
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        slugs = [item['slug'] for item in attrs if item.get('slug')]
+        if len(slugs) != len(set(slugs)):
+            raise serializers.ValidationError(
+                'Each slug may only appear once.')
+        return attrs
+
+    def create(self, validated_data: list) -> list:
+        existing = Review.objects.filter(slug__in=[
+            item['slug'] for item in validated_data if item.get('slug')
+        ]).prefetch_related('topics').in_bulk(field_name='slug')
+
+        reviews, created, updated, topic_writes = [], [], [], []
+        updated_fields, category_ids = {'time_updated'}, set()
+        now = timezone.now()
+        for item in validated_data:
+            item = dict(item)
+            topics_data = item.pop('topics', None)
+            slug = item.pop('slug', None)
+            review = existing.get(slug)
+            if review is None:
+                review = Review(**item)
+                created.append((review, slug or review.title))
+                topic_writes.append((review, topics_data or [], []))
             else:
-                slug = create_slug(instance.title, topic_data['review_topic_title'])
-                review_topic = ReviewTopic.objects.create(
-                    review=instance, slug=slug, **topic_data)
-                review_topic.save()
-                updated_topic_slugs.append(review_topic.slug)
+                item.pop('author', None)
+                category_ids.add(review.category_id)
+                for name, value in item.items():
+                    setattr(review, name, value)
+                review.time_updated = now
+                updated_fields.update(item)
+                updated.append(review)
+                if topics_data is not None:
+                    topic_writes.append(
+                        (review, topics_data, review.topics.all()))
+            reviews.append(review)
 
-        # for topic_slug, topic in associated_topics.items():
-        #     if topic_slug not in updated_topic_slugs:
-        #         topic.delete()
+        with transaction.atomic(), deferred_indexing():
+            if created:
+                bulk_create_with_unique_slugs(
+                    Review, [review for review, _ in created],
+                    [text for _, text in created])
+            if updated:
+                Review.objects.bulk_update(updated, sorted(updated_fields))
+            self.child.write_many_topics(topic_writes)
 
-        return instance
+            # bulk_create() and bulk_update() do not send post_save
+            review_ids = [review.pk for review in reviews]
+            category_ids.update(review.category_id for review in reviews)
+            refresh_category_counts(category_ids)
+            bump_generation(Review)
+            for review in updated:
+                bump_review_version(review.pk)
+            index_reviews(review_ids)
+        invalidate_review_sitemap(review_ids)
+
+        created_reviews = {id(review) for review, _ in created}
+        self.results = [
+            {'slug': review.slug,
+             'status': 'created' if id(review) in created_reviews
+             else 'updated'}
+            for review in reviews]
+        return reviews
+
+
+class BulkReviewSerializer(ReviewSerializer):
+    """An item of the bulk endpoint of the reviews API."""
+    slug = serializers.SlugField(max_length=255, required=False)
+    category = BulkPrimaryKeyRelatedField(
+        queryset=Category.objects.all(), required=False, allow_null=True)
+
+    class Meta(ReviewSerializer.Meta):
+        read_only_fields = [
+            'time_created', 'time_updated', 'is_published', 'author',
+        ]
+        list_serializer_class = BulkReviewListSerializer
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = [
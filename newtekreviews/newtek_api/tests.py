@@ -1,11 +1,20 @@
+import csv
+import json
+from io import StringIO
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
-from rest_framework.test import APIClient
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from django.urls import reverse
+from mixer.backend.django import mixer
 
-from .serializers import UserSerializer
+from review.models import Review, ReviewTopic, Category
+from .serializers import CategorySerializer, ReviewSerializer, UserSerializer
 
 User = get_user_model()
 
@@ -104,3 +113,396 @@ class CustomAuthTokenViewTestCase(TestCase):
         self.assertEqual(response.data['user']['username'], 'testuser')
         user_serializer = UserSerializer(self.user)
         self.assertEqual(response.data['user'], user_serializer.data)
+
+
+class ReviewAPICursorPaginationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='reader', password='testpass123')
+        self.client.force_authenticate(self.user)
+        mixer.cycle(7).blend(Review)
+        self.url = reverse('newtek_api:review-list')
+
+    def test_cursor_pages(self):
+        response = self.client.get(self.url, {'page_size': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        first = [review['slug'] for review in response.data['results']]
+
+        response = self.client.get(response.data['next'])
+        second = [review['slug'] for review in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+        self.assertEqual(
+            first + second,
+            list(Review.objects.values_list('slug', flat=True)))
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(
+            [review['slug'] for review in response.data['results']], first)
+
+
+class ReviewLikeAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='liker', password='testpass123')
+        self.review = mixer.blend(Review)
+        self.url = reverse(
+            'newtek_api:review-like',
+            kwargs={'review_slug': self.review.slug})
+
+    def test_like_requires_authentication(self):
+        response = self.client.post(self.url)
+        self.assertIn(response.status_code, (
+            status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_like_and_unlike_are_idempotent(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            response = self.client.post(self.url)
+            self.assertEqual(
+                response.data, {'liked': True, 'likes_count': 1})
+        for _ in range(2):
+            response = self.client.delete(self.url)
+            self.assertEqual(
+                response.data, {'liked': False, 'likes_count': 0})
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.likes_count, 0)
+
+
+class ReviewSerializerTopicsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author', password='testpass123')
+        self.request = APIRequestFactory().post('/')
+        self.request.user = self.user
+
+    def make_topics(self, count):
+        return [
+            {'review_topic_title': f'Topic {i}', 'text_content': 'Text'}
+            for i in range(count)
+        ]
+
+    def create_review(self, topics):
+        serializer = ReviewSerializer(
+            data={'title': 'Phone review', 'topics': topics},
+            context={'request': self.request})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_create_costs_constant_queries(self):
+        with CaptureQueriesContext(connection) as few:
+            self.create_review(self.make_topics(2))
+        with CaptureQueriesContext(connection) as many:
+            review = self.create_review(self.make_topics(50))
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(review.topics.count(), 50)
+        self.assertEqual(
+            len(set(review.topics.values_list('slug', flat=True))), 50)
+
+    def test_update_diffs_topics(self):
+        review = self.create_review(self.make_topics(3))
+        kept, dropped, renamed = review.topics.order_by('pk')
+        serializer = ReviewSerializer(
+            review, context={'request': self.request},
+            data={'title': 'Phone review', 'topics': [
+                {'slug': kept.slug,
+                 'review_topic_title': kept.review_topic_title,
+                 'text_content': 'Text'},
+                {'slug': renamed.slug, 'review_topic_title': 'Renamed',
+                 'text_content': 'New text'},
+                {'review_topic_title': 'Added', 'text_content': 'Text'},
+            ]})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        topics = {
+            topic.slug: topic
+            for topic in ReviewTopic.objects.filter(review=review)}
+        self.assertEqual(len(topics), 3)
+        self.assertNotIn(dropped.slug, topics)
+        self.assertEqual(topics[renamed.slug].review_topic_title, 'Renamed')
+        self.assertEqual(topics[renamed.slug].text_content, 'New text')
+        self.assertIn('phone-review-added', topics)
+
+    def test_partial_update_keeps_omitted_topic_fields(self):
+        review = self.create_review(self.make_topics(1))
+        topic = review.topics.get()
+        serializer = ReviewSerializer(
+            review, partial=True, context={'request': self.request},
+            data={'topics': [
+                {'slug': topic.slug, 'text_content': 'New text'}]})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        topic.refresh_from_db()
+        self.assertEqual(topic.review_topic_title, 'Topic 0')
+        self.assertEqual(topic.text_content, 'New text')
+
+    def test_update_without_topics_keeps_them(self):
+        review = self.create_review(self.make_topics(2))
+        serializer = ReviewSerializer(
+            review, data={'title': 'Renamed review'}, partial=True,
+            context={'request': self.request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(review.topics.count(), 2)
+
+
+class ConditionalGetAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.review = mixer.blend(Review, is_published=True)
+        self.topic = mixer.blend(ReviewTopic, review=self.review)
+        self.list_url = reverse('newtek_api:review-list')
+        self.detail_url = reverse(
+            'newtek_api:review-detail',
+            kwargs={'review_slug': self.review.slug})
+
+    def test_unchanged_review_is_not_serialized(self):
+        for url in (self.list_url, self.detail_url,
+                    reverse('newtek_api:category-list')):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('Last-Modified', response.headers)
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+            self.assertEqual(
+                response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response.content, b'')
+            # At most the lookup of the review's slug.
+            self.assertLessEqual(len(queries), 1)
+
+    def test_topic_edit_changes_etag(self):
+        etags = [
+            self.client.get(url).headers['ETag']
+            for url in (self.list_url, self.detail_url)]
+
+        self.topic.review_topic_title = 'Edited topic'
+        self.topic.save()
+
+        for url, etag in zip((self.list_url, self.detail_url), etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_etag_depends_on_query(self):
+        etag = self.client.get(self.list_url).headers['ETag']
+        response = self.client.get(
+            self.list_url, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_review(self):
+        response = self.client.get(reverse(
+            'newtek_api:review-detail', kwargs={'review_slug': 'missing'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response.headers)
+
+
+class SparseFieldsetAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.reviews = mixer.cycle(3).blend(Review, is_published=True)
+        for review in self.reviews:
+            mixer.cycle(2).blend(ReviewTopic, review=review)
+        self.url = reverse('newtek_api:review-list')
+
+    def test_topics_are_opt_in(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertNotIn('topics', response.data['results'][0])
+        self.assertIn('description', response.data['results'][0])
+        self.assertFalse(any(
+            'review_reviewtopic' in query['sql']
+            for query in queries.captured_queries))
+
+        response = self.client.get(self.url, {'expand': 'topics'})
+        self.assertEqual(len(response.data['results'][0]['topics']), 2)
+
+    def test_selected_fields_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.url, {'fields': 'title,slug,unknown'})
+        self.assertEqual(
+            [set(review) for review in response.data['results']],
+            [{'title', 'slug'}] * 3)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"description"', queries[0]['sql'])
+
+    def test_detail_with_expanded_topics(self):
+        response = self.client.get(reverse(
+            'newtek_api:review-detail',
+            kwargs={'review_slug': self.reviews[0].slug}),
+            {'fields': 'slug', 'expand': 'topics'})
+        self.assertEqual(set(response.data), {'slug', 'topics'})
+        self.assertEqual(len(response.data['topics']), 2)
+
+    def test_category_fields(self):
+        mixer.blend('review.Category')
+        response = self.client.get(
+            reverse('newtek_api:category-list'), {'fields': 'name'})
+        self.assertEqual(set(response.data['results'][0]), {'name'})
+
+
+class ValuesListAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        reviews = mixer.cycle(4).blend(Review, is_published=True)
+        for review in reviews[1:]:
+            mixer.cycle(2).blend(ReviewTopic, review=review)
+        Review.objects.filter(pk=reviews[0].pk).update(
+            main_image='review_images/photo.jpg')
+        mixer.cycle(2).blend(Category)
+
+    def test_output_matches_serializer(self):
+        cases = (
+            ('newtek_api:review-list', {'expand': 'topics'},
+             ReviewSerializer, Review.objects.all()),
+            ('newtek_api:review-list', {'fields': 'slug,category'},
+             ReviewSerializer, Review.objects.all()),
+            ('newtek_api:category-list', {},
+             CategorySerializer, Category.objects.all()),
+        )
+        for name, params, serializer_class, queryset in cases:
+            response = self.client.get(
+                reverse(name), {**params, 'page_size': 100})
+            expected = serializer_class(
+                queryset, many=True,
+                context={'request': Request(response.wsgi_request)}).data
+            self.assertEqual(
+                response.json()['results'], [dict(item) for item in expected])
+
+    def test_topics_are_grouped_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('newtek_api:review-list'), {
+                'expand': 'topics', 'page_size': 100})
+        self.assertEqual(len(queries), 2)
+
+
+class ReviewBulkAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpass123')
+        self.client.force_authenticate(self.admin)
+        self.category = mixer.blend(Category)
+        self.review = mixer.blend(
+            Review, title='Existing', is_published=True,
+            category=self.category)
+        self.topic = mixer.blend(
+            ReviewTopic, review=self.review, review_topic_title='Old')
+        self.url = reverse('newtek_api:review-bulk')
+
+    def post(self, items):
+        return self.client.post(self.url, items, format='json')
+
+    def test_create_and_upsert(self):
+        items = [
+            {'slug': self.review.slug, 'title': 'Renamed',
+             'description': 'Updated', 'category': self.category.pk,
+             'topics': [{'slug': self.topic.slug,
+                         'review_topic_title': 'Kept'},
+                        {'review_topic_title': 'Added'}]},
+            *({'title': f'Bulk {i}', 'description': 'New',
+               'category': self.category.pk,
+               'topics': [{'review_topic_title': f'Topic {i}'}]}
+              for i in range(50)),
+            {'slug': 'chosen-slug', 'title': 'Chosen', 'description': 'New'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(items)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(queries), 30)
+
+        results = response.data['results']
+        self.assertEqual(len(results), 52)
+        self.assertEqual(
+            results[0], {'slug': self.review.slug, 'status': 'updated'})
+        self.assertEqual(
+            results[-1], {'slug': 'chosen-slug', 'status': 'created'})
+        self.assertEqual(Review.objects.count(), 52)
+
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.title, 'Renamed')
+        self.assertEqual(
+            sorted(self.review.topics.values_list(
+                'review_topic_title', flat=True)), ['Added', 'Kept'])
+        created = Review.objects.get(slug=results[1]['slug'])
+        self.assertEqual(created.author, self.admin)
+        self.assertEqual(created.topics.count(), 1)
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.published_reviews_count, 51)
+
+    def test_update_only_batch(self):
+        response = self.post([
+            {'slug': self.review.slug, 'title': 'Renamed',
+             'description': 'Updated', 'category': self.category.pk}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['results'],
+            [{'slug': self.review.slug, 'status': 'updated'}])
+        self.assertEqual(Review.objects.count(), 1)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.title, 'Renamed')
+
+    def test_invalid_items_write_nothing(self):
+        response = self.post([
+            {'title': 'Valid', 'description': 'New'},
+            {'title': 'Bad category', 'description': 'New',
+             'category': 999},
+            {'description': 'No title'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('category', response.data[1])
+        self.assertIn('title', response.data[2])
+        self.assertEqual(Review.objects.count(), 1)
+
+    def test_duplicate_slugs_are_rejected(self):
+        response = self.post([
+            {'slug': 'same', 'title': 'One', 'description': 'New'},
+            {'slug': 'same', 'title': 'Two', 'description': 'New'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(
+            User.objects.create_user(username='user', password='x'))
+        response = self.post([{'title': 'New', 'description': 'New'}])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ReviewExportAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(
+            username='admin', password='testpass123'))
+        self.reviews = mixer.cycle(3).blend(
+            Review, title=mixer.sequence('Phone {0}'))
+        mixer.blend(Review, title='Laptop')
+        self.url = reverse('newtek_api:review-export')
+
+    def test_export_is_filtered_and_streamed(self):
+        response = self.client.get(self.url, {'title': 'Phone'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            sorted(json.loads(line)['slug'] for line in lines),
+            sorted(review.slug for review in self.reviews))
+
+    def test_csv_and_unknown_output(self):
+        response = self.client.get(self.url, {'output': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(
+            b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 4)
+
+        response = self.client.get(self.url, {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
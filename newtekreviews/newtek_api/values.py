@@ -0,0 +1,158 @@
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import FileField
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+
+from .serializers import RenditionsField
+
+
+class ValuesSerializer:
+    """
+    Serializes the rows of a `values()` queryset with the readable
+    fields of a ModelSerializer, producing the same output as its
+    `to_representation()` without building model instances.
+
+    The fields are compiled once into (name, column, converter) triples
+    which call the DRF fields' own `to_representation()` on the raw
+    column values, so formats and URLs stay identical. Nested
+    serializers of reverse foreign keys are loaded with one query for
+    the whole page and grouped in one pass.
+
+    Use `compile()`, which returns None when a field has no column
+    equivalent, e.g. a SerializerMethodField; callers then fall back to
+    the serializer.
+    """
+
+    def __init__(self, model, columns, converters, nested):
+        self.model = model
+        self.columns = columns
+        self.converters = converters
+        self.nested = nested
+
+    @classmethod
+    def compile(cls, serializer):
+        model = serializer.Meta.model
+        concrete = {field.name: field for field in model._meta.concrete_fields}
+        pk_name = model._meta.pk.attname
+        columns, converters, nested = [pk_name], [], []
+
+        for field in serializer._readable_fields:
+            source = field.source
+            if isinstance(field, serializers.ListSerializer):
+                child = cls.compile(field.child)
+                try:
+                    relation = model._meta.get_field(source)
+                except FieldDoesNotExist:
+                    return None
+                if child is None or not relation.auto_created or \
+                        not relation.one_to_many:
+                    return None
+                nested.append(
+                    (field.field_name, relation.field.attname, child))
+                converters.append((field.field_name, None, None))
+                continue
+
+            model_field = concrete.get(source)
+            if model_field is None:
+                return None
+            column = model_field.attname
+            if isinstance(field, PrimaryKeyRelatedField):
+                converter = cls.pk_converter(field)
+            elif isinstance(field, (serializers.FileField, RenditionsField)):
+                if not isinstance(model_field, FileField):
+                    return None
+                converter = cls.file_converter(field, model_field)
+            elif isinstance(field, serializers.RelatedField) or \
+                    model_field.is_relation:
+                return None
+            else:
+                converter = cls.value_converter(field)
+            if column not in columns:
+                columns.append(column)
+            converters.append((field.field_name, column, converter))
+
+        return cls(model, columns, converters, nested)
+
+    @staticmethod
+    def value_converter(field):
+        to_representation = field.to_representation
+        return lambda value: None if value is None else \
+            to_representation(value)
+
+    @staticmethod
+    def pk_converter(field):
+        to_representation = field.to_representation
+        return lambda value: None if value is None else \
+            to_representation(PKOnlyObject(pk=value))
+
+    @staticmethod
+    def file_converter(field, model_field):
+        # File fields read their value from a FieldFile, which is never
+        # None, so empty files are handled by the field itself.
+        to_representation, attr_class = \
+            field.to_representation, model_field.attr_class
+        return lambda name: to_representation(
+            attr_class(None, model_field, name))
+
+    def get_nested_rows(self, parent_ids) -> dict:
+        """
+        Returns the serialized nested objects of every parent, by
+        field name and parent id.
+        """
+        grouped = {}
+        for field_name, fk_column, child in self.nested:
+            by_parent = defaultdict(list)
+            rows = child.model._default_manager.filter(**{
+                f'{fk_column}__in': parent_ids,
+            }).order_by('pk').values(fk_column, *child.columns)
+            for row in rows:
+                by_parent[row[fk_column]].append(child.to_representation(row))
+            grouped[field_name] = by_parent
+        return grouped
+
+    def to_representation(self, row, nested=None) -> dict:
+        pk = row[self.columns[0]]
+        return {
+            name: converter(row[column]) if converter is not None
+            else nested[name].get(pk, [])
+            for name, column, converter in self.converters
+        }
+
+    def serialize(self, rows) -> list:
+        """Serializes a page of rows read with `self.columns`."""
+        nested = self.get_nested_rows(
+            [row[self.columns[0]] for row in rows]) if self.nested else None
+        return [self.to_representation(row, nested) for row in rows]
+
+
+class ValuesListMixin:
+    """
+    Serves the `list` action of a viewset from a `values()` queryset
+    through a `ValuesSerializer`, with the same output as the
+    serializer. Columns of the queryset ordering are read as well, for
+    the pagination cursors.
+    """
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = ValuesSerializer.compile(self.get_serializer())
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = [
+            name.lstrip('-') for name in
+            queryset.query.order_by or queryset.model._meta.ordering
+            if isinstance(name, str)]
+        columns = [*values_serializer.columns, *(
+            name for name in ordering
+            if name not in values_serializer.columns)]
+        rows = queryset.prefetch_related(None).values(*columns)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                values_serializer.serialize(list(page)))
+        return Response(values_serializer.serialize(list(rows)))
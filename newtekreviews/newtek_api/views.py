@@ -1,48 +1,145 @@
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model, authenticate
 from rest_framework import generics, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.permissions import (
-    AllowAny, IsAuthenticatedOrReadOnly, IsAdminUser)
+    AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly, IsAdminUser)
 from rest_framework.authentication import (
     TokenAuthentication, SessionAuthentication)
 from django_filters import rest_framework as filters
 
+from review.counters import set_like
+from review.exporters import EXPORT_FORMATS, ReviewExporter
 from review.filters import ReviewFilter
 
 
+from .conditional import ConditionalGetMixin, ReviewConditionalGetMixin
 from .permissions import IsAuthorOrReadOnly, IsReviewTopicAuthorOrReadOnly
-from .paginators import ReviewAPIListPaginator
+from .paginators import ReviewAPICursorPaginator
 from review.models import Review, ReviewTopic, Category
+from .values import ValuesListMixin
 from .serializers import (
-    ReviewSerializer, ReviewTopicSerializer,
+    BulkReviewSerializer, ReviewSerializer, ReviewTopicSerializer,
     CategorySerializer,
     UserSerializer
     )
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all().prefetch_related('topics')
+# Maximum number of reviews written by one request to the bulk endpoint.
+BULK_MAX_ITEMS = 1000
+
+
+class SparseQuerysetMixin:
+    """
+    Reads only the columns of the fields selected with the sparse
+    fieldset parameters of the serializer, and prefetches a relation
+    in `expandable_prefetches` only when it is expanded.
+
+    `required_columns` are always read, e.g. those the pagination and
+    the conditional GET rely on.
+    """
+    required_columns = ()
+    expandable_prefetches = {}
+
+    def get_selected_fields(self) -> list:
+        serializer_class = self.get_serializer_class()
+        if self.action in ('list', 'retrieve'):
+            return serializer_class.get_selected_fields(
+                self.request.query_params)
+        return list(serializer_class.Meta.fields)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        selected = self.get_selected_fields()
+        prefetches = [
+            lookup for name, lookup in self.expandable_prefetches.items()
+            if name in selected]
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.only(
+                *self.required_columns,
+                *self.get_serializer_class().get_model_columns(selected))
+        return queryset
+
+
+class ReviewViewSet(ReviewConditionalGetMixin, SparseQuerysetMixin,
+                    ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Review.objects.all()
+    conditional_models = (Review, ReviewTopic)
+    required_columns = ('slug', 'time_created', 'time_updated')
+    expandable_prefetches = {'topics': 'topics'}
     serializer_class = ReviewSerializer
     lookup_field = 'slug'
     lookup_url_kwarg = 'review_slug'
     authentication_classes = (TokenAuthentication, SessionAuthentication)
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = ReviewFilter
-    pagination_class = ReviewAPIListPaginator
+    pagination_class = ReviewAPICursorPaginator
 
     def get_permissions(self):
         if self.action in ('list', 'retrieve'):
             permission_classes = (IsAuthenticatedOrReadOnly,)
-        elif self.action == 'create':
+        elif self.action in ('create', 'bulk', 'export'):
             permission_classes = (IsAdminUser,)
+        elif self.action == 'like':
+            permission_classes = (IsAuthenticated,)
         else:
             permission_classes = (IsAuthorOrReadOnly, IsAdminUser)
         return [permission() for permission in permission_classes]
 
+    @action(detail=False, methods=('post',))
+    def bulk(self, request):
+        """
+        Creates a list of reviews with their topics, or updates those
+        whose slug exists, in one transaction. Returns the slug and the
+        status, `created` or `updated`, of every item, in order, with
+        201 if any review was created and 200 otherwise.
+        """
+        serializer = BulkReviewSerializer(
+            data=request.data, many=True, max_length=BULK_MAX_ITEMS,
+            context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        created = any(
+            result['status'] == 'created' for result in serializer.results)
+        return Response(
+            {'results': serializer.results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=False, methods=('get',))
+    def export(self, request):
+        """
+        Streams the reviews matching the filters as NDJSON, with their
+        topics, or as CSV with `?output=csv`.
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {'output': f'Choose one of {", ".join(EXPORT_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(Review.objects.all())
+        return ReviewExporter(queryset).get_response(output)
+
+    @action(detail=True, methods=('post', 'delete'))
+    def like(self, request, review_slug=None):
+        """
+        POST likes the review for the current user, DELETE removes the
+        like. Both are idempotent and return the new state.
+        """
+        review = get_object_or_404(
+            Review.objects.only('pk'), slug=review_slug)
+        liked = request.method == 'POST'
+        try:
+            likes_count = set_like(review, request.user, liked)
+        except Review.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response({'liked': liked, 'likes_count': likes_count})
+
 
 class ReviewTopicDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = ReviewTopic.objects.all().select_related('review')
@@ -53,8 +150,11 @@ class ReviewTopicDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
     authentication_classes = (TokenAuthentication, SessionAuthentication)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, SparseQuerysetMixin,
+                      ValuesListMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
+    required_columns = ('slug',)
+    conditional_models = (Category,)
     serializer_class = CategorySerializer
     lookup_field = 'slug'
     lookup_url_kwarg = 'category_slug'
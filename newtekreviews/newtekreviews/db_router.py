@@ -0,0 +1,131 @@
+"""
+Routing of reads to the read replicas listed in `REPLICA_DATABASES`,
+and of writes to the `default` (primary) database.
+
+A replica lags behind the primary, so reads go to the primary:
+
+- inside a transaction on the primary,
+- during requests with an unsafe method, e.g. a form submission,
+- for `REPLICA_STICKY_SECONDS` after a request of the same client
+  wrote something, so that authors see their own edits. The deadline
+  is kept in a cookie set by `ReplicaStickinessMiddleware`.
+
+Without replicas the router leaves every query on `default`.
+"""
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'db_primary_until'
+
+# Writes to these apps do not pin the client, e.g. session updates.
+UNTRACKED_APPS = ('sessions',)
+
+
+@dataclass
+class RoutingState:
+    """The routing state of the current request."""
+    pinned: bool = False
+    wrote: bool = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def get_replicas() -> list:
+    return list(getattr(settings, 'REPLICA_DATABASES', ()))
+
+
+def pin_to_primary() -> None:
+    """Sends the remaining reads of the current request to the primary."""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is not None and (state.pinned or state.wrote):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and \
+                model._meta.app_label not in UNTRACKED_APPS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Tracks the writes of every request for `PrimaryReplicaRouter` and
+    keeps a client which wrote on the primary for
+    `REPLICA_STICKY_SECONDS`.
+
+    Under ASGI the state is a context variable of the request's task,
+    which asgiref copies into the threads running its synchronous code.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        state = RoutingState(
+            pinned=pinned_until > time.time()
+            or request.method not in ('GET', 'HEAD', 'OPTIONS'))
+        return state, _state.set(state)
+
+    def finish(self, state, response):
+        if state.wrote and get_replicas():
+            seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+            response.set_cookie(
+                STICKY_COOKIE, str(time.time() + seconds), max_age=seconds,
+                httponly=True, samesite='Lax')
+        return response
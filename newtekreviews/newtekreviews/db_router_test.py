@@ -0,0 +1,77 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.urls import reverse
+
+from review.models import Category
+
+from .db_router import STICKY_COOKIE, PrimaryReplicaRouter
+
+REPLICA = 'replica_test'
+
+
+@pytest.fixture
+def replica(tmp_path, settings):
+    """
+    Adds a second SQLite database as the only replica. It holds the
+    tables of the categories and sessions but never receives the
+    writes, so every read it serves returns no categories.
+    """
+    connections.settings[REPLICA] = {
+        **connections['default'].settings_dict,
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.REPLICA_DATABASES = [REPLICA]
+    with connections[REPLICA].schema_editor() as editor:
+        editor.create_model(Category)
+        editor.create_model(Session)
+    yield REPLICA
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+
+
+def get_category_names(client) -> list:
+    response = client.get(reverse('newtek_api:category-list'))
+    return [category['name'] for category in response.json()['results']]
+
+
+def test_without_replicas_everything_uses_default(settings):
+    settings.REPLICA_DATABASES = []
+    router = PrimaryReplicaRouter()
+    assert router.db_for_read(Category) == 'default'
+    assert router.db_for_write(Category) == 'default'
+
+
+def test_replicas_are_not_migrated(settings):
+    settings.REPLICA_DATABASES = [REPLICA]
+    router = PrimaryReplicaRouter()
+    assert router.allow_migrate(REPLICA, 'review') is False
+    assert router.allow_migrate('default', 'review') is None
+
+
+# Without the transaction of a test case, which keeps reads on default.
+@pytest.mark.django_db(transaction=True)
+def test_reads_use_the_replica(replica, client):
+    Category.objects.create(name='Phones', slug='phones')
+    assert get_category_names(client) == []
+
+    assert Category.objects.using('default').count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writes_stick_to_the_primary(replica, client, settings):
+    admin = get_user_model().objects.create_superuser(
+        username='admin', email='admin@example.com')
+    client.force_login(admin)
+    response = client.post(
+        reverse('newtek_api:category-list'), {'name': 'Phones'})
+    assert response.status_code == 201
+    assert STICKY_COOKIE in response.cookies
+
+    del client.cookies[settings.SESSION_COOKIE_NAME]
+    assert get_category_names(client) == ['Phones']
+
+    del client.cookies[STICKY_COOKIE]
+    assert get_category_names(client) == []
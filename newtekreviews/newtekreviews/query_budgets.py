@@ -0,0 +1,132 @@
+"""
+SQL query budgets of the named URLs of the `review`, `users` and
+`newtek_api` apps.
+
+Every named URL of these apps must have a budget. The budgets are
+enforced by `query_budgets_test.py`, which requests each endpoint with
+a cold cache against seeded data of several sizes and fails when the
+number of queries or the SQL time exceeds the budget, or when the
+number of queries grows with the number of rows.
+"""
+from dataclasses import dataclass, field
+from typing import Callable
+
+# Namespaces whose named URLs must all have a budget.
+BUDGETED_NAMESPACES = ('review', 'users', 'newtek_api')
+
+# Rows seeded per model for each run of an endpoint.
+SEED_SIZES = (1, 5, 20)
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """
+    The budget of one endpoint.
+
+    Attributes:
+        queries (int): Maximum number of SQL queries of a request.
+        time (float): Maximum total SQL time of a request, in seconds.
+        method (str): HTTP method used to exercise the endpoint.
+        user (str): None for an anonymous request, 'user' for a regular
+            user or 'admin' for a superuser.
+        kwargs (callable): Receives the seeded data and returns the URL
+            kwargs.
+        data (dict): Body of the request.
+        content_type (str): Content type of the body, e.g.
+            'application/json' for a body which is not a form.
+        scales (bool): False for endpoints whose query count may depend
+            on the data, e.g. on the number of rows written.
+    """
+    queries: int
+    time: float = 0.2
+    method: str = 'get'
+    user: str | None = None
+    kwargs: Callable | None = None
+    data: dict | list = field(default_factory=dict)
+    content_type: str | None = None
+    scales: bool = True
+
+
+def review_slug(seed) -> dict:
+    return {'review_slug': seed.review.slug}
+
+
+def review_update_slug(seed) -> dict:
+    return {'slug': seed.review.slug}
+
+
+def category_slug(seed) -> dict:
+    return {'category_slug': seed.category.slug}
+
+
+def topic_slug(seed) -> dict:
+    return {'topic_slug': seed.topic.slug}
+
+
+BUDGETS = {
+    # review
+    'review:main': QueryBudget(queries=0),
+    'review:about': QueryBudget(queries=0),
+    'review:contact': QueryBudget(queries=3, user='user'),
+    'review:search': QueryBudget(queries=2, data={'q': 'budget'}),
+    'review:all_reviews': QueryBudget(queries=3),
+    'review:archived_reviews': QueryBudget(queries=5, user='user'),
+    'review:review': QueryBudget(queries=3, kwargs=review_slug),
+    'review:review_comments': QueryBudget(queries=2, kwargs=review_slug),
+    'review:review_like': QueryBudget(
+        queries=10, method='post', user='user', kwargs=review_slug),
+    'review:review_unlike': QueryBudget(
+        queries=7, method='post', user='user', kwargs=review_slug),
+    'review:review_create': QueryBudget(queries=3, user='admin'),
+    'review:review_update': QueryBudget(
+        queries=5, user='admin', kwargs=review_update_slug),
+    'review:review_delete': QueryBudget(
+        queries=3, user='admin', kwargs=review_update_slug),
+    'review:create_review_topic': QueryBudget(queries=2, user='admin'),
+    'review:update_review_topic': QueryBudget(
+        queries=3, user='admin', kwargs=topic_slug),
+    'review:delete_review_topic': QueryBudget(
+        queries=3, user='admin', kwargs=topic_slug),
+    'review:categories': QueryBudget(queries=2),
+    'review:category': QueryBudget(queries=2, kwargs=category_slug),
+    'review:category_create': QueryBudget(queries=2, user='admin'),
+    'review:category_update': QueryBudget(
+        queries=3, user='admin', kwargs=category_slug),
+    'review:category_delete': QueryBudget(
+        queries=3, user='admin', kwargs=category_slug),
+
+    # users
+    'users:register': QueryBudget(queries=0),
+    'users:login': QueryBudget(queries=0),
+    'users:logout': QueryBudget(queries=4, method='post', user='user'),
+    'users:password_change': QueryBudget(queries=2, user='user'),
+    'users:password_change_done': QueryBudget(queries=2, user='user'),
+    'users:profile': QueryBudget(queries=3, user='user'),
+    'users:edit-profile': QueryBudget(queries=3, user='user'),
+
+    # newtek_api
+    'newtek_api:api-root': QueryBudget(queries=2, user='user'),
+    'newtek_api:schema': QueryBudget(queries=0, time=1.0),
+    'newtek_api:custom_token_auth': QueryBudget(
+        queries=1, method='post',
+        data={'username': 'budget-user', 'password': 'wrong-password'}),
+    'newtek_api:review-list': QueryBudget(queries=4, user='user'),
+    'newtek_api:review-detail': QueryBudget(
+        queries=4, user='user', kwargs=review_slug),
+    'newtek_api:review-bulk': QueryBudget(
+        queries=22, method='post', user='admin',
+        content_type='application/json', data=[
+            {'slug': 'budget-review-0', 'title': 'Updated', 'description': 'x',
+             'topics': [{'review_topic_title': 'New topic'}]},
+            *({'title': f'Bulk review {i}', 'description': 'Bulk review',
+               'topics': [{'review_topic_title': f'Topic {i}'}]}
+              for i in range(3)),
+        ]),
+    # The rows are read while the response is streamed.
+    'newtek_api:review-export': QueryBudget(queries=2, user='admin'),
+    'newtek_api:review-like': QueryBudget(
+        queries=10, method='post', user='user', kwargs=review_slug),
+    'newtek_api:category-list': QueryBudget(queries=4, user='user'),
+    'newtek_api:category-detail': QueryBudget(
+        queries=3, user='user', kwargs=category_slug),
+}
@@ -0,0 +1,48 @@
+import pytest
+from django.urls import get_resolver
+
+from .query_budgets import BUDGETED_NAMESPACES, BUDGETS, SEED_SIZES
+
+
+def get_named_urls() -> set:
+    resolver = get_resolver()
+    names = set()
+    for namespace in BUDGETED_NAMESPACES:
+        _, namespace_resolver = resolver.namespace_dict[namespace]
+        names.update(
+            f'{namespace}:{name}'
+            for name in namespace_resolver.reverse_dict
+            if isinstance(name, str))
+    return names
+
+
+def test_every_endpoint_has_a_budget():
+    missing = get_named_urls() - BUDGETS.keys()
+    assert not missing, f'URLs without a query budget: {sorted(missing)}'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', sorted(BUDGETS))
+def test_query_budget(name, measure_queries):
+    budget = BUDGETS[name]
+    counts = {}
+    for size in SEED_SIZES:
+        response, queries = measure_queries(name, budget, size)
+        assert response.status_code < 500
+
+        sql = '\n'.join(query['sql'] for query in queries.captured_queries)
+        count = len(queries)
+        assert count <= budget.queries, (
+            f'{name} made {count} queries with {size} rows, '
+            f'the budget is {budget.queries}:\n{sql}')
+        time = sum(
+            float(query['time']) for query in queries.captured_queries)
+        assert time <= budget.time, (
+            f'{name} spent {time:.3f}s in SQL with {size} rows, '
+            f'the budget is {budget.time}s')
+        counts[size] = count
+
+    if budget.scales:
+        assert len(set(counts.values())) == 1, (
+            f'The queries of {name} grow with the number of rows: '
+            f'{counts}')
@@ -47,7 +47,6 @@ INSTALLED_APPS = [
     'users.apps.AuthConfig',
     'newtek_api.apps.NewtekApiConfig',
 
-    'debug_toolbar',
     'captcha',
     'rest_framework',
     'rest_framework.authtoken',
@@ -60,8 +59,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'newtekreviews.db_router.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     # 'django.middleware.cache.UpdateCacheMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,6 +71,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# The toolbar only shows with DEBUG, and its middleware is synchronous,
+# which would run every request of an ASGI server in a thread.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(0, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# Serve the read-only pages with the views of review/async_views.py.
+# asgi.py turns it on by default.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == 'True'
+
 ROOT_URLCONF = 'newtekreviews.urls'
 
 TEMPLATES = [
@@ -113,9 +122,26 @@ DATABASES = {
     }
 }
 
+# Read replicas of `default`, e.g. POSTGRES_REPLICA_HOSTS=replica1,replica2.
+# Reads are routed to them by `newtekreviews.db_router`.
+REPLICA_DATABASES = []
+for index, host in enumerate(filter(None, map(
+        str.strip, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')))):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['newtekreviews.db_router.PrimaryReplicaRouter']
+
+# Seconds a client reads from `default` after a write, see the router.
+REPLICA_STICKY_SECONDS = 10
+
+# Generation numbers used for list invalidation live in this cache, so
+# multi-process deployments need a shared backend such as Redis.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         # "BACKEND": "django.core.cache.backends.redis.RedisCache",
         # "LOCATION": "redis://127.0.0.1:6379",
     }
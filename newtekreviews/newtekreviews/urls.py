@@ -18,15 +18,9 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, re_path, include
 
-from django.contrib.sitemaps.views import sitemap
-
 from . import settings
 
-from review.sitemaps import ReviewSitemap
-
-sitemaps = {
-    'published_reviews': ReviewSitemap,
-}
+from review.views import sitemap_index, sitemap_section
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -36,13 +30,14 @@ urlpatterns = [
     path('api/v1/s-auth/', include('rest_framework.urls')),
     path('api/v1/auth/', include('djoser.urls')),
     path('api/v1/auth/', include('djoser.urls.authtoken')),
-    path('__debug__/', include('debug_toolbar.urls')),
     path('captcha/', include('captcha.urls')),
+    path('sitemap.xml', sitemap_index, name='sitemap_index'),
     path(
-        'sitemap.xml', sitemap, {'sitemaps': sitemaps},
-        name='django.contrib.sitemaps.views.sitemap'),
+        'sitemap-reviews-<int:section>.xml', sitemap_section,
+        name='sitemap_section'),
 ]
 
 if settings.DEBUG:
+    urlpatterns.append(path('__debug__/', include('debug_toolbar.urls')))
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
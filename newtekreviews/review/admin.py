@@ -1,5 +1,4 @@
 from io import TextIOWrapper
-import csv
 
 from django.contrib import admin, messages
 from django.utils.safestring import mark_safe
@@ -8,6 +7,11 @@ from django.urls import path
 
 from .models import Review, Category, ReviewTopic
 from .forms import CSVForm
+from .caching import bump_generation
+from .counters import refresh_category_counts
+from .exporters import ReviewExporter
+from .importers import ReviewCSVImporter
+from .sitemaps import invalidate_review_sitemap
 
 
 # class ReviewCategoryFilter(admin.SimpleListFilter):
@@ -47,7 +51,11 @@ class ReviewAdmin(admin.ModelAdmin):
 
     @admin.action(description="Make selected reviews published")
     def set_published(self, request, queryset):
+        selected = list(queryset.values_list('pk', 'category'))
         count = queryset.update(is_published=Review.Status.PUBLISHED)
+        bump_generation(Review)  # update() does not send post_save
+        refresh_category_counts(category for _, category in selected)
+        invalidate_review_sitemap(pk for pk, _ in selected)
         self.message_user(
             request, f"{count} reviews were successfully published",
             messages.SUCCESS
@@ -55,13 +63,27 @@ class ReviewAdmin(admin.ModelAdmin):
 
     @admin.action(description="Make selected reviews unpublished")
     def set_unpublished(self, request, queryset):
+        selected = list(queryset.values_list('pk', 'category'))
         count = queryset.update(is_published=Review.Status.DRAFT)
+        bump_generation(Review)  # update() does not send post_save
+        refresh_category_counts(category for _, category in selected)
+        invalidate_review_sitemap(pk for pk, _ in selected)
         self.message_user(
             request, f"{count} reviews were successfully unpublished",
             messages.WARNING
             )
 
-    actions = ("set_published", "set_unpublished", )
+    @admin.action(description="Export selected reviews as CSV")
+    def export_csv(self, request, queryset):
+        return ReviewExporter(queryset).get_response("csv")
+
+    @admin.action(description="Export selected reviews as NDJSON")
+    def export_ndjson(self, request, queryset):
+        return ReviewExporter(queryset).get_response("ndjson")
+
+    actions = (
+        "set_published", "set_unpublished", "export_csv", "export_ndjson",
+    )
 
     def import_csv(self, request):
         if request.method == "GET":
@@ -79,17 +101,25 @@ class ReviewAdmin(admin.ModelAdmin):
             return render(request, "admin/csv_form.html", context, status=400)
 
         csv_file = TextIOWrapper(
-            form.files['csv_file'].file, encoding=request.encoding)
-        reader = csv.DictReader(csv_file)
+            form.files['csv_file'].file,
+            encoding=request.encoding or 'utf-8-sig', newline='')
+        result = ReviewCSVImporter().import_file(csv_file)
 
-        reviews = [
-            Review(**row) for row in reader
-        ]
-        Review.objects.bulk_create(reviews)
         self.message_user(
-            request, f"{len(reviews)} Reviews successfully imported",
+            request,
+            f"{result.created} Reviews successfully imported "
+            f"({result.rows_per_second:.0f} rows/s)",
             messages.SUCCESS
         )
+        if result.error_count:
+            details = "; ".join(
+                f"line {line}: {message}"
+                for line, message in result.errors[:10])
+            self.message_user(
+                request,
+                f"{result.error_count} rows were rejected: {details}",
+                messages.WARNING
+            )
 
         return redirect("..")
 
@@ -0,0 +1,165 @@
+"""
+Async implementations of the read-only pages, for ASGI deployments.
+
+They render the same templates with the same context as the views in
+`views.py`, but load their data with the async ORM and cache API, so a
+worker does not hold a thread while a request waits on the database,
+the cache or a slow client. Templates are rendered after the view
+returns, by Django's async handler.
+
+`read_path()` routes a URL to the async view when
+`settings.ASYNC_READ_VIEWS` is set, which `asgi.py` does by default,
+and to the synchronous view otherwise.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.urls import URLPattern
+from django.urls.resolvers import RoutePattern
+
+from .caching import aget_cached_count, aget_review_version
+from .models import Review
+from .search import search_reviews as search
+from .views import (
+    SEARCH_PAGE_SIZE, CategoryDetailView, CategoryListView,
+    ReviewDetailView, ReviewListView)
+
+
+class ReadURLPattern(URLPattern):
+    """A URL pattern resolving to `async_view` in async mode."""
+
+    def __init__(self, pattern, callback, async_view, default_args=None,
+                 name=None):
+        super().__init__(pattern, callback, default_args, name)
+        self.async_view = async_view
+
+    def resolve(self, path):
+        match = super().resolve(path)
+        if match and getattr(settings, 'ASYNC_READ_VIEWS', False):
+            match.func = self.async_view
+        return match
+
+
+def read_path(route: str, view, async_view, kwargs=None, name=None):
+    """Like `path()`, with an async implementation of the view."""
+    return ReadURLPattern(
+        RoutePattern(route, name=name, is_endpoint=True), view, async_view,
+        kwargs, name)
+
+
+async def aresolve_user(request):
+    """
+    Loads the user of the request without blocking, and keeps it on
+    `request.user` for the templates.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+class AsyncListViewMixin:
+    """
+    Serves a ListView from an async `get`.
+
+    The page is loaded with the view's `apaginate_queryset()` first, so
+    the synchronous `get_context_data()` of the view and its mixins
+    builds the context without touching the database.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        await aresolve_user(request)
+        self.object_list = self.get_queryset()
+        self.page_result = await self.apaginate_queryset(
+            self.object_list, self.get_paginate_by(self.object_list))
+        await self.aload()
+        return self.render_to_response(self.get_context_data())
+
+    async def aload(self) -> None:
+        """Loads the data the context needs besides the page."""
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.page_result
+
+
+class AsyncReviewListView(AsyncListViewMixin, ReviewListView):
+    async def aload(self) -> None:
+        self.counts = {
+            'reviews_count': await aget_cached_count(
+                'reviews:published', Review.published.all(), Review),
+            'filtered_reviews_count': await aget_cached_count(
+                'reviews:published', self.filterset.qs, Review,
+                params=self.request.GET),
+        }
+
+    def get_counts(self) -> dict:
+        return self.counts
+
+
+class AsyncCategoryListView(AsyncListViewMixin, CategoryListView):
+    pass
+
+
+class AsyncReviewDetailView(ReviewDetailView):
+    async def get(self, request, *args, **kwargs):
+        user = await aresolve_user(request)
+        try:
+            self.object = await Review.objects.select_related(
+                'author', 'category').aget(
+                    slug=self.kwargs[self.slug_url_kwarg])
+        except Review.DoesNotExist:
+            raise Http404('No review found matching the query')
+        self.review_state = {
+            'review_version': await aget_review_version(self.object.pk),
+            'user_liked': user.is_authenticated and
+            await self.object.likes.filter(pk=user.pk).aexists(),
+        }
+        return self.render_to_response(
+            self.get_context_data(object=self.object))
+
+    async def post(self, request, *args, **kwargs):
+        # Comments and likes are rare writes: the synchronous view
+        # handles them in a thread.
+        return await sync_to_async(ReviewDetailView.post)(
+            self, request, *args, **kwargs)
+
+    def get_review_state(self, review, user) -> dict:
+        return self.review_state
+
+
+class AsyncCategoryDetailView(CategoryDetailView):
+    async def get(self, request, *args, **kwargs):
+        await aresolve_user(request)
+        queryset = self.get_queryset()
+        try:
+            self.object = await queryset.aget(
+                slug=self.kwargs[self.slug_url_kwarg])
+        except queryset.model.DoesNotExist:
+            raise Http404('No category found matching the query')
+        return self.render_to_response(
+            self.get_context_data(object=self.object))
+
+
+async def search_reviews(request):
+    """Async version of `views.search_reviews`."""
+    await aresolve_user(request)
+    searched = request.GET.get('q', '').strip()
+    page_obj = None
+    if searched:
+        results = search(searched)
+        # The paginator only numbers the pages; the rows of the page
+        # are loaded asynchronously below.
+        paginator = Paginator(range(await results.acount()), SEARCH_PAGE_SIZE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        page_obj.object_list = await results.aslice(
+            page_obj.start_index() - 1 if paginator.count else 0,
+            page_obj.end_index())
+
+    return TemplateResponse(
+        request, 'review/search_reviews.html',
+        {
+            'searched': searched,
+            'page_obj': page_obj,
+            'reviews': page_obj.object_list if page_obj else [],
+        }
+        )
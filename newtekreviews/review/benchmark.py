@@ -0,0 +1,341 @@
+import asyncio
+import math
+import threading
+import time
+from dataclasses import asdict, dataclass
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from .caching import bump_generation
+from .counters import refresh_category_counts, refresh_review_counts
+from .models import Review, ReviewTopic, Category, Comment
+from .search import index_reviews
+from .slugs import bulk_create_with_unique_slugs
+
+# `sync` serves the pages with the synchronous views and test client,
+# `async` with the async views of async_views.py and the async client.
+MODES = ('sync', 'async')
+
+COMMENTS_PER_REVIEW = 3
+TOPICS_PER_REVIEW = 2
+REVIEWS_PER_CATEGORY = 100
+REVIEWS_PER_AUTHOR = 20
+
+
+@dataclass
+class BenchmarkTarget:
+    """The objects the benchmarked URLs point to."""
+    review_slug: str
+    search_term: str
+
+
+ENDPOINTS = {
+    'reviews': lambda target: reverse('review:all_reviews'),
+    'review': lambda target: reverse(
+        'review:review', kwargs={'review_slug': target.review_slug}),
+    'categories': lambda target: reverse('review:categories'),
+    'api_reviews': lambda target: reverse('newtek_api:review-list'),
+    'search': lambda target: reverse('review:search') + '?' + urlencode(
+        {'q': target.search_term}),
+}
+
+
+@dataclass
+class EndpointResult:
+    """
+    The measurements of one endpoint for one dataset size, concurrency
+    level and mode. Latencies are in milliseconds.
+    """
+    endpoint: str
+    path: str
+    size: int
+    concurrency: int
+    requests: int
+    errors: int
+    p50: float
+    p95: float
+    p99: float
+    requests_per_second: float
+    queries_per_request: float
+    mode: str = 'sync'
+
+    @property
+    def key(self) -> tuple:
+        return self.endpoint, self.size, self.concurrency, self.mode
+
+
+def percentile(values, pct: float) -> float:
+    """Returns the nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+# Data
+
+def seed_reviews(size: int) -> int:
+    """
+    Grows the dataset to `size` published reviews, with their authors,
+    categories, comments, topics and likes, using bulk inserts.
+
+    Returns:
+        int: The number of reviews created.
+    """
+    count = size - Review.objects.count()
+    if count <= 0:
+        return 0
+    start = Review.objects.count()
+
+    User = get_user_model()
+    authors = User.objects.bulk_create([
+        User(username=f'benchmark-{start}-{i}')
+        for i in range(max(count // REVIEWS_PER_AUTHOR, 1))])
+    categories = Category.objects.bulk_create([
+        Category(
+            name=f'Benchmark category {start}-{i}',
+            slug=f'benchmark-category-{start}-{i}')
+        for i in range(max(count // REVIEWS_PER_CATEGORY, 1))])
+
+    reviews = [
+        Review(
+            title=f'Benchmark review {start + i}',
+            description='Seeded review for the HTTP benchmark.',
+            category=categories[i % len(categories)],
+            author=authors[i % len(authors)],
+            is_published=True)
+        for i in range(count)
+    ]
+    bulk_create_with_unique_slugs(
+        Review, reviews, [review.title for review in reviews])
+
+    Comment.objects.bulk_create([
+        Comment(
+            review=review, author=authors[(i + j) % len(authors)],
+            text=f'Benchmark comment {j}')
+        for i, review in enumerate(reviews)
+        for j in range(COMMENTS_PER_REVIEW)])
+    ReviewTopic.objects.bulk_create([
+        ReviewTopic(
+            review=review, review_topic_title=f'Topic {j}',
+            text_content='Seeded topic for the HTTP benchmark.',
+            slug=f'{review.slug}-topic-{j}')
+        for review in reviews
+        for j in range(TOPICS_PER_REVIEW)])
+    Review.likes.through.objects.bulk_create([
+        Review.likes.through(
+            review_id=review.pk, user_id=authors[i % len(authors)].pk)
+        for i, review in enumerate(reviews)])
+
+    # Bulk inserts do not send the signals maintaining these.
+    review_ids = [review.pk for review in reviews]
+    refresh_review_counts(review_ids)
+    refresh_category_counts(category.pk for category in categories)
+    index_reviews(review_ids)
+    for model in (Review, Category, ReviewTopic):
+        bump_generation(model)
+    return count
+
+
+def get_target() -> BenchmarkTarget:
+    """Picks the published review with the most comments."""
+    review = Review.published.order_by('-comments_count', '-id').values(
+        'slug', 'title').first()
+    if review is None:
+        return BenchmarkTarget(review_slug='missing', search_term='review')
+    return BenchmarkTarget(
+        review_slug=review['slug'], search_term=review['title'].split()[0])
+
+
+# Measurements
+
+def run_endpoint(endpoint: str, path: str, requests: int, concurrency: int,
+                 size: int = 0, warmup: int = 5,
+                 mode: str = 'sync') -> EndpointResult:
+    """
+    Requests `path` `requests` times through the Django test client and
+    measures every request.
+
+    In `sync` mode the requests are spread over `concurrency` threads;
+    a concurrency of 1 runs in the calling thread and its database
+    connection. In `async` mode `concurrency` tasks share an event loop
+    and the async client, with ASYNC_READ_VIEWS on.
+
+    The warm-up requests fill the caches, so the results describe the
+    steady state.
+    """
+    if mode == 'async':
+        with override_settings(ASYNC_READ_VIEWS=True):
+            latencies, queries, errors, wall_time = run_async_requests(
+                path, requests, concurrency, warmup)
+    else:
+        latencies, queries, errors, wall_time = run_sync_requests(
+            path, requests, concurrency, warmup)
+
+    return EndpointResult(
+        endpoint=endpoint, path=path, size=size, concurrency=concurrency,
+        requests=len(latencies), errors=errors,
+        p50=round(percentile(latencies, 50), 3),
+        p95=round(percentile(latencies, 95), 3),
+        p99=round(percentile(latencies, 99), 3),
+        requests_per_second=round(
+            len(latencies) / wall_time if wall_time else 0.0, 1),
+        queries_per_request=round(
+            queries / len(latencies) if latencies else 0.0, 2),
+        mode=mode,
+    )
+
+
+def split_requests(requests: int, concurrency: int) -> list:
+    """Returns the number of requests of every concurrent client."""
+    return [
+        requests // concurrency + (1 if i < requests % concurrency else 0)
+        for i in range(concurrency)]
+
+
+def run_sync_requests(path: str, requests: int, concurrency: int,
+                      warmup: int) -> tuple:
+    """
+    Returns:
+        tuple: The latencies, the number of queries, the number of
+            errors and the wall time of the requests.
+    """
+    warmup_client = Client()
+    for _ in range(warmup):
+        warmup_client.get(path)
+
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+
+    def work(count: int):
+        client = Client()
+        local_latencies, local_queries, local_errors = [], 0, 0
+        for _ in range(count):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(path)
+                elapsed = time.perf_counter() - started
+            local_latencies.append(elapsed * 1000)
+            local_queries += len(captured)
+            if response.status_code >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            queries.append(local_queries)
+            errors.append(local_errors)
+
+    def work_in_thread(count: int):
+        try:
+            work(count)
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        work(requests)
+    else:
+        threads = [
+            threading.Thread(target=work_in_thread, args=(share,))
+            for share in split_requests(requests, concurrency) if share]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall_time = time.perf_counter() - started
+    return latencies, sum(queries), sum(errors), wall_time
+
+
+def run_async_requests(path: str, requests: int, concurrency: int,
+                       warmup: int) -> tuple:
+    """
+    The async counterpart of `run_sync_requests()`: `concurrency` tasks
+    share an event loop.
+
+    Run through `async_to_sync()`, the database work of the views runs
+    in the calling thread, so its connection sees every query. The
+    requests interleave, so only the total number is known.
+    """
+    latencies, errors = [], 0
+
+    async def warm_up():
+        client = AsyncClient()
+        for _ in range(warmup):
+            await client.get(path)
+
+    async def work(count: int):
+        nonlocal errors
+        client = AsyncClient()
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    async def run_all():
+        await asyncio.gather(*(
+            work(share) for share in split_requests(requests, concurrency)
+            if share))
+
+    async_to_sync(warm_up)()
+    with CaptureQueriesContext(connection) as captured:
+        started = time.perf_counter()
+        async_to_sync(run_all)()
+        wall_time = time.perf_counter() - started
+    return latencies, len(captured), errors, wall_time
+
+
+def make_report(results, **meta) -> dict:
+    """Returns the JSON-serializable report of a run."""
+    return {
+        'meta': {'database': connection.vendor, **meta},
+        'results': [asdict(result) for result in results],
+    }
+
+
+def compare_reports(baseline: dict, current: dict,
+                    threshold: float = 0.1) -> list:
+    """
+    Compares two reports made with `make_report`.
+
+    A measurement regresses when its p95 latency grows, or its
+    throughput drops, by more than `threshold` (a fraction), or when
+    it makes more queries per request. Measurements missing from
+    either report are ignored; those of reports without modes are
+    synchronous.
+
+    Returns:
+        list: A message for every regression.
+    """
+    def get_key(result) -> tuple:
+        return (result['endpoint'], result['size'], result['concurrency'],
+                result.get('mode', 'sync'))
+
+    previous = {get_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        key = get_key(result)
+        old = previous.get(key)
+        if old is None:
+            continue
+        label = '{} (size {}, concurrency {}, {})'.format(*key)
+        if result['p95'] > old['p95'] * (1 + threshold):
+            regressions.append(
+                f'{label}: p95 {old["p95"]:.1f}ms -> {result["p95"]:.1f}ms')
+        if result['requests_per_second'] < \
+                old['requests_per_second'] * (1 - threshold):
+            regressions.append(
+                f'{label}: {old["requests_per_second"]:.1f} -> '
+                f'{result["requests_per_second"]:.1f} requests/s')
+        if result['queries_per_request'] > old['queries_per_request']:
+            regressions.append(
+                f'{label}: {old["queries_per_request"]} -> '
+                f'{result["queries_per_request"]} queries/request')
+    return regressions
@@ -0,0 +1,233 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+LIST_CACHE_TIMEOUT = 60 * 60 * 24
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+GENERATION_KEY = 'generation:{label}'
+REVIEW_VERSION_KEY = 'review:{pk}:version'
+
+
+def _new_generation() -> int:
+    """
+    Returns a fresh generation number.
+
+    Nanosecond timestamps are used instead of a plain counter so that a
+    generation key which was evicted from the cache never restarts from a
+    value that older cache entries were stored under.
+    """
+    return time.time_ns()
+
+
+def get_version(key: str) -> int:
+    """
+    Returns the version number stored under `key`, initialising it
+    if the key is missing from the cache.
+    """
+    return cache.get_or_set(key, _new_generation, timeout=None)
+
+
+async def aget_version(key: str) -> int:
+    """Async version of `get_version()`."""
+    return await cache.aget_or_set(key, _new_generation, timeout=None)
+
+
+def bump_version(key: str) -> int:
+    """
+    Replaces the version number stored under `key`, which makes every
+    cache entry built from the previous version unreachable.
+
+    Inside a transaction the version is replaced again on commit, because
+    a concurrent request may have cached data read before the commit
+    under the first new version.
+    """
+    version = _new_generation()
+    cache.set(key, version, timeout=None)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(
+            lambda: cache.set(key, _new_generation(), timeout=None))
+    return version
+
+
+def get_generation(*models) -> str:
+    """
+    Returns the combined generation of the given models as a string
+    suitable for a cache key, e.g. `1718000000000-1718000000001`.
+    """
+    return '-'.join(
+        str(get_version(GENERATION_KEY.format(label=model._meta.label_lower)))
+        for model in models
+    )
+
+
+async def aget_generation(*models) -> str:
+    """Async version of `get_generation()`."""
+    return '-'.join([
+        str(await aget_version(
+            GENERATION_KEY.format(label=model._meta.label_lower)))
+        for model in models
+    ])
+
+
+def bump_generation(model) -> int:
+    """Invalidates every cached list built from the given model."""
+    return bump_version(
+        GENERATION_KEY.format(label=model._meta.label_lower))
+
+
+def get_review_version(review_id) -> int:
+    """
+    Returns the version of a single review, which is part of the keys
+    of the template fragments rendered for it.
+    """
+    return get_version(REVIEW_VERSION_KEY.format(pk=review_id))
+
+
+async def aget_review_version(review_id) -> int:
+    """Async version of `get_review_version()`."""
+    return await aget_version(REVIEW_VERSION_KEY.format(pk=review_id))
+
+
+def bump_review_version(review_id) -> int:
+    """Invalidates the cached template fragments of a single review."""
+    return bump_version(REVIEW_VERSION_KEY.format(pk=review_id))
+
+
+def make_list_cache_key(prefix: str, params, *models,
+                        exclude=('page',)) -> str:
+    """
+    Builds a cache key for a list result.
+
+    The key contains the current generation of `models` and a digest of
+    the query parameters (the `exclude` parameters left out), so that
+    every filter combination is stored separately and every write to one
+    of the models moves readers on to a new key.
+
+    Args:
+        prefix: A name for the list, e.g. `reviews:published`.
+        params: A QueryDict or dict with the request's GET parameters.
+        models: The models the list is built from.
+        exclude: Parameters which do not change the list, e.g. the page.
+    """
+    return _build_list_cache_key(
+        prefix, params, get_generation(*models), exclude)
+
+
+async def amake_list_cache_key(prefix: str, params, *models,
+                               exclude=('page',)) -> str:
+    """Async version of `make_list_cache_key()`."""
+    return _build_list_cache_key(
+        prefix, params, await aget_generation(*models), exclude)
+
+
+def _build_list_cache_key(prefix: str, params, generation: str,
+                          exclude) -> str:
+    items = sorted(
+        (name, tuple(params.getlist(name)) if hasattr(params, 'getlist')
+         else (params[name],))
+        for name in params if name not in exclude
+    )
+    digest = hashlib.md5(
+        repr(items).encode(), usedforsecurity=False).hexdigest()
+    return f'list:{prefix}:{generation}:{digest}'
+
+
+def get_cached_count(prefix: str, queryset, *models, params=None) -> int:
+    """
+    Returns `queryset.count()`, cached under the generation of `models`.
+
+    When the queryset is filtered by GET parameters, pass them as
+    `params` to store the count of every filter combination separately.
+    """
+    if params is None:
+        key = f'count:{prefix}:{get_generation(*models)}'
+    else:
+        key = make_list_cache_key(
+            f'count:{prefix}', params, *models, exclude=('page', 'cursor'))
+    return cache.get_or_set(key, queryset.count, timeout=LIST_CACHE_TIMEOUT)
+
+
+async def aget_cached_count(prefix: str, queryset, *models,
+                            params=None) -> int:
+    """Async version of `get_cached_count()`."""
+    if params is None:
+        key = f'count:{prefix}:{await aget_generation(*models)}'
+    else:
+        key = await amake_list_cache_key(
+            f'count:{prefix}', params, *models, exclude=('page', 'cursor'))
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, timeout=LIST_CACHE_TIMEOUT)
+    return count
+
+
+class GenerationCachedListMixin:
+    """
+    A ListView mixin that caches the primary keys of the filtered
+    queryset under a generation-versioned key and only hydrates the
+    rows of the requested page.
+
+    Attributes:
+        cache_prefix (str): The name used in the cache key.
+        cache_models (tuple): Models whose generation is part of the key.
+        cache_timeout (int): Safety TTL for the cached primary keys.
+    """
+    cache_prefix = None
+    cache_models = ()
+    cache_timeout = LIST_CACHE_TIMEOUT
+
+    def get_cached_pks(self, queryset) -> list:
+        """
+        Returns the ordered list of primary keys for `queryset`,
+        reading it from the cache when possible.
+        """
+        if getattr(self, '_cached_pks', None) is None:
+            key = make_list_cache_key(
+                self.cache_prefix, self.request.GET, *self.cache_models)
+            pks = cache.get(key)
+            if pks is None:
+                if not queryset.ordered:
+                    queryset = queryset.order_by('pk')
+                pks = list(queryset.values_list('pk', flat=True))
+                cache.set(key, pks, self.cache_timeout)
+            self._cached_pks = pks
+        return self._cached_pks
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Paginates the cached primary keys instead of the queryset and
+        loads only the objects of the current page.
+        """
+        pks = self.get_cached_pks(queryset)
+        paginator, page, page_pks, is_paginated = super().paginate_queryset(
+            pks, page_size)
+        objects = queryset.in_bulk(list(page_pks))
+        page.object_list = [objects[pk] for pk in page_pks if pk in objects]
+        return paginator, page, page.object_list, is_paginated
+
+    async def aget_cached_pks(self, queryset) -> list:
+        """Async version of `get_cached_pks()`."""
+        if getattr(self, '_cached_pks', None) is None:
+            key = await amake_list_cache_key(
+                self.cache_prefix, self.request.GET, *self.cache_models)
+            pks = await cache.aget(key)
+            if pks is None:
+                if not queryset.ordered:
+                    queryset = queryset.order_by('pk')
+                pks = [pk async for pk in queryset.values_list(
+                    'pk', flat=True)]
+                await cache.aset(key, pks, self.cache_timeout)
+            self._cached_pks = pks
+        return self._cached_pks
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """Async version of `paginate_queryset()`."""
+        pks = await self.aget_cached_pks(queryset)
+        paginator, page, page_pks, is_paginated = super().paginate_queryset(
+            pks, page_size)
+        objects = await queryset.ain_bulk(list(page_pks))
+        page.object_list = [objects[pk] for pk in page_pks if pk in objects]
+        return paginator, page, page.object_list, is_paginated
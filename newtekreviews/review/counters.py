@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Review, Category, Comment
+
+
+def _count_subquery(queryset, field: str):
+    """
+    Returns a subquery counting the rows of `queryset` whose `field`
+    points to the outer row, or 0 when there are none.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(count=Count('*')).values('count')
+        ),
+        0
+    )
+
+
+def change_counter(model, pk, field: str, delta: int) -> None:
+    """
+    Atomically adds `delta` to the counter `field` of a single row.
+    Decrements never take a counter below zero.
+    """
+    if not pk or not delta:
+        return
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def adjust_category_counts(old_state, new_state) -> None:
+    """
+    Moves a review between the published counters of its categories.
+
+    Args:
+        old_state: (is_published, category_id) before the change.
+        new_state: (is_published, category_id) after the change.
+    """
+    if old_state == new_state:
+        return
+    old_published, old_category_id = old_state
+    new_published, new_category_id = new_state
+    if old_published:
+        change_counter(
+            Category, old_category_id, 'published_reviews_count', -1)
+    if new_published:
+        change_counter(
+            Category, new_category_id, 'published_reviews_count', 1)
+
+
+def refresh_category_counts(category_ids=None) -> int:
+    """
+    Recomputes `published_reviews_count` for the given categories,
+    or for all categories when `category_ids` is None.
+
+    Returns:
+        int: The number of updated categories.
+    """
+    queryset = Category.objects.all()
+    if category_ids is not None:
+        queryset = queryset.filter(pk__in=set(category_ids) - {None})
+    return queryset.update(
+        published_reviews_count=_count_subquery(
+            Review.published.all(), 'category'))
+
+
+def refresh_review_counts(review_ids=None) -> int:
+    """
+    Recomputes `likes_count` and `comments_count` for the given reviews,
+    or for all reviews when `review_ids` is None.
+
+    Returns:
+        int: The number of updated reviews.
+    """
+    queryset = Review.objects.all()
+    if review_ids is not None:
+        queryset = queryset.filter(pk__in=review_ids)
+    return queryset.update(
+        likes_count=_count_subquery(
+            Review.likes.through.objects.all(), 'review'),
+        comments_count=_count_subquery(Comment.objects.all(), 'review'),
+    )
+
+
+def toggle_like(review: Review, user) -> bool:
+    """
+    Likes the review for `user`, or removes the like if it exists.
+    The `likes_count` counter is updated by the m2m_changed receiver
+    in the same transaction.
+
+    Returns:
+        bool: True if the review is liked by the user after the call.
+    """
+    with transaction.atomic():
+        if review.likes.filter(pk=user.pk).exists():
+            review.likes.remove(user)
+            return False
+        review.likes.add(user)
+        return True
+
+
+def set_like(review: Review, user, liked: bool) -> int:
+    """
+    Likes (`liked=True`) or unlikes the review for `user`. Repeating a
+    call does not change anything, so clients may safely retry.
+
+    The review row is locked for the transaction, so concurrent clicks
+    on the same review are applied one after the other. The membership
+    is checked with a single EXISTS on the unique (review, user) index
+    of the likes table, and the relation and `likes_count` are changed
+    in the same transaction.
+
+    Returns:
+        int: The number of likes after the call.
+
+    Raises:
+        Review.DoesNotExist: If the review was deleted.
+    """
+    with transaction.atomic():
+        likes_count = Review.objects.select_for_update().filter(
+            pk=review.pk).values_list('likes_count', flat=True).first()
+        if likes_count is None:
+            raise Review.DoesNotExist
+        is_liked = Review.likes.through.objects.filter(
+            review_id=review.pk, user_id=user.pk).exists()
+        if is_liked == liked:
+            return likes_count
+        if liked:
+            review.likes.add(user)
+            return likes_count + 1
+        review.likes.remove(user)
+        return max(likes_count - 1, 0)
@@ -0,0 +1,127 @@
+import csv
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import ReviewTopic
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _Echo:
+    """A file-like object whose `write` returns the written value."""
+
+    def write(self, value):
+        return value
+
+
+class ReviewExporter:
+    """
+    Exports reviews as NDJSON or CSV without loading them into memory.
+
+    The queryset is walked with `iterator(chunk_size=...)`, which uses a
+    server-side cursor on PostgreSQL, and only the exported columns are
+    read. In NDJSON every line holds a review with its topics, which are
+    loaded with one query per chunk. The CSV columns are those read by
+    `ReviewCSVImporter`, so an export can be imported again.
+    """
+    chunk_size = 2000
+    columns = (
+        'title', 'slug', 'description', 'is_published', 'category',
+        'author', 'time_created', 'time_updated',
+    )
+    # Column names by queryset field.
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+        'is_published': 'is_published',
+        'category__slug': 'category',
+        'author__username': 'author',
+        'time_created': 'time_created',
+        'time_updated': 'time_updated',
+    }
+
+    def __init__(self, queryset, chunk_size=None):
+        self.queryset = queryset
+        self.chunk_size = chunk_size or self.chunk_size
+
+    def iter_chunks(self):
+        """Yields the exported reviews as lists of dicts, chunk by chunk."""
+        rows = self.queryset.prefetch_related(None).values_list(
+            *self.fields).iterator(chunk_size=self.chunk_size)
+        names = list(self.fields.values())
+        while True:
+            chunk = [dict(zip(names, row))
+                     for row in islice(rows, self.chunk_size)]
+            if not chunk:
+                return
+            yield chunk
+
+    def get_topics(self, review_ids) -> dict:
+        """Returns the topics of the given reviews by review id."""
+        topics = {}
+        for review_id, title, slug, text in ReviewTopic.objects.filter(
+                review_id__in=review_ids).order_by('pk').values_list(
+                    'review_id', 'review_topic_title', 'slug',
+                    'text_content'):
+            topics.setdefault(review_id, []).append({
+                'review_topic_title': title, 'slug': slug,
+                'text_content': text})
+        return topics
+
+    def iter_ndjson(self):
+        encoder = DjangoJSONEncoder()
+        for chunk in self.iter_chunks():
+            topics = self.get_topics([review['id'] for review in chunk])
+            yield ''.join(
+                encoder.encode({
+                    **{name: review[name] for name in self.columns},
+                    'topics': topics.get(review['id'], []),
+                }) + '\n'
+                for review in chunk)
+
+    def iter_csv(self):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.columns)
+        for chunk in self.iter_chunks():
+            yield ''.join(
+                writer.writerow([
+                    self.format_csv_value(review[name])
+                    for name in self.columns])
+                for review in chunk)
+
+    @staticmethod
+    def format_csv_value(value):
+        if value is None:
+            return ''
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def stream(self, fmt: str):
+        """Yields the export in `fmt`, one chunk of reviews at a time."""
+        if fmt == 'csv':
+            return self.iter_csv()
+        return self.iter_ndjson()
+
+    def get_response(self, fmt: str,
+                     filename: str = 'reviews') -> StreamingHttpResponse:
+        """
+        Returns a streaming download of the export.
+
+        Raises:
+            ValueError: If `fmt` is not one of EXPORT_FORMATS.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f'Unknown export format "{fmt}".')
+        response = StreamingHttpResponse(
+            self.stream(fmt), content_type=EXPORT_FORMATS[fmt])
+        response['Content-Disposition'] = \
+            f'attachment; filename="{filename}.{fmt}"'
+        return response
@@ -1,21 +1,91 @@
+from functools import reduce
+from operator import add
+
 import django_filters
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, Value, When
 
 from .models import Review, Category
 
 
-class ReviewFilter(django_filters.FilterSet):
+def order_by_similarity(queryset, terms: dict):
+    """
+    Orders `queryset` by how closely the given fields match the searched
+    values, best match first.
+
+    On PostgreSQL the pg_trgm similarity of each field is summed. Other
+    backends use a portable score: an exact match ranks above a prefix
+    match, which ranks above any other substring match.
+
+    Args:
+        queryset: The queryset to order.
+        terms (dict): Searched values by field name, e.g. {'title': 'phone'}.
+    """
+    if not terms:
+        return queryset
+
+    if connections[queryset.db].vendor == 'postgresql':
+        scores = [
+            TrigramSimilarity(field, value) for field, value in terms.items()
+        ]
+    else:
+        scores = [
+            Case(
+                When(**{f'{field}__iexact': value}, then=Value(1.0)),
+                When(**{f'{field}__istartswith': value}, then=Value(0.5)),
+                default=Value(0.1),
+                output_field=FloatField(),
+            )
+            for field, value in terms.items()
+        ]
+
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(
+        similarity=reduce(add, scores)
+    ).order_by('-similarity', *ordering)
+
+
+class SimilarityRankedFilterSet(django_filters.FilterSet):
+    """
+    A FilterSet whose substring filters can be ranked by similarity
+    with `?ranked=true`.
+
+    Attributes:
+        similarity_fields (tuple): Filters whose values are used for ranking.
+    """
+    similarity_fields = ()
+
+    ranked = django_filters.BooleanFilter(method='rank_by_similarity')
+
+    def rank_by_similarity(self, queryset, name, value):
+        if not value:
+            return queryset
+        terms = {
+            field: self.form.cleaned_data[field]
+            for field in self.similarity_fields
+            if self.form.cleaned_data.get(field)
+        }
+        return order_by_similarity(queryset, terms)
+
+
+class ReviewFilter(SimilarityRankedFilterSet):
     title = django_filters.CharFilter(lookup_expr='icontains')
     description = django_filters.CharFilter(lookup_expr='icontains')
     time_created = django_filters.DateFilter(lookup_expr='gt')
 
+    similarity_fields = ('title', 'description')
+
     class Meta:
         model = Review
         fields = ['title', 'description', 'time_created']
 
 
-class CategoryFilter(django_filters.FilterSet):
+class CategoryFilter(SimilarityRankedFilterSet):
     name = django_filters.CharFilter(lookup_expr='icontains')
 
+    similarity_fields = ('name',)
+
     class Meta:
         model = Category
         fields = ['name']
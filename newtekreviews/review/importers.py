@@ -0,0 +1,233 @@
+import csv
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from .caching import bump_generation
+from .counters import refresh_category_counts
+from .models import Review, Category
+from .search import index_reviews
+from .sitemaps import invalidate_review_sitemap
+from .slugs import bulk_create_with_unique_slugs
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'published'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'draft'}
+
+
+@dataclass
+class ImportResult:
+    """
+    The outcome of an import.
+
+    Attributes:
+        rows (int): Number of data rows read.
+        created (int): Number of reviews inserted.
+        errors (list): (line number, message) pairs, at most `max_errors`.
+        error_count (int): Number of rejected rows.
+        elapsed (float): Seconds spent importing.
+    """
+    rows: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class ReviewCSVImporter:
+    """
+    Imports reviews from a CSV file without loading it into memory.
+
+    Rows are read lazily and processed in chunks of `batch_size`. For each
+    chunk the referenced categories and authors are resolved with one query
+    per model (values seen before are served from a cache), every row is
+    validated, and the valid reviews are inserted with
+    `bulk_create_with_unique_slugs` in their own transaction.
+    A rejected row or chunk is reported and the import continues.
+
+    Columns:
+        title (required), description, is_published, slug,
+        category (slug or name) or category_id,
+        author (username) or author_id.
+    """
+    batch_size = 1000
+    max_errors = 100
+
+    def __init__(self, batch_size=None, max_errors=None, progress=None):
+        """
+        Args:
+            batch_size: Number of rows inserted per transaction.
+            max_errors: Number of error messages kept in the result.
+            progress: Optional callable receiving the ImportResult after
+                every chunk.
+        """
+        self.batch_size = batch_size or self.batch_size
+        self.max_errors = max_errors or self.max_errors
+        self.progress = progress
+        self._categories = {}
+        self._authors = {}
+
+    def import_file(self, file) -> ImportResult:
+        """Imports every row of a text-mode CSV file."""
+        result = ImportResult()
+        started = time.monotonic()
+        category_ids = set()
+
+        rows = enumerate(csv.DictReader(file), start=2)  # after the header
+        while True:
+            chunk = list(islice(rows, self.batch_size))
+            if not chunk:
+                break
+            result.rows += len(chunk)
+            reviews = self.import_chunk(chunk, result)
+            category_ids.update(review.category_id for review in reviews)
+            result.elapsed = time.monotonic() - started
+            if self.progress:
+                self.progress(result)
+
+        if result.created:
+            # bulk_create() does not send post_save
+            refresh_category_counts(category_ids)
+            bump_generation(Review)
+            bump_generation(Category)
+        result.elapsed = time.monotonic() - started
+        return result
+
+    def import_chunk(self, chunk, result: ImportResult) -> list:
+        """
+        Validates and inserts one chunk of (line number, row) pairs.
+
+        Returns:
+            list: The inserted reviews.
+        """
+        self.resolve_references(row for _, row in chunk)
+
+        reviews, lines = [], []
+        for line, row in chunk:
+            try:
+                reviews.append(self.build_review(row))
+                lines.append(line)
+            except ValidationError as exc:
+                self.add_error(result, line, '; '.join(exc.messages))
+        if not reviews:
+            return []
+
+        try:
+            with transaction.atomic():
+                bulk_create_with_unique_slugs(
+                    Review, reviews,
+                    [review.slug or review.title for review in reviews])
+                index_reviews(review.pk for review in reviews if review.pk)
+        except DatabaseError as exc:
+            for line in lines:
+                self.add_error(result, line, f'Batch rejected: {exc}')
+            return []
+
+        invalidate_review_sitemap(
+            review.pk for review in reviews if review.pk)
+        result.created += len(reviews)
+        return reviews
+
+    def add_error(self, result: ImportResult, line: int, message: str):
+        result.error_count += 1
+        if len(result.errors) < self.max_errors:
+            result.errors.append((line, message))
+
+    # References
+
+    def resolve_references(self, rows) -> None:
+        """
+        Loads the categories and authors referenced by `rows` which are not
+        cached yet, with one query per model.
+        """
+        categories, authors = set(), set()
+        for row in rows:
+            for column in ('category', 'category_id'):
+                value = (row.get(column) or '').strip()
+                if value and (column, value) not in self._categories:
+                    categories.add((column, value))
+            for column in ('author', 'author_id'):
+                value = (row.get(column) or '').strip()
+                if value and (column, value) not in self._authors:
+                    authors.add((column, value))
+
+        if categories:
+            names = {value for column, value in categories
+                     if column == 'category'}
+            ids = {value for column, value in categories
+                   if column == 'category_id' and value.isdigit()}
+            found = Category.objects.filter(
+                Q(slug__in=names) | Q(name__in=names) | Q(pk__in=ids)
+            ).values_list('pk', 'slug', 'name')
+            for pk, slug, name in found:
+                self._categories[('category', slug)] = pk
+                self._categories.setdefault(('category', name), pk)
+                self._categories[('category_id', str(pk))] = pk
+            for key in categories:
+                self._categories.setdefault(key, None)
+
+        if authors:
+            usernames = {value for column, value in authors
+                         if column == 'author'}
+            ids = {value for column, value in authors
+                   if column == 'author_id' and value.isdigit()}
+            found = get_user_model().objects.filter(
+                Q(username__in=usernames) | Q(pk__in=ids)
+            ).values_list('pk', 'username')
+            for pk, username in found:
+                self._authors[('author', username)] = pk
+                self._authors[('author_id', str(pk))] = pk
+            for key in authors:
+                self._authors.setdefault(key, None)
+
+    def _get_reference(self, row, cache: dict, columns, label: str):
+        for column in columns:
+            value = (row.get(column) or '').strip()
+            if value:
+                pk = cache.get((column, value))
+                if pk is None:
+                    raise ValidationError(f'Unknown {label} "{value}".')
+                return pk
+        return None
+
+    # Rows
+
+    def build_review(self, row) -> Review:
+        """
+        Builds an unsaved review from a CSV row.
+
+        Raises:
+            ValidationError: If the row is invalid.
+        """
+        title = (row.get('title') or '').strip()
+        if not title:
+            raise ValidationError('The title is required.')
+
+        is_published = (row.get('is_published') or '').strip().lower()
+        if is_published and is_published not in TRUE_VALUES | FALSE_VALUES:
+            raise ValidationError(
+                f'Invalid is_published value "{is_published}".')
+
+        review = Review(
+            title=title,
+            slug=(row.get('slug') or '').strip(),
+            description=(row.get('description') or '').strip(),
+            is_published=is_published not in FALSE_VALUES,
+            category_id=self._get_reference(
+                row, self._categories, ('category', 'category_id'),
+                'category'),
+            author_id=self._get_reference(
+                row, self._authors, ('author', 'author_id'), 'author'),
+        )
+        # References were resolved above, so they are not queried again.
+        review.clean_fields(
+            exclude=['slug', 'main_image', 'category', 'author'])
+        return review
@@ -0,0 +1,138 @@
+import json
+import logging
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from review.benchmark import (
+    ENDPOINTS, MODES, compare_reports, get_target, make_report, run_endpoint,
+    seed_reviews)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the main pages and API endpoints in-process across "
+        "dataset sizes, concurrency levels and sync/async modes, "
+        "reporting latency "
+        "percentiles, throughput and queries per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100, 1000],
+            help='Numbers of published reviews to benchmark against.')
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[1, 4],
+            help='Numbers of concurrent clients.')
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Requests per endpoint, size and concurrency level.')
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Unmeasured requests made first to fill the caches.')
+        parser.add_argument(
+            '--endpoints', nargs='+', choices=sorted(ENDPOINTS),
+            default=list(ENDPOINTS), help='Endpoints to benchmark.')
+        parser.add_argument(
+            '--modes', nargs='+', choices=MODES, default=['sync'],
+            help='Serve the pages with the sync views, the async views '
+                 'of async_views.py, or both.')
+        parser.add_argument(
+            '--no-seed', action='store_true',
+            help='Benchmark the data of the configured database instead '
+                 'of seeding a throwaway test database. --sizes is '
+                 'ignored.')
+        parser.add_argument(
+            '--output', help='Path of the JSON report to write.')
+        parser.add_argument(
+            '--compare', help='Path of a JSON report to compare against.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Relative slowdown reported as a regression.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(
+                    f'Cannot read {options["compare"]}: {exc}')
+
+        # Request logging would dominate the output and the timings.
+        logging.disable(logging.INFO)
+        try:
+            results = self.run_all(options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+        report = make_report(
+            results,
+            created_at=datetime.now(timezone.utc).isoformat(),
+            django=django.get_version(),
+            requests=options['requests'],
+            warmup=options['warmup'])
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+        if baseline is not None:
+            regressions = compare_reports(
+                baseline, report, options['threshold'])
+            for message in regressions:
+                self.stderr.write(message)
+            if regressions:
+                raise CommandError(
+                    f'{len(regressions)} regressions against '
+                    f'{options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    def run_all(self, options) -> list:
+        # The test client sends requests for the `testserver` host.
+        with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            if options['no_seed']:
+                return self.run(options, sizes=[None])
+
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False)
+            try:
+                return self.run(options, sizes=sorted(options['sizes']))
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options, sizes) -> list:
+        results = []
+        self.stdout.write(
+            f'{"endpoint":<12} {"mode":<5} {"size":>7} {"conc":>4} '
+            f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8} '
+            f'{"queries":>7} {"errors":>6}')
+        for size in sizes:
+            if size is not None:
+                seed_reviews(size)
+            target = get_target()
+            for concurrency in options['concurrency']:
+                for endpoint in options['endpoints']:
+                    for mode in options['modes']:
+                        result = run_endpoint(
+                            endpoint, ENDPOINTS[endpoint](target),
+                            options['requests'], concurrency,
+                            size=size or 0, warmup=options['warmup'],
+                            mode=mode)
+                        results.append(result)
+                        self.write_result(result)
+        return results
+
+    def write_result(self, result) -> None:
+        self.stdout.write(
+            f'{result.endpoint:<12} {result.mode:<5} {result.size:>7} '
+            f'{result.concurrency:>4} {result.p50:>8.1f} '
+            f'{result.p95:>8.1f} {result.p99:>8.1f} '
+            f'{result.requests_per_second:>8.1f} '
+            f'{result.queries_per_request:>7.1f} {result.errors:>6}')
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from review.models import Review, Category
+from review.renditions import RENDITION_WIDTHS, generate_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the resized and WebP renditions of every review main "
+        "image and category background, e.g. for existing uploads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of images processed in parallel.')
+
+    def handle(self, *args, **options):
+        jobs = []
+        for model, field in (
+                (Review, 'main_image'), (Category, 'category_background')):
+            names = model.objects.exclude(**{field: ''}).exclude(
+                **{f'{field}__isnull': True}).values_list(field, flat=True)
+            storage = model._meta.get_field(field).storage
+            jobs.extend(
+                (storage, name, RENDITION_WIDTHS[field])
+                for name in names.iterator())
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(
+                lambda job: generate_renditions(*job), jobs))
+
+        created = sum(1 for renditions in results if renditions)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated renditions for {created} of {len(jobs)} images'))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from review.synthetic import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic dataset of users, categories, reviews, "
+        "topics, comments and likes with skewed popularity, building the "
+        "rows in a process pool and loading them in large batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument(
+            '--topics-per-review', type=float, default=2.0,
+            help='Average number of topics of a review.')
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--likes', type=int, default=100000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Seed of the generated data.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of worker processes, by default one per CPU. '
+                 '1 builds the rows in this process.')
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=SyntheticDataGenerator.batch_size,
+            help='Approximate number of rows written per statement.')
+        parser.add_argument(
+            '--no-index', action='store_true',
+            help='Do not build the search index of the new reviews.')
+
+    def handle(self, *args, **options):
+        try:
+            generator = SyntheticDataGenerator(
+                users=options['users'],
+                categories=options['categories'],
+                reviews=options['reviews'],
+                topics_per_review=options['topics_per_review'],
+                comments=options['comments'],
+                likes=options['likes'],
+                seed=options['seed'],
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                index=not options['no_index'],
+                progress=self.report_progress)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        counts = generator.run()
+        self.stdout.write(self.style.SUCCESS('Generated ' + ', '.join(
+            f'{count} {name}' for name, count in counts.items())))
+
+    def report_progress(self, name, count, elapsed):
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(f'{name}: {count} rows ({rate:.0f} rows/s)')
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from review.importers import ReviewCSVImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports reviews from a CSV file in fixed-size transactional "
+        "batches, streaming the file instead of loading it into memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the CSV file.')
+        parser.add_argument(
+            '--batch-size', type=int, default=ReviewCSVImporter.batch_size,
+            help='Number of reviews inserted per transaction.')
+        parser.add_argument(
+            '--encoding', default='utf-8-sig',
+            help='Encoding of the CSV file.')
+        parser.add_argument(
+            '--max-errors', type=int, default=ReviewCSVImporter.max_errors,
+            help='Number of rejected rows listed in the report.')
+
+    def handle(self, *args, **options):
+        importer = ReviewCSVImporter(
+            batch_size=options['batch_size'],
+            max_errors=options['max_errors'],
+            progress=self.report_progress)
+        try:
+            with open(options['path'], encoding=options['encoding'],
+                      newline='') as csv_file:
+                result = importer.import_file(csv_file)
+        except OSError as exc:
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+
+        for line, message in result.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(
+                f'... and {result.error_count - len(result.errors)} '
+                f'more errors')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} of {result.rows} reviews in '
+            f'{result.elapsed:.1f}s ({result.rows_per_second:.0f} rows/s), '
+            f'{result.error_count} rejected'))
+
+    def report_progress(self, result):
+        self.stdout.write(
+            f'Read {result.rows} rows, imported {result.created} '
+            f'({result.rows_per_second:.0f} rows/s)...')
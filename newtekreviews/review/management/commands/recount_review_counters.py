@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from review.caching import bump_generation
+from review.counters import refresh_category_counts, refresh_review_counts
+from review.models import Review, Category
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the stored like, comment and published review "
+        "counters from the underlying rows to fix drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Number of reviews recounted per UPDATE statement.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        review_ids = Review.objects.order_by('pk').values_list(
+            'pk', flat=True)
+        updated = 0
+        last_id = 0
+
+        # Recount in primary key ranges so that a single statement never
+        # locks the whole table.
+        while True:
+            batch = list(review_ids.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                updated += refresh_review_counts(batch)
+            last_id = batch[-1]
+            self.stdout.write(f'Recounted {updated} reviews...')
+
+        categories = refresh_category_counts()
+        bump_generation(Review)
+        bump_generation(Category)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted {updated} reviews and {categories} categories'))
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by().values(field)
+            .annotate(count=Count('*')).values('count')
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Review = apps.get_model('review', 'Review')
+    Category = apps.get_model('review', 'Category')
+    Comment = apps.get_model('review', 'Comment')
+
+    Review.objects.update(
+        likes_count=count_subquery(
+            Review.likes.through.objects.all(), 'review'),
+        comments_count=count_subquery(Comment.objects.all(), 'review'),
+    )
+    Category.objects.update(
+        published_reviews_count=count_subquery(
+            Review.objects.filter(is_published=True), 'category'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0008_review_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_reviews_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Published reviews'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Comments'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Likes'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
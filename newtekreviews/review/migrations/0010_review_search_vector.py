@@ -0,0 +1,83 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:37
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX review_review_search_vector_gin
+    ON review_review USING gin (search_vector)
+    """,
+    """
+    UPDATE review_review SET search_vector =
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(
+                topic.review_topic_title || ' ' || topic.text_content, ' ')
+            FROM review_reviewtopic topic
+            WHERE topic.review_id = review_review.id
+        ), '')), 'C')
+    """,
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS review_review_search_vector_gin",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE review_search USING fts5(
+        title, description, topics, tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    INSERT INTO review_search (rowid, title, description, topics)
+    SELECT review.id, review.title, review.description, coalesce((
+        SELECT group_concat(
+            topic.review_topic_title || ' ' || topic.text_content, ' ')
+        FROM review_reviewtopic topic
+        WHERE topic.review_id = review.id
+    ), '')
+    FROM review_review review
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS review_search",
+]
+
+
+def run_vendor_sql(statements):
+    """
+    Returns a RunPython function executing the statements registered
+    for the vendor of the current database connection.
+    """
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0009_review_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_vendor_sql({
+                'postgresql': POSTGRES_FORWARD,
+                'sqlite': SQLITE_FORWARD,
+            }),
+            run_vendor_sql({
+                'postgresql': POSTGRES_BACKWARD,
+                'sqlite': SQLITE_BACKWARD,
+            }),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:05
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Django compiles `icontains` on PostgreSQL to
+# `UPPER("column"::text) LIKE UPPER(%s)`, so the indexes are built on the
+# same expression, otherwise the planner cannot use them.
+TRIGRAM_INDEXES = [
+    ('review_review_title_trgm', 'review_review', 'title'),
+    ('review_review_description_trgm', 'review_review', 'description'),
+    ('review_category_name_trgm', 'review_category', 'name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('review', '0010_review_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-17 02:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0011_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ['-time_created', '-id'], 'verbose_name': 'Review', 'verbose_name_plural': 'Reviews'},
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-time_created', '-id'], name='review_time_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['is_published', '-time_created', '-id'], name='review_published_time_id_idx'),
+        ),
+    ]
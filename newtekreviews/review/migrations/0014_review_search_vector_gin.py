@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:55
+
+import review.models
+from django.conf import settings
+from django.db import migrations
+
+
+LEGACY_INDEX = 'review_review_search_vector_gin'
+
+
+def drop_legacy_index(apps, schema_editor):
+    # Created with raw SQL by 0010, and replaced by the declared index.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {LEGACY_INDEX}')
+
+
+def create_legacy_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {LEGACY_INDEX} '
+            f'ON review_review USING gin (search_vector)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0013_comment_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_legacy_index, create_legacy_index),
+        migrations.AddIndex(
+            model_name='review',
+            index=review.models.PostgresGinIndex(fields=['search_vector'], name='review_search_vector_gin'),
+        ),
+    ]
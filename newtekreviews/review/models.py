@@ -1,12 +1,31 @@
 from django.db import models
-from django.utils.text import slugify
-from django.utils.crypto import get_random_string
+from django.db.backends.ddl_references import Statement
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinLengthValidator, MaxLengthValidator
 from django.urls import reverse
 
 from .services import (
     validate_image_size, get_path_for_uploading_review_main_image)
+from .slugs import save_with_unique_slug
+
+
+class PostgresGinIndex(GinIndex):
+    """
+    A GIN index, created on PostgreSQL only. Other databases have no GIN
+    indexes and search with their own index, see search.py.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement('')
+        return super().create_sql(model, schema_editor, using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return Statement('')
+        return super().remove_sql(model, schema_editor, **kwargs)
 
 
 class PublishedManager(models.Manager):
@@ -56,6 +75,10 @@ class Review(models.Model):
         is_published (BooleanField): Whether the review is published or not.
         author (ForeignKey): The user who wrote the review.
         category (ForeignKey): The category the review belongs to.
+        likes_count (int): Stored number of likes, maintained on write.
+        comments_count (int): Stored number of comments, maintained on write.
+        search_vector (SearchVectorField): Weighted full-text document of the
+            title, description and topics (PostgreSQL only).
 
     Status:
         DRAFT (0): The review is a draft.
@@ -115,45 +138,86 @@ class Review(models.Model):
         )
     likes = models.ManyToManyField(
         get_user_model(), blank=True, related_name='liked_reviews')
+    likes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Likes")
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Comments")
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     objects = models.Manager()  # Review.objects.all()
     published = PublishedManager()  # Review.published.all()
     archived = ArchivedManager()  # Review.archived.all()
 
+    # Columns written by counter and index queries, never by save().
+    MAINTAINED_FIELDS = ('likes_count', 'comments_count', 'search_vector')
+
     class Meta:
         verbose_name = "Review"
         verbose_name_plural = "Reviews"
-        ordering = ["-time_created"]
+        ordering = ["-time_created", "-id"]
+        indexes = [
+            # Keyset pagination of the API and of the review lists.
+            models.Index(
+                fields=["-time_created", "-id"],
+                name="review_time_created_id_idx"),
+            models.Index(
+                fields=["is_published", "-time_created", "-id"],
+                name="review_published_time_id_idx"),
+            # Full-text search, see search.py.
+            PostgresGinIndex(
+                fields=["search_vector"], name="review_search_vector_gin"),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the publication state the review was loaded with, so
+        that the category counters can be adjusted when it changes.
+        """
+        instance = super().from_db(db, field_names, values)
+        if 'is_published' in field_names and 'category_id' in field_names:
+            instance._counted_state = instance.get_counted_state()
+        return instance
+
+    def get_counted_state(self):
+        """
+        Returns the (is_published, category_id) pair that decides which
+        category counts this review.
+        """
+        return bool(self.is_published), self.category_id
+
     def total_likes(self):
         """
-        Calculates the total number of likes for this review.
+        Returns the total number of likes for this review.
 
         Returns:
-            int: The number of likes associated with this review.
+            int: The stored number of likes associated with this review.
         """
-        return self.likes.count()
+        return self.likes_count
 
     def save(self, *args, **kwargs):
         """
         Saves the Review instance.
-        If the slug is not set, it generates a unique slug
-        based on the review's title.
-        It appends a random string to the base
-        slug if a slug collision is detected, ensuring uniqueness.
+        If the slug is not set, a unique slug is allocated from the
+        review's title, with a numeric suffix if the title is taken.
+        The save is retried with a new slug if a concurrent writer
+        takes the allocated one.
+
+        Saving an existing review leaves out the columns maintained with
+        queries, so a stale instance does not undo a like, a comment or
+        a reindex that happened since it was loaded.
         """
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-
-            while Review.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{get_random_string(6)}"
-
-            self.slug = slug
-        super().save(*args, **kwargs)
+        if not self._state.adding and not kwargs.get('force_insert') and \
+                kwargs.get('update_fields') is None and not args:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.MAINTAINED_FIELDS]
+        save_with_unique_slug(
+            self, self.title, lambda: super(Review, self).save(*args, **kwargs))
 
     def get_absolute_url(self):
         return reverse('review:review', kwargs={'review_slug': self.slug})
@@ -176,7 +240,7 @@ class ReviewTopic(models.Model):
         save: Saves the topic instance,
             generating a unique slug if not already set,
             and ensuring uniqueness by
-            appending a random string if a slug collision is detected.
+            appending a numeric suffix if the slug is taken.
         get_absolute_url: Returns the absolute URL of the topic.
     """
     review = models.ForeignKey(
@@ -214,19 +278,18 @@ class ReviewTopic(models.Model):
 
     def save(self, *args, **kwargs):
         """
-        Saves the ReviewTopic instance. If the slug is not set, it generates a unique
-        slug based on the review's title and the topic's title. It appends a random
-        string to the base slug if a slug collision is detected, ensuring uniqueness.
+        Saves the ReviewTopic instance. If the slug is not set, a unique slug
+        is allocated from the review's title and the topic's title.
+        The save is retried with a new slug if a concurrent writer
+        takes the allocated one.
         """
-        if not self.slug:
-            base_slug = slugify(f"{self.review.title}-{self.review_topic_title}")
-            slug = base_slug
+        save_with_unique_slug(
+            self, self.get_slug_text(),
+            lambda: super(ReviewTopic, self).save(*args, **kwargs))
 
-            while ReviewTopic.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{get_random_string(6)}"
-
-            self.slug = slug
-        super().save(*args, **kwargs)
+    def get_slug_text(self) -> str:
+        """Returns the text the slug of the topic is made from."""
+        return f"{self.review.title}-{self.review_topic_title}"
 
     def get_absolute_url(self):
         return reverse('review:topic', kwargs={'topic_slug': self.slug})
@@ -243,6 +306,14 @@ class Comment(models.Model):
     text = models.TextField(verbose_name="Comment")
     time_created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the comments of a review, newest first.
+            models.Index(
+                fields=["review", "-time_created", "-id"],
+                name="comment_review_time_id_idx"),
+        ]
+
 
 class Category(models.Model):
     name = models.CharField(
@@ -253,6 +324,8 @@ class Category(models.Model):
         blank=True, null=True,
         verbose_name="Background"
     )
+    published_reviews_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Published reviews")
 
     class Meta:
         verbose_name = "Category"
@@ -262,10 +335,9 @@ class Category(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-
-        super().save(*args, **kwargs)
+        save_with_unique_slug(
+            self, self.name,
+            lambda: super(Category, self).save(*args, **kwargs))
 
     def get_absolute_url(self):
         return reverse('review:category', kwargs={'category_slug': self.slug})
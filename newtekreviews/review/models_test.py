@@ -1,7 +1,14 @@
+from unittest import mock
+
+from django.db import IntegrityError
 from django.test import TestCase
 from django.utils.text import slugify
 from django.utils.crypto import get_random_string
 from .models import Review, ReviewTopic, Category
+from .slugs import (
+    allocate_slugs, assign_slugs, bulk_create_with_unique_slugs,
+    save_with_unique_slug)
+from .utils import update_slug
 
 
 class ReviewModelTest(TestCase):
@@ -85,3 +92,77 @@ class CategoryModelTest(TestCase):
 
     def test_category_str_method(self):
         self.assertEqual(str(self.category), "Test Category")
+
+
+class SlugAllocationTest(TestCase):
+    def setUp(self):
+        self.review = Review.objects.create(title="Test Review")
+
+    def test_numeric_suffixes_in_one_query(self):
+        reviews = [Review(title="Test Review") for _ in range(3)]
+        with self.assertNumQueries(1):
+            assign_slugs(reviews, [review.title for review in reviews])
+        self.assertEqual(
+            [review.slug for review in reviews],
+            ["test-review-2", "test-review-3", "test-review-4"])
+
+    def test_slugs_sharing_a_prefix_are_not_read(self):
+        for slug in ("phone", "phone-2", "phone-case", "phones"):
+            Review.objects.create(title=slug, slug=slug)
+        queryset = Review.objects.all()
+        with mock.patch.object(
+                Review._default_manager, 'filter',
+                wraps=queryset.filter) as filter_:
+            self.assertEqual(allocate_slugs(Review, ["Phone"]), ["phone-3"])
+        read = Review.objects.filter(*filter_.call_args.args).values_list(
+            'slug', flat=True)
+        self.assertEqual(sorted(read), ["phone", "phone-2"])
+
+    def test_save_retries_when_slug_is_taken(self):
+        review = Review(title="Race")
+        assign_slugs([review], [review.title])
+        # A concurrent writer takes the slug before this review is saved.
+        Review.objects.create(title="Other", slug=review.slug)
+        review.save()
+        self.assertEqual(review.slug, "race-2")
+
+    def test_other_integrity_errors_are_not_retried(self):
+        # The review keeps its allocated slug, which only it has.
+        save = mock.Mock(side_effect=IntegrityError('CHECK failed'))
+        with self.assertRaises(IntegrityError):
+            save_with_unique_slug(self.review, self.review.title, save)
+        save.assert_called_once()
+        self.assertEqual(self.review.slug, "test-review")
+
+    def test_explicit_slug_is_not_replaced(self):
+        review = Review(title="Other", slug=self.review.slug)
+        with self.assertRaises(IntegrityError):
+            review.save()
+
+    def test_bulk_create_retries_when_slug_is_taken(self):
+        reviews = [Review(title="Bulk"), Review(title="Bulk")]
+        original_allocate = allocate_slugs
+        calls = []
+
+        def allocate_then_race(*args, **kwargs):
+            slugs = original_allocate(*args, **kwargs)
+            if not calls:
+                Review.objects.create(title="Other", slug=slugs[0])
+            calls.append(slugs)
+            return slugs
+
+        with mock.patch('review.slugs.allocate_slugs', allocate_then_race):
+            bulk_create_with_unique_slugs(
+                Review, reviews, [review.title for review in reviews])
+        self.assertEqual(
+            [review.slug for review in reviews], ["bulk-2", "bulk-3"])
+
+    def test_update_slug_may_reuse_own_slug(self):
+        renamed = Review.objects.get(pk=self.review.pk)
+        renamed.title = "Test  review"
+        self.assertEqual(update_slug(self.review, renamed), "test-review")
+
+    def test_category_slug_is_unique(self):
+        Category.objects.create(name="Phones")
+        self.assertEqual(
+            Category.objects.create(name="Phones").slug, "phones-2")
@@ -0,0 +1,328 @@
+import base64
+import binascii
+import json
+
+from django.core.cache import cache
+from django.db.models import BooleanField, Expression, F, Value
+
+from .caching import (
+    LIST_CACHE_TIMEOUT, amake_list_cache_key, make_list_cache_key)
+
+
+class RowValueComparison(Expression):
+    """
+    A `(a, b, ...) < (x, y, ...)` row value comparison.
+
+    PostgreSQL and SQLite evaluate it as one condition that can be
+    answered by a single range scan of a composite index, unlike the
+    equivalent `a < x OR (a = x AND b < y)` chain.
+    """
+    output_field = BooleanField()
+    conditional = True
+
+    def __init__(self, lhs, operator: str, rhs):
+        super().__init__()
+        self.lhs = list(lhs)
+        self.operator = operator
+        self.rhs = list(rhs)
+
+    def get_source_expressions(self):
+        return self.lhs + self.rhs
+
+    def set_source_expressions(self, exprs):
+        self.lhs = list(exprs[:len(self.lhs)])
+        self.rhs = list(exprs[len(self.lhs):])
+
+    def as_sql(self, compiler, connection):
+        sqls, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        size = len(self.lhs)
+        return (
+            f'({", ".join(sqls[:size])}) {self.operator} '
+            f'({", ".join(sqls[size:])})',
+            params
+        )
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """
+    A page of keyset-paginated objects.
+
+    Attributes:
+        object_list (list): The objects of the page.
+        has_next (bool): Whether objects follow this page.
+        has_previous (bool): Whether objects precede this page.
+        next_cursor (str): Token of the following page, or None.
+        previous_cursor (str): Token of the preceding page, or None.
+    """
+
+    def __init__(self, object_list, has_next, has_previous,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor if has_next else None
+        self.previous_cursor = previous_cursor if has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+    def get_state(self) -> dict:
+        """Returns a cacheable description of the page."""
+        return {
+            'pks': [obj.pk for obj in self.object_list],
+            'has_next': self._has_next,
+            'has_previous': self._has_previous,
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+        }
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by the values of its ordering columns instead of
+    OFFSET, so every page costs one index range scan regardless of depth.
+
+    The ordering of the queryset is used when it has one, otherwise
+    the model's `Meta.ordering`. The primary key is appended as a
+    tie-breaker, and all ordering columns must have the same direction.
+
+    Cursors are opaque url-safe tokens holding the ordering values of the
+    first or last object of a page and the direction to read in.
+    """
+    def __init__(self, queryset, per_page: int, ordering=None):
+        self.per_page = per_page
+        ordering = list(
+            ordering or queryset.query.order_by
+            or queryset.model._meta.ordering)
+        names = [field.lstrip('-') for field in ordering]
+        self.descending = ordering[0].startswith('-')
+
+        if 'id' not in names and 'pk' not in names:
+            ordering.append('-id' if self.descending else 'id')
+            names.append('id')
+        if any(field.startswith('-') != self.descending
+               for field in ordering):
+            raise ValueError(
+                'Keyset pagination requires a single ordering direction.')
+
+        self.fields = names
+        self.queryset = queryset.order_by(*ordering)
+
+    # Cursors
+
+    def _get_output_field(self, name):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, obj, backwards: bool) -> str:
+        values = []
+        for name in self.fields:
+            # Rows of a values() queryset are dicts.
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = json.dumps({'v': values, 'b': backwards})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str):
+        """
+        Returns the (values, backwards) pair stored in a cursor.
+
+        Raises:
+            InvalidCursor: If the cursor was not produced by this paginator.
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded))
+            values = payload['v']
+            backwards = bool(payload['b'])
+            if len(values) != len(self.fields):
+                raise InvalidCursor('Invalid cursor.')
+            values = [
+                self._get_output_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, KeyError, binascii.Error) as exc:
+            raise InvalidCursor('Invalid cursor.') from exc
+        return values, backwards
+
+    # Pages
+
+    def get_page(self, cursor: str | None = None) -> KeysetPage:
+        """
+        Returns the page following (or, for a backwards cursor, preceding)
+        the cursor position. An empty or invalid cursor returns the
+        first page.
+        """
+        queryset, values, backwards = self._get_page_queryset(cursor)
+        return self._make_page(list(queryset), values, backwards)
+
+    async def aget_page(self, cursor: str | None = None) -> KeysetPage:
+        """Async version of `get_page()`."""
+        queryset, values, backwards = self._get_page_queryset(cursor)
+        return self._make_page(
+            [obj async for obj in queryset], values, backwards)
+
+    def _get_page_queryset(self, cursor):
+        try:
+            values, backwards = self.decode_cursor(cursor) \
+                if cursor else (None, False)
+        except InvalidCursor:
+            values, backwards = None, False
+
+        queryset = self.queryset
+        if values is not None:
+            # Reading forwards means continuing in the ordering direction.
+            operator = '<' if self.descending != backwards else '>'
+            queryset = queryset.filter(RowValueComparison(
+                [F(name) for name in self.fields], operator,
+                [Value(value, output_field=self._get_output_field(name))
+                 for name, value in zip(self.fields, values)]
+            ))
+        if backwards:
+            queryset = queryset.reverse()
+        return queryset[:self.per_page + 1], values, backwards
+
+    def _make_page(self, rows, values, backwards) -> KeysetPage:
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            rows, has_next, has_previous,
+            next_cursor=self.encode_cursor(rows[-1], False) if rows else None,
+            previous_cursor=self.encode_cursor(rows[0], True)
+            if rows else None,
+        )
+
+    def page_from_state(self, state: dict) -> KeysetPage:
+        """
+        Rebuilds a page from `KeysetPage.get_state()`, loading the objects
+        by primary key.
+        """
+        return self._page_from_objects(
+            state, self.queryset.in_bulk(state['pks']))
+
+    async def apage_from_state(self, state: dict) -> KeysetPage:
+        """Async version of `page_from_state()`."""
+        return self._page_from_objects(
+            state, await self.queryset.ain_bulk(state['pks']))
+
+    @staticmethod
+    def _page_from_objects(state: dict, objects: dict) -> KeysetPage:
+        return KeysetPage(
+            [objects[pk] for pk in state['pks'] if pk in objects],
+            state['has_next'], state['has_previous'],
+            state['next_cursor'], state['previous_cursor'])
+
+
+class KeysetPaginationMixin:
+    """
+    A ListView mixin replacing page number pagination with keyset
+    pagination driven by the `cursor` GET parameter.
+
+    When `cache_prefix` is set, the primary keys and cursors of each page
+    are cached under the generation of `cache_models`, so a repeated
+    request only loads the rows of the page by primary key.
+
+    XMLHttpRequests are rendered with `fragment_template_name`, which
+    holds only the items of the page for infinite scrolling.
+    """
+    cursor_query_param = 'cursor'
+    fragment_template_name = None
+    cache_prefix = None
+    cache_models = ()
+    cache_timeout = LIST_CACHE_TIMEOUT
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        cursor = self.request.GET.get(self.cursor_query_param)
+
+        if not self.cache_prefix:
+            page = paginator.get_page(cursor)
+        else:
+            key = make_list_cache_key(
+                f'keyset:{self.cache_prefix}', self.request.GET,
+                *self.cache_models)
+            state = cache.get(key)
+            if state is None:
+                page = paginator.get_page(cursor)
+                cache.set(key, page.get_state(), self.cache_timeout)
+            else:
+                page = paginator.page_from_state(state)
+
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """Async version of `paginate_queryset()`."""
+        paginator = KeysetPaginator(queryset, page_size)
+        cursor = self.request.GET.get(self.cursor_query_param)
+
+        if not self.cache_prefix:
+            page = await paginator.aget_page(cursor)
+        else:
+            key = await amake_list_cache_key(
+                f'keyset:{self.cache_prefix}', self.request.GET,
+                *self.cache_models)
+            state = await cache.aget(key)
+            if state is None:
+                page = await paginator.aget_page(cursor)
+                await cache.aset(key, page.get_state(), self.cache_timeout)
+            else:
+                page = await paginator.apage_from_state(state)
+
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_template_names(self):
+        if self.fragment_template_name and self.request.headers.get(
+                'X-Requested-With') == 'XMLHttpRequest':
+            return [self.fragment_template_name]
+        return super().get_template_names()
+
+    def get_page_url(self, cursor: str | None) -> str | None:
+        """
+        Returns the query string of the page at `cursor`,
+        keeping the other GET parameters.
+        """
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        params[self.cursor_query_param] = cursor
+        return '?' + params.urlencode()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context['page_obj']
+        context['next_page_url'] = self.get_page_url(page.next_cursor)
+        context['previous_page_url'] = self.get_page_url(
+            page.previous_cursor)
+        return context
@@ -0,0 +1,228 @@
+import logging
+import posixpath
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .caching import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Widths generated for each image field, in pixels.
+RENDITION_WIDTHS = {
+    'main_image': (320, 640, 1280),
+    'category_background': (480, 960, 1920),
+}
+RENDITION_DIR = 'renditions'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Availability of the renditions of a file, cached by file name.
+RENDITIONS_CACHE_KEY = 'renditions:{name}'
+RENDITIONS_CACHE_TIMEOUT = 60 * 60 * 24
+# Changes whenever new renditions become available, which changes the
+# representations exposing them.
+RENDITIONS_VERSION_KEY = 'renditions:version'
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def get_rendition_name(name: str, width: int, fmt: str) -> str:
+    """
+    Returns the storage name of a rendition, in a `renditions` folder
+    next to the original, e.g.
+    `review_main_images/Phone/renditions/photo.jpg-640w.webp`.
+
+    The name keeps the extension of the original, so `photo.jpg` and
+    `photo.png` in the same folder have distinct renditions.
+    """
+    folder, filename = posixpath.split(name)
+    extension = 'jpg' if fmt == 'jpeg' else fmt
+    return posixpath.join(
+        folder, RENDITION_DIR, f'{filename}-{width}w.{extension}')
+
+
+def get_fallback_format(image) -> str:
+    """Returns 'png' for images with transparency, otherwise 'jpeg'."""
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+    return 'png' if has_alpha else 'jpeg'
+
+
+def _encode(image, fmt: str) -> bytes:
+    buffer = BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif fmt == 'jpeg':
+        image.convert('RGB').save(
+            buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True,
+            progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def generate_renditions(storage, name: str, widths) -> dict:
+    """
+    Writes the resized WebP and fallback renditions of an image.
+
+    Images are never upscaled: widths larger than the original produce
+    a single rendition at the original width.
+
+    Returns:
+        dict: The available renditions as {format: [(width, name), ...]}.
+    """
+    try:
+        with storage.open(name, 'rb') as file:
+            image = Image.open(file)
+            image.load()
+    except (OSError, UnidentifiedImageError) as exc:
+        logger.warning('Cannot create renditions of %s: %s', name, exc)
+        # Remember the failure, so the file is not queued on every view.
+        cache.set(
+            RENDITIONS_CACHE_KEY.format(name=name), {},
+            RENDITIONS_CACHE_TIMEOUT)
+        return {}
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert(
+            'RGBA' if get_fallback_format(image) == 'png' else 'RGB')
+    fallback = get_fallback_format(image)
+
+    targets = sorted({min(width, image.width) for width in widths})
+    renditions = {'webp': [], fallback: []}
+    for width in targets:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize(
+            (width, height), Image.Resampling.LANCZOS)
+        for fmt in renditions:
+            rendition_name = get_rendition_name(name, width, fmt)
+            if storage.exists(rendition_name):
+                storage.delete(rendition_name)
+            storage.save(rendition_name, ContentFile(_encode(resized, fmt)))
+            renditions[fmt].append((width, rendition_name))
+
+    cache.set(
+        RENDITIONS_CACHE_KEY.format(name=name), renditions,
+        RENDITIONS_CACHE_TIMEOUT)
+    bump_version(RENDITIONS_VERSION_KEY)
+    return renditions
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'RENDITION_WORKERS', 2),
+                thread_name_prefix='renditions')
+        return _executor
+
+
+def _run(storage, name: str, widths) -> None:
+    try:
+        generate_renditions(storage, name, widths)
+    except Exception:
+        logger.exception('Rendition of %s failed', name)
+    finally:
+        with _executor_lock:
+            _pending.discard(name)
+
+
+def schedule_renditions(fieldfile, widths) -> None:
+    """
+    Generates the renditions of `fieldfile` in the worker pool once the
+    current transaction commits. A file is only queued once at a time.
+
+    Pillow releases the GIL while resizing and encoding, so a thread
+    pool uses several cores without the cost of worker processes.
+    """
+    if not fieldfile:
+        return
+    storage, name = fieldfile.storage, fieldfile.name
+
+    def submit():
+        with _executor_lock:
+            if name in _pending:
+                return
+            _pending.add(name)
+        _get_executor().submit(_run, storage, name, widths)
+
+    transaction.on_commit(submit)
+
+
+def get_renditions(fieldfile, widths) -> dict:
+    """
+    Returns the available renditions of `fieldfile` as
+    {format: [(width, url), ...]}.
+
+    Availability is cached per file name. When the renditions are
+    missing, for example for images uploaded before the pipeline
+    existed, they are scheduled for generation and an empty dict is
+    returned, so that callers fall back to the original image.
+    """
+    if not fieldfile:
+        return {}
+    storage, name = fieldfile.storage, fieldfile.name
+    key = RENDITIONS_CACHE_KEY.format(name=name)
+
+    renditions = cache.get(key)
+    if renditions is None:
+        renditions = _find_renditions(storage, name)
+        if not renditions:
+            schedule_renditions(fieldfile, widths)
+            return {}
+        cache.set(key, renditions, RENDITIONS_CACHE_TIMEOUT)
+
+    return {
+        fmt: [(width, storage.url(rendition)) for width, rendition in items]
+        for fmt, items in renditions.items()
+    }
+
+
+def _find_renditions(storage, name: str) -> dict:
+    """Looks up renditions that exist in the storage but not the cache."""
+    folder, filename = posixpath.split(name)
+    pattern = re.compile(rf'{re.escape(filename)}-(\d+)w\.(webp|jpg|png)')
+    try:
+        _, files = storage.listdir(posixpath.join(folder, RENDITION_DIR))
+    except (FileNotFoundError, NotImplementedError):
+        return {}
+
+    renditions = {}
+    for file in files:
+        match = pattern.fullmatch(file)
+        if match:
+            width, extension = int(match[1]), match[2]
+            fmt = 'jpeg' if extension == 'jpg' else extension
+            renditions.setdefault(fmt, []).append(
+                (width, posixpath.join(folder, RENDITION_DIR, file)))
+    if 'webp' not in renditions:
+        return {}
+    return {fmt: sorted(items) for fmt, items in renditions.items()}
+
+
+def ensure_renditions(fieldfile, widths) -> None:
+    """
+    Schedules the renditions of a saved file unless they are known,
+    which is the case for a file that did not change.
+    """
+    if fieldfile and cache.get(
+            RENDITIONS_CACHE_KEY.format(name=fieldfile.name)) is None:
+        schedule_renditions(fieldfile, widths)
+
+
+def get_srcset(renditions: dict, fmt: str) -> str:
+    """Formats the renditions of one format as a `srcset` value."""
+    return ', '.join(
+        f'{url} {width}w' for width, url in renditions.get(fmt, ()))
@@ -0,0 +1,300 @@
+import hashlib
+import re
+import threading
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector)
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Concat
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .caching import LIST_CACHE_TIMEOUT, aget_generation, get_generation
+from .models import Review, ReviewTopic
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'review_search'
+
+# Rank weights of the title, description and topics columns (FTS5 bm25).
+FTS_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Control characters mark the matches in headlines before escaping, so
+# that the indexed text can never inject markup into the result page.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_indexing():
+    """
+    Collects the reviews passed to `index_reviews` inside the block and
+    indexes each of them once when the block exits, so that bulk topic
+    writes and deletes do not reindex the review once per topic.
+    """
+    if getattr(_deferred, 'review_ids', None) is not None:
+        yield  # Nested blocks are flushed by the outermost one.
+        return
+    _deferred.review_ids = set()
+    try:
+        yield
+        review_ids = _deferred.review_ids
+    finally:
+        _deferred.review_ids = None
+    index_reviews(review_ids)
+
+
+def _get_topics_text(review_ids) -> dict:
+    """Returns the concatenated topic titles and texts per review id."""
+    topics = {}
+    for review_id, title, text in ReviewTopic.objects.filter(
+            review_id__in=review_ids).values_list(
+                'review_id', 'review_topic_title', 'text_content'):
+        topics.setdefault(review_id, []).extend((title, text))
+    return {
+        review_id: ' '.join(parts) for review_id, parts in topics.items()
+    }
+
+
+def index_reviews(review_ids) -> None:
+    """
+    Updates the full-text index of the given reviews.
+
+    On PostgreSQL the weighted `Review.search_vector` column is rebuilt,
+    on SQLite the rows of the FTS5 table are replaced. Other backends
+    have no index and fall back to substring lookups. Inside
+    `deferred_indexing()` the reviews are only collected.
+    """
+    review_ids = list(review_ids)
+    if not review_ids:
+        return
+    if getattr(_deferred, 'review_ids', None) is not None:
+        _deferred.review_ids.update(review_ids)
+        return
+    if connection.vendor == 'postgresql':
+        # One statement for all the reviews, with the topics aggregated
+        # by a correlated subquery.
+        topics = ReviewTopic.objects.filter(
+            review=OuterRef('pk')).order_by().values('review').annotate(
+                text=StringAgg(
+                    Concat('review_topic_title', Value(' '), 'text_content'),
+                    ' ')).values('text')
+        Review.objects.filter(pk__in=review_ids).update(
+            search_vector=(
+                SearchVector('title', weight='A', config=SEARCH_CONFIG)
+                + SearchVector(
+                    'description', weight='B', config=SEARCH_CONFIG)
+                + SearchVector(
+                    Subquery(topics), weight='C', config=SEARCH_CONFIG)
+            )
+        )
+    elif connection.vendor == 'sqlite':
+        topics = _get_topics_text(review_ids)
+        rows = Review.objects.filter(pk__in=review_ids).values_list(
+            'pk', 'title', 'description')
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(review_id,) for review_id in review_ids])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} '
+                f'(rowid, title, description, topics) '
+                f'VALUES (%s, %s, %s, %s)',
+                [(pk, title, description, topics.get(pk, ''))
+                 for pk, title, description in rows])
+
+
+def unindex_review(review_id) -> None:
+    """Removes a deleted review from the SQLite FTS5 table."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [review_id])
+
+
+def _make_headline(text: str) -> str:
+    """Escapes a headline and turns the match markers into <mark> tags."""
+    return mark_safe(
+        escape(text or '')
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_STOP, '</mark>'))
+
+
+def _make_fts_query(query: str) -> str:
+    """
+    Converts user input to an FTS5 query matching every word,
+    the last one as a prefix. Quoting each word keeps FTS5 operators
+    and punctuation in the input from raising syntax errors.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class SearchResults:
+    """
+    Ranked full-text search results for published reviews.
+
+    The object supports `count()` and slicing, so it can be passed to
+    `django.core.paginator.Paginator`; only the requested slice is loaded
+    and given a `search_headline` attribute. Counts and slices are cached
+    under the generation of Review and ReviewTopic.
+    """
+
+    def __init__(self, query: str):
+        self.query = query.strip()
+
+    def _cache_key(self, suffix: str, generation: str = None) -> str:
+        digest = hashlib.md5(
+            self.query.encode(), usedforsecurity=False).hexdigest()
+        generation = generation or get_generation(Review, ReviewTopic)
+        return f'search:{generation}:{digest}:{suffix}'
+
+    async def _acache_key(self, suffix: str) -> str:
+        return self._cache_key(
+            suffix, await aget_generation(Review, ReviewTopic))
+
+    def count(self) -> int:
+        return cache.get_or_set(
+            self._cache_key('count'), self._count, LIST_CACHE_TIMEOUT)
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        hits = cache.get_or_set(
+            self._cache_key(f'{start}:{stop}'),
+            lambda: self._fetch(start, stop), LIST_CACHE_TIMEOUT)
+
+        reviews = Review.objects.select_related(
+            'category', 'author').in_bulk([pk for pk, _ in hits])
+        return self._attach_headlines(hits, reviews)
+
+    async def acount(self) -> int:
+        """Async version of `count()`."""
+        key = await self._acache_key('count')
+        count = await cache.aget(key)
+        if count is None:
+            # The backend specific queries use raw cursors, which have
+            # no async API.
+            count = await sync_to_async(self._count)()
+            await cache.aset(key, count, LIST_CACHE_TIMEOUT)
+        return count
+
+    async def aslice(self, start: int, stop: int) -> list:
+        """Async version of `self[start:stop]`."""
+        key = await self._acache_key(f'{start}:{stop}')
+        hits = await cache.aget(key)
+        if hits is None:
+            hits = await sync_to_async(self._fetch)(start, stop)
+            await cache.aset(key, hits, LIST_CACHE_TIMEOUT)
+
+        reviews = await Review.objects.select_related(
+            'category', 'author').ain_bulk([pk for pk, _ in hits])
+        return self._attach_headlines(hits, reviews)
+
+    @staticmethod
+    def _attach_headlines(hits, reviews: dict) -> list:
+        results = []
+        for pk, headline in hits:
+            if pk in reviews:
+                reviews[pk].search_headline = _make_headline(headline)
+                results.append(reviews[pk])
+        return results
+
+    # Backend specific queries
+
+    def _count(self) -> int:
+        if connection.vendor == 'postgresql':
+            return self._get_postgres_queryset().count()
+        if connection.vendor == 'sqlite':
+            fts_query = _make_fts_query(self.query)
+            if not fts_query:
+                return 0
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                    f'JOIN review_review ON review_review.id = '
+                    f'{FTS_TABLE}.rowid '
+                    f'WHERE {FTS_TABLE} MATCH %s '
+                    f'AND review_review.is_published',
+                    [fts_query])
+                return cursor.fetchone()[0]
+        return self._get_fallback_queryset().count()
+
+    def _fetch(self, start: int, stop: int) -> list:
+        """Returns a list of (review id, headline) pairs, best first."""
+        if connection.vendor == 'postgresql':
+            search_query = self._get_search_query()
+            queryset = self._get_postgres_queryset().annotate(
+                headline=SearchHeadline(
+                    'description', search_query, config=SEARCH_CONFIG,
+                    start_sel=HIGHLIGHT_START, stop_sel=HIGHLIGHT_STOP,
+                    max_words=35, min_words=15)
+            )
+            return list(queryset.values_list('pk', 'headline')[start:stop])
+
+        if connection.vendor == 'sqlite':
+            fts_query = _make_fts_query(self.query)
+            if not fts_query:
+                return []
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT {FTS_TABLE}.rowid, '
+                    f'snippet({FTS_TABLE}, -1, %s, %s, %s, 24) '
+                    f'FROM {FTS_TABLE} '
+                    f'JOIN review_review ON review_review.id = '
+                    f'{FTS_TABLE}.rowid '
+                    f'WHERE {FTS_TABLE} MATCH %s '
+                    f'AND review_review.is_published '
+                    f'ORDER BY bm25({FTS_TABLE}, %s, %s, %s), '
+                    f'review_review.time_created DESC '
+                    f'LIMIT %s OFFSET %s',
+                    [HIGHLIGHT_START, HIGHLIGHT_STOP, '…', fts_query,
+                     *FTS_WEIGHTS, -1 if stop is None else stop - start,
+                     start])
+                return [tuple(row) for row in cursor.fetchall()]
+
+        queryset = self._get_fallback_queryset()
+        return [
+            (pk, description[:200])
+            for pk, description in queryset.values_list(
+                'pk', 'description')[start:stop]
+        ]
+
+    def _get_search_query(self) -> SearchQuery:
+        return SearchQuery(
+            self.query, config=SEARCH_CONFIG, search_type='websearch')
+
+    def _get_postgres_queryset(self):
+        search_query = self._get_search_query()
+        return Review.published.filter(
+            search_vector=search_query
+        ).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-time_created')
+
+    def _get_fallback_queryset(self):
+        return Review.published.filter(
+            Q(title__icontains=self.query)
+            | Q(description__icontains=self.query)
+            | Q(topics__text_content__icontains=self.query)
+        ).distinct()
+
+
+def search_reviews(query: str) -> SearchResults:
+    """Returns the ranked published reviews matching `query`."""
+    return SearchResults(query)
@@ -0,0 +1,174 @@
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from .models import Review, ReviewTopic, Category, Comment
+from .caching import bump_generation, bump_review_version
+from .counters import (
+    adjust_category_counts, change_counter,
+    refresh_category_counts, refresh_review_counts)
+from .renditions import RENDITION_WIDTHS, ensure_renditions
+from .search import index_reviews, unindex_review
+from .sitemaps import invalidate_review_sitemap
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=ReviewTopic)
+@receiver(post_delete, sender=ReviewTopic)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_list_generation(sender, **kwargs):
+    """Invalidates the cached lists built from the changed model."""
+    bump_generation(sender)
+
+
+@receiver(post_save, sender=Review)
+def bump_review_version_on_save(sender, instance, **kwargs):
+    """Invalidates the cached fragments of the saved review."""
+    bump_review_version(instance.pk)
+
+
+@receiver(post_save, sender=ReviewTopic)
+@receiver(post_delete, sender=ReviewTopic)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_parent_review_version(sender, instance, **kwargs):
+    """
+    Invalidates the cached fragments of the review a topic or
+    a comment belongs to.
+    """
+    if instance.review_id:
+        bump_review_version(instance.review_id)
+
+
+@receiver(m2m_changed, sender=Review.likes.through)
+def collect_cleared_likes(sender, instance, action, reverse, **kwargs):
+    """
+    `clear()` called from the user side does not report the affected
+    reviews, so their ids are collected before the rows are removed.
+    """
+    if reverse and action == 'pre_clear':
+        instance._cleared_review_ids = list(
+            instance.liked_reviews.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Review.likes.through)
+def bump_review_version_on_likes(
+        sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidates the cached fragments of the liked reviews when likes
+    change. The cached lists hold primary keys and counts, which a like
+    does not change, so their generation is left alone.
+
+    When the likes are changed from the user side
+    (`user.liked_reviews.add(...)`), `instance` is the user and `pk_set`
+    holds the ids of the affected reviews.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        review_ids = [instance.pk]
+    elif action == 'post_clear':
+        review_ids = getattr(instance, '_cleared_review_ids', [])
+    else:
+        review_ids = pk_set
+    for review_id in review_ids:
+        bump_review_version(review_id)
+
+
+@receiver(post_save, sender=Review)
+def count_review_on_save(sender, instance, created, **kwargs):
+    """
+    Updates the published review counters of the categories
+    when a review is published, unpublished or moved.
+    """
+    old_state = (False, None) if created else getattr(
+        instance, '_counted_state', None)
+    new_state = instance.get_counted_state()
+    if old_state is None:
+        # The review was not loaded with its publication state, so the
+        # previous category is unknown. Only the current one is fixed.
+        refresh_category_counts([instance.category_id])
+    else:
+        adjust_category_counts(old_state, new_state)
+    instance._counted_state = new_state
+
+
+@receiver(post_delete, sender=Review)
+def count_review_on_delete(sender, instance, **kwargs):
+    adjust_category_counts(instance.get_counted_state(), (False, None))
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_on_save(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Review, instance.review_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_on_delete(sender, instance, **kwargs):
+    change_counter(Review, instance.review_id, 'comments_count', -1)
+
+
+@receiver(m2m_changed, sender=Review.likes.through)
+def count_likes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keeps `Review.likes_count` in step with the likes relation.
+    `clear()` does not report how many rows were removed, so the
+    affected reviews are recounted instead.
+    """
+    if action == 'post_clear':
+        if reverse:
+            refresh_review_counts(
+                getattr(instance, '_cleared_review_ids', []))
+        else:
+            refresh_review_counts([instance.pk])
+        return
+    if action not in ('post_add', 'post_remove'):
+        return
+
+    delta = 1 if action == 'post_add' else -1
+    if reverse:
+        for review_id in pk_set:
+            change_counter(Review, review_id, 'likes_count', delta)
+    else:
+        change_counter(
+            Review, instance.pk, 'likes_count', delta * len(pk_set))
+
+
+@receiver(post_save, sender=Review)
+def index_review_on_save(sender, instance, **kwargs):
+    index_reviews([instance.pk])
+
+
+@receiver(post_delete, sender=Review)
+def unindex_review_on_delete(sender, instance, **kwargs):
+    unindex_review(instance.pk)
+
+
+@receiver(post_save, sender=ReviewTopic)
+@receiver(post_delete, sender=ReviewTopic)
+def index_review_on_topic_change(sender, instance, **kwargs):
+    """Reindexes the parent review, which includes the topics' text."""
+    if instance.review_id:
+        index_reviews([instance.review_id])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Category)
+def create_image_renditions(sender, instance, update_fields, **kwargs):
+    """Queues the renditions of an uploaded main image or background."""
+    for field, widths in RENDITION_WIDTHS.items():
+        if not hasattr(instance, field):
+            continue
+        if update_fields is not None and field not in update_fields:
+            continue
+        ensure_renditions(getattr(instance, field), widths)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_sitemap_section(sender, instance, **kwargs):
+    """Re-renders the sitemap section of a changed review."""
+    invalidate_review_sitemap([instance.pk])
@@ -1,14 +1,132 @@
+from datetime import datetime, timezone
+
 from django.contrib.sitemaps import Sitemap
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
+from django.db.models import ExpressionWrapper, F, IntegerField, Max
+from django.template.loader import render_to_string
+from django.urls import reverse
 
+from .caching import bump_version, get_version
 from .models import Review
 
+# Reviews per sitemap section. Sections cover fixed primary key ranges,
+# so a changed review only invalidates the section it belongs to.
+SECTION_SIZE = 5000
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+SECTION_VERSION_KEY = 'sitemap:reviews:{section}:version'
+INDEX_VERSION_KEY = 'sitemap:reviews:index:version'
+
+
+def get_section(review_id: int) -> int:
+    return (review_id - 1) // SECTION_SIZE
+
+
+def _version_time(version: int) -> datetime:
+    """Versions are nanosecond timestamps of the last invalidation."""
+    return datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+
+
+def invalidate_review_sitemap(review_ids) -> None:
+    """
+    Marks the sections holding the given reviews and the index as
+    changed. They are re-rendered on the next request.
+    """
+    sections = {get_section(review_id) for review_id in review_ids}
+    for section in sections:
+        bump_version(SECTION_VERSION_KEY.format(section=section))
+    if sections:
+        bump_version(INDEX_VERSION_KEY)
+
 
 class ReviewSitemap(Sitemap):
+    """
+    One section of the published reviews. Only the slug and the update
+    time of the reviews are loaded.
+    """
     changefreq = 'monthly'
     priority = 0.9
+    limit = SECTION_SIZE
+
+    def __init__(self, section: int = 0):
+        self.section = section
 
     def items(self):
-        return Review.published.all()
+        start = self.section * SECTION_SIZE
+        return Review.published.filter(
+            pk__gt=start, pk__lte=start + SECTION_SIZE
+        ).order_by('pk').values('slug', 'time_updated')
+
+    def location(self, item):
+        return reverse('review:review', kwargs={'review_slug': item['slug']})
+
+    def lastmod(self, item):
+        return item['time_updated']
+
+
+def _get_cache_key(request, name: str, version: int) -> str:
+    site = get_current_site(request)
+    return f'sitemap:reviews:{name}:{version}:{request.scheme}:{site.domain}'
+
+
+def get_section_sitemap(request, section: int) -> dict:
+    """
+    Returns the rendered XML of a section and its last modification,
+    as {'xml': str, 'lastmod': datetime}, or None for an empty section.
+    The result is cached until a review of the section changes.
+    """
+    version = get_version(SECTION_VERSION_KEY.format(section=section))
+    key = _get_cache_key(request, f'section-{section}', version)
+    entry = cache.get(key)
+    if entry is None:
+        sitemap = ReviewSitemap(section)
+        urls = sitemap.get_urls(
+            site=get_current_site(request), protocol=request.scheme)
+        if not urls:
+            entry = {'xml': None, 'lastmod': None}
+        else:
+            entry = {
+                'xml': render_to_string('sitemap.xml', {'urlset': urls}),
+                'lastmod': max(filter(None, (
+                    sitemap.latest_lastmod, _version_time(version)))),
+            }
+        cache.set(key, entry, SITEMAP_CACHE_TIMEOUT)
+    return entry if entry['xml'] is not None else None
+
+
+def get_sitemap_index(request) -> dict:
+    """
+    Returns the rendered sitemap index as {'xml': str, 'lastmod': datetime}.
+
+    The sections and their latest update times are read with a single
+    grouped query and cached until any section changes.
+    """
+    version = get_version(INDEX_VERSION_KEY)
+    key = _get_cache_key(request, 'index', version)
+    entry = cache.get(key)
+    if entry is None:
+        rows = Review.published.annotate(
+            section=ExpressionWrapper(
+                (F('pk') - 1) / SECTION_SIZE, output_field=IntegerField())
+        ).order_by('section').values('section').annotate(
+            lastmod=Max('time_updated'))
 
-    def lastmod(self, obj):
-        return obj.time_updated
+        sitemaps = []
+        for row in rows:
+            section_version = get_version(
+                SECTION_VERSION_KEY.format(section=row['section']))
+            sitemaps.append({
+                'location': request.build_absolute_uri(reverse(
+                    'sitemap_section', kwargs={'section': row['section']})),
+                'last_mod': max(
+                    row['lastmod'], _version_time(section_version)),
+            })
+        entry = {
+            'xml': render_to_string(
+                'sitemap_index.xml', {'sitemaps': sitemaps}),
+            'lastmod': max(
+                [item['last_mod'] for item in sitemaps]
+                + [_version_time(version)]),
+        }
+        cache.set(key, entry, SITEMAP_CACHE_TIMEOUT)
+    return entry
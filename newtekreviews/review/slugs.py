@@ -0,0 +1,158 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.core.validators import MaxLengthValidator
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+# How often a write is retried after losing a slug to a concurrent writer.
+SLUG_ATTEMPTS = 5
+
+
+def get_slug_max_length(model, field: str = 'slug') -> int:
+    """
+    Returns the longest slug accepted by both the column and the
+    MaxLengthValidator of the field, so allocated slugs stay editable.
+    """
+    slug_field = model._meta.get_field(field)
+    limits = [slug_field.max_length] + [
+        validator.limit_value for validator in slug_field.validators
+        if isinstance(validator, MaxLengthValidator)
+    ]
+    return min(limit for limit in limits if limit)
+
+
+def make_base_slug(model, text: str, field: str = 'slug') -> str:
+    """
+    Slugifies `text` for `model`, leaving room for a numeric suffix.
+    Text without any slug characters falls back to the model name.
+    """
+    max_length = get_slug_max_length(model, field) - 8
+    base = slugify(text)[:max_length].strip('-')
+    return base or model._meta.model_name
+
+
+def allocate_slugs(model, texts, field: str = 'slug',
+                   exclude_pk=None) -> list:
+    """
+    Returns a unique slug for each of `texts`, in order.
+
+    The slugs taken by every base in the batch, bare or with a numeric
+    suffix, are fetched with a single query, and free `-2`, `-3`, ...
+    suffixes are chosen in memory, so texts repeated within the batch
+    get distinct slugs too.
+
+    Args:
+        model: The model whose `field` must be unique.
+        texts: The titles to slugify.
+        field: The name of the slug field.
+        exclude_pk: A row whose current slug may be reused, e.g. the
+            object being renamed.
+    """
+    bases = [make_base_slug(model, text, field) for text in texts]
+    if not bases:
+        return []
+
+    # Only the base and its numeric suffixes can collide, so slugs merely
+    # sharing a prefix, e.g. `theory` for `the`, are not read.
+    queryset = model._default_manager.filter(reduce(or_, (
+        Q(**{field: base}) | Q(**{
+            f'{field}__startswith': f'{base}-',
+            f'{field}__regex': rf'^{re.escape(base)}-[0-9]+$',
+        })
+        for base in set(bases)
+    )))
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    taken = set(queryset.values_list(field, flat=True))
+
+    slugs = []
+    next_suffix = {}
+    for base in bases:
+        slug = base
+        suffix = next_suffix.get(base, 2)
+        while slug in taken:
+            slug = f'{base}-{suffix}'
+            suffix += 1
+        next_suffix[base] = suffix
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def assign_slugs(objects, texts, field: str = 'slug',
+                 exclude_pk=None) -> None:
+    """
+    Allocates slugs for a batch of objects of one model in a single query
+    and marks them as allocated, so that their save retries with a new
+    slug if a concurrent writer takes it first.
+    """
+    objects = list(objects)
+    if not objects:
+        return
+    slugs = allocate_slugs(type(objects[0]), texts, field, exclude_pk)
+    for obj, slug in zip(objects, slugs):
+        setattr(obj, field, slug)
+        obj._allocated_slug = slug
+
+
+def _slugs_taken(model, slugs, field: str, exclude_pk=None) -> bool:
+    """Tells whether a row other than `exclude_pk` has one of `slugs`."""
+    queryset = model._default_manager.filter(**{f'{field}__in': slugs})
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return queryset.exists()
+
+
+def save_with_unique_slug(instance, text: str, save,
+                          field: str = 'slug') -> None:
+    """
+    Saves `instance` with `save()`, allocating a slug from `text` if it
+    has none.
+
+    Uniqueness is not pre-checked per candidate: the insert runs in a
+    savepoint, and if it fails because a concurrent writer took the
+    allocated slug, a new one is allocated and the save is retried.
+    Other integrity errors, e.g. of an update whose slug belongs to the
+    instance itself, are raised at once. Slugs that were set explicitly
+    are saved as they are.
+    """
+    if not getattr(instance, field):
+        assign_slugs([instance], [text], field)
+    if getattr(instance, '_allocated_slug', None) != getattr(instance, field):
+        save()
+        return
+
+    for attempt in range(SLUG_ATTEMPTS):
+        try:
+            with transaction.atomic(using=instance._state.db):
+                save()
+            return
+        except IntegrityError:
+            slug = getattr(instance, field)
+            if attempt + 1 == SLUG_ATTEMPTS or not _slugs_taken(
+                    type(instance), [slug], field, exclude_pk=instance.pk):
+                raise
+            assign_slugs([instance], [text], field, exclude_pk=instance.pk)
+
+
+def bulk_create_with_unique_slugs(model, objects, texts,
+                                  field: str = 'slug', **kwargs) -> list:
+    """
+    Allocates slugs for `objects` from `texts` and inserts them with
+    `bulk_create`, re-allocating the whole batch and retrying when
+    a concurrent writer took one of the slugs.
+    """
+    objects = list(objects)
+    for attempt in range(SLUG_ATTEMPTS):
+        assign_slugs(objects, texts, field)
+        try:
+            with transaction.atomic(using=model._default_manager.db):
+                return model._default_manager.bulk_create(objects, **kwargs)
+        except IntegrityError:
+            slugs = [getattr(obj, field) for obj in objects]
+            if attempt + 1 == SLUG_ATTEMPTS or \
+                    not _slugs_taken(model, slugs, field):
+                raise
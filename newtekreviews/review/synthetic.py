@@ -0,0 +1,482 @@
+"""
+Generation of large synthetic datasets for load and query testing.
+
+Rows are built by plain functions of a `SyntheticPlan` and a range of
+indexes, so they can run in a process pool, and are written with
+PostgreSQL COPY (or batched INSERTs on other backends). No model
+signals are sent, so e.g. no welcome emails are queued.
+
+Popularity is skewed with Zipf distributions: a few reviews collect
+most likes and comments, a few categories hold most reviews, and a
+few users write most of them.
+"""
+import csv
+import io
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .caching import bump_generation
+from .counters import refresh_category_counts
+from .models import Review, ReviewTopic, Category, Comment
+from .search import index_reviews
+from .sitemaps import SECTION_SIZE, invalidate_review_sitemap
+from users.models import Profile
+
+# Fractional parts of multiples of these constants are evenly spread
+# over [0, 1). They replace random numbers where a value must be the
+# same in every process, e.g. the like count of a review.
+GOLDEN = 0.6180339887498949
+SILVER = 0.4142135623730950
+
+INDEX_BATCH_SIZE = 1000
+
+
+def _harmonic(n: int, s: float) -> float:
+    """Approximates the sum of r ** -s for r in 1..n."""
+    if n <= 0:
+        return 0.0
+    if n < 1000:
+        return sum(r ** -s for r in range(1, n + 1))
+    return (n ** (1 - s) - 1) / (1 - s) + 0.5 * (1 + n ** -s) \
+        + s / 12 * (1 - n ** (-s - 1))
+
+
+def _zipf_index(u: float, n: int, s: float) -> int:
+    """
+    Maps a uniform `u` in [0, 1) to an index in 0..n-1, where low
+    indexes are the most likely, by inverting a continuous power law.
+    """
+    rank = ((n ** (1 - s) - 1) * u + 1) ** (1 / (1 - s))
+    return min(int(rank) - 1, n - 1)
+
+
+def _coprime_stride(n: int) -> int:
+    """Returns a stride visiting every index of 0..n-1 exactly once."""
+    stride = int(n * GOLDEN) | 1
+    while math.gcd(stride, n) != 1:
+        stride += 2
+    return stride % n or 1
+
+
+@dataclass
+class SyntheticPlan:
+    """
+    The sizes of a dataset and the first primary key of each model.
+    Everything derived from the plan is deterministic for a seed.
+    """
+    users: int
+    categories: int
+    reviews: int
+    topics_per_review: float = 2.0
+    comments: int = 0
+    likes: int = 0
+    seed: int = 0
+    user_base: int = 1
+    category_base: int = 1
+    review_base: int = 1
+    published_ratio: float = 0.9
+    days: int = 3 * 365
+    end: datetime = field(default_factory=timezone.now)
+    password: str = field(default_factory=lambda: make_password(None))
+
+    like_skew = 1.2
+    comment_skew = 1.1
+    category_skew = 1.1
+    author_skew = 1.05
+
+    def __post_init__(self):
+        self._stride = _coprime_stride(max(self.reviews, 1))
+        self._inverse = pow(self._stride, -1, max(self.reviews, 1))
+        self._like_norm = _harmonic(self.reviews, self.like_skew)
+        self._comment_norm = _harmonic(self.reviews, self.comment_skew)
+        self._user_stride = _coprime_stride(max(self.users, 1))
+
+    def review_rank(self, index: int) -> int:
+        """
+        Returns the popularity rank (1 is the most popular) of a review.
+        Ranks are spread over the reviews, so viral reviews are not
+        simply the oldest ones.
+        """
+        return (index * self._inverse) % max(self.reviews, 1) + 1
+
+    def _expected(self, index, total, skew, norm, offset) -> int:
+        if not total or not norm:
+            return 0
+        value = total * self.review_rank(index) ** -skew / norm
+        return int(value + (index * GOLDEN + offset) % 1.0)
+
+    def like_count(self, index: int) -> int:
+        return min(self._expected(
+            index, self.likes, self.like_skew, self._like_norm, 0.0),
+            self.users)
+
+    def comment_count(self, index: int) -> int:
+        return self._expected(
+            index, self.comments, self.comment_skew, self._comment_norm,
+            0.5)
+
+    def liker(self, index: int, number: int) -> int:
+        """
+        Returns the user index of the `number`-th like of a review.
+        Likes of a review never repeat a user.
+        """
+        offset = (index * 2654435761) % self.users
+        return (offset + number * self._user_stride) % self.users
+
+    def review_time(self, index: int) -> datetime:
+        """Creation times grow with the index, like primary keys."""
+        span = timedelta(days=self.days)
+        position = (index + (index * SILVER) % 1.0) / max(self.reviews, 1)
+        return self.end - span + span * min(position, 1.0)
+
+    def is_published(self, index: int) -> bool:
+        return (index * SILVER) % 1.0 < self.published_ratio
+
+
+# Row builders, run in the worker processes
+
+_faker = None
+
+
+def _get_faker(seed: int):
+    global _faker
+    if _faker is None:
+        from faker import Faker
+        _faker = Faker()
+    _faker.seed_instance(seed)
+    return _faker
+
+
+USER_COLUMNS = (
+    'id', 'username', 'email', 'password', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'date_joined')
+PROFILE_COLUMNS = ('user_id', 'name', 'bio', 'created_at')
+CATEGORY_COLUMNS = ('id', 'name', 'slug', 'published_reviews_count')
+REVIEW_COLUMNS = (
+    'id', 'title', 'slug', 'description', 'time_created', 'time_updated',
+    'is_published', 'author_id', 'category_id', 'likes_count',
+    'comments_count')
+TOPIC_COLUMNS = ('review_id', 'review_topic_title', 'slug', 'text_content')
+COMMENT_COLUMNS = ('review_id', 'author_id', 'text', 'time_created')
+LIKE_COLUMNS = ('review_id', 'user_id')
+
+
+def build_users(plan: SyntheticPlan, start: int, stop: int) -> tuple:
+    fake = _get_faker(plan.seed + start)
+    users, profiles = [], []
+    for index in range(start, stop):
+        pk = plan.user_base + index
+        first_name, last_name = fake.first_name(), fake.last_name()
+        username = f'{fake.user_name()}{pk}'[:150]
+        joined = plan.end - timedelta(
+            days=plan.days * (1 - index / max(plan.users, 1)))
+        users.append((
+            pk, username, f'{username}@example.com', plan.password,
+            first_name, last_name, True, False, False, joined))
+        profiles.append((
+            pk, f'{first_name} {last_name}', fake.sentence(), joined))
+    return users, profiles
+
+
+def build_categories(plan: SyntheticPlan, start: int, stop: int) -> list:
+    fake = _get_faker(plan.seed + start)
+    rows = []
+    for index in range(start, stop):
+        pk = plan.category_base + index
+        name = ' '.join(fake.words(2)).title()
+        rows.append((pk, name, f'{slugify(name)}-{pk}', 0))
+    return rows
+
+
+def build_reviews(plan: SyntheticPlan, start: int, stop: int) -> list:
+    fake = _get_faker(plan.seed + start)
+    rng = random.Random(plan.seed + start)
+    rows = []
+    for index in range(start, stop):
+        pk = plan.review_base + index
+        title = fake.sentence(nb_words=6).rstrip('.')
+        created = plan.review_time(index)
+        rows.append((
+            pk, title, f'{slugify(title)[:80]}-{pk}',
+            fake.paragraph(nb_sentences=5), created,
+            created + timedelta(hours=rng.random() * 48),
+            plan.is_published(index),
+            plan.user_base + _zipf_index(
+                rng.random(), plan.users, plan.author_skew),
+            plan.category_base + _zipf_index(
+                rng.random(), plan.categories, plan.category_skew),
+            plan.like_count(index), plan.comment_count(index)))
+    return rows
+
+
+def build_topics(plan: SyntheticPlan, start: int, stop: int) -> list:
+    fake = _get_faker(plan.seed + start)
+    rng = random.Random(plan.seed + start)
+    rows = []
+    for index in range(start, stop):
+        pk = plan.review_base + index
+        count = int(plan.topics_per_review * 2 * rng.random() + 0.5)
+        for number in range(count):
+            title = fake.sentence(nb_words=4).rstrip('.')
+            rows.append((
+                pk, title, f'{slugify(title)[:150]}-{pk}-{number}',
+                '\n\n'.join(fake.paragraphs(3))))
+    return rows
+
+
+def build_comments(plan: SyntheticPlan, start: int, stop: int) -> list:
+    fake = _get_faker(plan.seed + start)
+    rng = random.Random(plan.seed + start)
+    rows = []
+    for index in range(start, stop):
+        created = plan.review_time(index)
+        room = max((plan.end - created).total_seconds(), 0)
+        for _ in range(plan.comment_count(index)):
+            rows.append((
+                plan.review_base + index,
+                plan.user_base + _zipf_index(
+                    rng.random(), plan.users, plan.author_skew),
+                fake.sentence(nb_words=12),
+                created + timedelta(seconds=room * rng.random() ** 3)))
+    return rows
+
+
+def build_likes(plan: SyntheticPlan, start: int, stop: int) -> list:
+    return [
+        (plan.review_base + index, plan.user_base + plan.liker(index, n))
+        for index in range(start, stop)
+        for n in range(plan.like_count(index))
+    ]
+
+
+# Writing
+
+def _get_fields(model, columns):
+    return [model._meta.get_field(column) for column in columns]
+
+
+def _get_defaults(model, columns) -> tuple:
+    """
+    Returns the names and values of the columns which are not built,
+    from the defaults of their fields.
+    """
+    names, values = [], []
+    now = timezone.now()
+    for model_field in model._meta.concrete_fields:
+        if model_field.attname in columns or model_field.primary_key:
+            continue
+        names.append(model_field.attname)
+        if getattr(model_field, 'auto_now', False) or \
+                getattr(model_field, 'auto_now_add', False):
+            values.append(now)
+        else:
+            values.append(model_field.get_default())
+    return tuple(names), tuple(values)
+
+
+def insert_rows(model, columns, rows) -> int:
+    """
+    Inserts tuples of `columns` values into the table of `model`.
+    Columns which are not given are set to the defaults of their fields.
+
+    PostgreSQL loads the rows with COPY, other backends with one
+    multi-row INSERT statement per batch.
+    """
+    if not rows:
+        return 0
+    extra_columns, extra_values = _get_defaults(model, columns)
+    columns = tuple(columns) + extra_columns
+    fields = _get_fields(model, columns)
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(
+        connection.ops.quote_name(model_field.column)
+        for model_field in fields)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            _copy_rows(cursor, table, names, rows, extra_values)
+        else:
+            placeholders = ', '.join(['%s'] * len(columns))
+            cursor.executemany(
+                f'INSERT INTO {table} ({names}) VALUES ({placeholders})',
+                [
+                    [model_field.get_db_prep_save(value, connection)
+                     for model_field, value in zip(fields, row + extra_values)]
+                    for row in rows
+                ])
+    return len(rows)
+
+
+def _copy_rows(cursor, table, names, rows, extra_values):
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, 'copy'):  # psycopg 3
+        with raw_cursor.copy(f'COPY {table} ({names}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row + extra_values)
+        return
+
+    # psycopg2 loads a CSV buffer
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            r'\N' if value is None else value for value in row + extra_values)
+    buffer.seek(0)
+    raw_cursor.copy_expert(
+        f"COPY {table} ({names}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+        buffer)
+
+
+def _reset_sequences(models) -> None:
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+# Orchestration
+
+def _next_pk(model) -> int:
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class SyntheticDataGenerator:
+    """
+    Builds the rows of a plan in a process pool and writes them in
+    order, keeping at most two batches per worker in memory.
+
+    Reviews are given to the new users and categories, and likes and
+    comments to the new reviews. The stored counters are written with
+    the reviews, and the search index, category counters and caches
+    are refreshed at the end.
+    """
+    batch_size = 5000
+
+    def __init__(self, users, categories, reviews, topics_per_review=2.0,
+                 comments=0, likes=0, seed=0, workers=None, batch_size=None,
+                 index=True, progress=None):
+        if reviews and not (users and categories):
+            raise ValueError('Reviews need at least one user and category.')
+        self.plan = SyntheticPlan(
+            users=users, categories=categories, reviews=reviews,
+            topics_per_review=topics_per_review, comments=comments,
+            likes=likes, seed=seed,
+            user_base=_next_pk(get_user_model()),
+            category_base=_next_pk(Category),
+            review_base=_next_pk(Review))
+        self.workers = workers
+        self.batch_size = batch_size or self.batch_size
+        self.index = index
+        self.progress = progress
+        self.counts = {}
+
+    def run(self) -> dict:
+        """
+        Generates the dataset.
+
+        Returns:
+            dict: The number of rows inserted per table.
+        """
+        plan = self.plan
+        executor = None
+        if self.workers is None or self.workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=django.setup)
+        try:
+            self.load('users', build_users, plan.users, executor,
+                      self.write_users)
+            self.load('categories', build_categories, plan.categories,
+                      executor, self.writer(Category, CATEGORY_COLUMNS))
+            self.load('reviews', build_reviews, plan.reviews, executor,
+                      self.writer(Review, REVIEW_COLUMNS))
+            self.load('topics', build_topics, plan.reviews, executor,
+                      self.writer(ReviewTopic, TOPIC_COLUMNS),
+                      per_review=plan.topics_per_review)
+            self.load('comments', build_comments, plan.reviews, executor,
+                      self.writer(Comment, COMMENT_COLUMNS),
+                      per_review=plan.comments / max(plan.reviews, 1))
+            self.load('likes', build_likes, plan.reviews, executor,
+                      self.writer(Review.likes.through, LIKE_COLUMNS),
+                      per_review=plan.likes / max(plan.reviews, 1))
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        self.finish()
+        return self.counts
+
+    def writer(self, model, columns):
+        def write(rows):
+            return insert_rows(model, columns, rows)
+        return write
+
+    def write_users(self, rows) -> int:
+        users, profiles = rows
+        insert_rows(get_user_model(), USER_COLUMNS, users)
+        insert_rows(Profile, PROFILE_COLUMNS, profiles)
+        return len(users)
+
+    def load(self, name, build, total, executor, write, per_review=1.0):
+        """
+        Builds and writes `total` items in chunks holding about
+        `batch_size` rows.
+        """
+        chunk = max(int(self.batch_size / max(per_review, 1e-9)), 1)
+        chunk = min(chunk, self.batch_size * 10)
+        ranges = [
+            (start, min(start + chunk, total))
+            for start in range(0, total, chunk)]
+
+        started = time.monotonic()
+        self.counts[name] = 0
+        for rows in self._map(build, ranges, executor):
+            self.counts[name] += write(rows)
+            if self.progress:
+                self.progress(
+                    name, self.counts[name], time.monotonic() - started)
+
+    def _map(self, build, ranges, executor):
+        """Yields the built chunks in order with bounded prefetching."""
+        if executor is None:
+            for start, stop in ranges:
+                yield build(self.plan, start, stop)
+            return
+
+        pending = []
+        limit = 2 * (self.workers or os.cpu_count() or 1)
+        for start, stop in ranges:
+            pending.append(executor.submit(build, self.plan, start, stop))
+            if len(pending) >= limit:
+                yield pending.pop(0).result()
+        while pending:
+            yield pending.pop(0).result()
+
+    def finish(self) -> None:
+        plan = self.plan
+        _reset_sequences([get_user_model(), Category, Review])
+        if plan.categories:
+            refresh_category_counts(range(
+                plan.category_base, plan.category_base + plan.categories))
+
+        review_ids = range(plan.review_base, plan.review_base + plan.reviews)
+        if self.index:
+            for start in range(0, len(review_ids), INDEX_BATCH_SIZE):
+                index_reviews(review_ids[start:start + INDEX_BATCH_SIZE])
+        invalidate_review_sitemap(
+            [*review_ids[::SECTION_SIZE], *review_ids[-1:]])
+        for model in (Review, Category, ReviewTopic):
+            bump_generation(model)
@@ -0,0 +1,62 @@
+from django import template
+from django.utils.html import format_html
+
+from review.renditions import RENDITION_WIDTHS, get_renditions, get_srcset
+
+register = template.Library()
+
+
+def _get_field_renditions(fieldfile) -> dict:
+    widths = RENDITION_WIDTHS.get(fieldfile.field.name, ())
+    return get_renditions(fieldfile, widths)
+
+
+@register.simple_tag
+def picture(fieldfile, alt='', css_class='', sizes='100vw'):
+    """
+    Renders an image as a <picture> with WebP and fallback `srcset`
+    renditions, or as a plain <img> of the original while the
+    renditions are not generated yet.
+
+    Usage:
+        {% picture review.main_image alt=review.title css_class="..." sizes="(max-width: 600px) 100vw, 320px" %}
+    """
+    if not fieldfile:
+        return ''
+    renditions = _get_field_renditions(fieldfile)
+    if not renditions:
+        return format_html(
+            '<img class="{}" src="{}" alt="{}" loading="lazy">',
+            css_class, fieldfile.url, alt)
+
+    fallback = next(fmt for fmt in renditions if fmt != 'webp')
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img class="{}" src="{}" srcset="{}" sizes="{}" alt="{}" '
+        'loading="lazy">'
+        '</picture>',
+        get_srcset(renditions, 'webp'), sizes,
+        css_class, fieldfile.url, get_srcset(renditions, fallback), sizes,
+        alt)
+
+
+@register.filter
+def rendition_url(fieldfile, width):
+    """
+    Returns the URL of the smallest WebP rendition at least `width`
+    pixels wide, or of the original while there are no renditions.
+
+    Usage:
+        {{ category.category_background|rendition_url:960 }}
+    """
+    if not fieldfile:
+        return ''
+    webp = _get_field_renditions(fieldfile).get('webp')
+    if not webp:
+        return fieldfile.url
+    width = int(width)
+    for rendition_width, url in webp:
+        if rendition_width >= width:
+            return url
+    return webp[-1][1]
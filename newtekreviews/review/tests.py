@@ -1,14 +1,43 @@
+import csv
+import json
+import posixpath
+import re
 import threading
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+from asgiref.sync import sync_to_async
 from django.test import TestCase
 from django.urls import reverse
 from http import HTTPStatus
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils.text import slugify
 from mixer.backend.django import mixer
+from PIL import Image
 
 from .models import Review, ReviewTopic, Category, Comment
 from .forms import AddReviewForm, UpdateReviewTopicFormSet, CommentForm
+from .filters import ReviewFilter, CategoryFilter
+from .benchmark import ENDPOINTS, compare_reports, run_endpoint, seed_reviews
+from .caching import get_generation
+from .exporters import ReviewExporter
+from .importers import ReviewCSVImporter
+from .paginators import KeysetPaginator
+from . import renditions
+from .renditions import (
+    RENDITION_WIDTHS, generate_renditions, get_renditions)
+from .synthetic import SyntheticDataGenerator
+from newtek_api.serializers import ReviewSerializer
 
 # Tests for the Review CRUD
 
@@ -97,6 +126,46 @@ class GetReviewTestCase(TestCase):
         # Check if the user is no longer in the review's likes
         self.assertNotIn(self.user, self.review.likes.all())
 
+    def test_like_endpoints_return_json(self):
+        like_url = reverse(
+            'review:review_like', kwargs={'review_slug': self.review.slug})
+        unlike_url = reverse(
+            'review:review_unlike', kwargs={'review_slug': self.review.slug})
+
+        for _ in range(2):
+            response = self.client.post(like_url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(
+                response.json(), {'liked': True, 'likes_count': 1})
+        self.assertTrue(self.review.likes.filter(pk=self.user.pk).exists())
+
+        response = self.client.post(unlike_url)
+        self.assertEqual(
+            response.json(), {'liked': False, 'likes_count': 0})
+        self.assertFalse(self.review.likes.exists())
+
+    def test_like_endpoint_does_not_load_likers(self):
+        self.review.likes.add(*mixer.cycle(5).blend(get_user_model()))
+        url = reverse(
+            'review:review_like', kwargs={'review_slug': self.review.slug})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        self.assertEqual(response.json()['likes_count'], 6)
+        user_table = get_user_model()._meta.db_table
+        likes_table = Review.likes.through._meta.db_table
+        self.assertFalse(any(
+            user_table in query['sql'] and likes_table in query['sql']
+            for query in queries.captured_queries))
+
+    def test_like_endpoint_rejects_anonymous_and_get(self):
+        url = reverse(
+            'review:review_like', kwargs={'review_slug': self.review.slug})
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        self.client.logout()
+        self.assertEqual(
+            self.client.post(url).status_code, HTTPStatus.FORBIDDEN)
+
     def test_post_invalid_form_context(self):
         invalid_data = {'text': ''}  # Invalid comment form data
         response = self.client.post(self.url, data=invalid_data)
@@ -560,3 +629,902 @@ class CategoryDeleteViewTestCase(TestCase):
         self.client.logout()
         self.user.delete()
         self.category.delete()
+
+
+#  Tests for the list caching
+
+
+class ReviewListCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reviews = mixer.cycle(3).blend(Review, is_published=True)
+        self.url = reverse('review:all_reviews')
+
+    def test_cached_list_skips_filter_query(self):
+        """
+        Test that a repeated request reads the review primary keys from the
+        cache and only loads the rows of the requested page.
+        """
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as uncached:
+            self.client.get(self.url)
+        self.assertLess(len(first), len(uncached))
+
+    def test_save_invalidates_cached_list(self):
+        """
+        Test that creating, unpublishing and deleting a review is visible
+        on the next request without waiting for a timeout.
+        """
+        self.client.get(self.url)
+        new_review = mixer.blend(Review, is_published=True)
+        response = self.client.get(self.url)
+        self.assertIn(new_review, response.context_data['reviews'])
+        self.assertEqual(response.context_data['filtered_reviews_count'], 4)
+
+        new_review.is_published = False
+        new_review.save()
+        response = self.client.get(self.url)
+        self.assertNotIn(new_review, response.context_data['reviews'])
+
+        self.reviews[0].delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.context_data['filtered_reviews_count'], 2)
+
+    def test_like_keeps_cached_lists(self):
+        user = mixer.blend(get_user_model())
+        generation = get_generation(Review)
+        self.reviews[0].likes.add(user)
+        self.assertEqual(get_generation(Review), generation)
+
+    def test_filter_parameters_are_cached_separately(self):
+        """
+        Test that different filter parameters do not share a cache entry.
+        """
+        self.client.get(self.url)
+        response = self.client.get(
+            self.url, {'title': self.reviews[0].title})
+        self.assertEqual(
+            list(response.context_data['reviews']), [self.reviews[0]])
+
+    def test_category_save_invalidates_category_list(self):
+        category = mixer.blend(Category, category_background='bg.png')
+        path = reverse('review:categories')
+        self.client.get(path)
+        new_category = mixer.blend(Category, category_background='bg.png')
+        response = self.client.get(path)
+        self.assertIn(category, response.context_data['categories'])
+        self.assertIn(new_category, response.context_data['categories'])
+
+
+class ReviewDetailFragmentCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = mixer.blend(get_user_model())
+        self.review = mixer.blend(Review, is_published=True)
+        self.topic = mixer.blend(
+            ReviewTopic, review=self.review, text_content='Topic body')
+        mixer.cycle(3).blend(Comment, review=self.review, author=self.user)
+        self.url = reverse(
+            'review:review', kwargs={'review_slug': self.review.slug})
+
+    def test_cached_fragments_skip_queries(self):
+        """
+        Test that the second render of a review reads the topics, comments
+        and like counter from the fragment cache.
+        """
+        with CaptureQueriesContext(connection) as uncached:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as cached:
+            response = self.client.get(self.url)
+        self.assertLess(len(cached), len(uncached))
+        self.assertContains(response, 'Topic body')
+
+    def test_comment_invalidates_fragments(self):
+        self.client.get(self.url)
+        self.client.force_login(self.user)
+        self.client.post(self.url, data={'text': 'Fresh comment'})
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Fresh comment')
+
+    def test_topic_edit_invalidates_fragments(self):
+        self.client.get(self.url)
+        self.topic.text_content = 'Edited body'
+        self.topic.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Edited body')
+
+    def test_like_state_is_rendered_per_user(self):
+        """
+        Test that the like button reflects the current user while the
+        like counter is shared between users.
+        """
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+        self.client.post(self.url, data={'review_id': self.review.id})
+        response = self.client.get(self.url)
+        self.assertTrue(response.context['user_liked'])
+        self.assertContains(response, 'alt="Unlike"')
+
+        other_user = mixer.blend(get_user_model())
+        self.client.force_login(other_user)
+        response = self.client.get(self.url)
+        self.assertFalse(response.context['user_liked'])
+        self.assertContains(
+            response, '<p class="review__likes-count">1</p>', html=True)
+
+
+class CommentPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.review = mixer.blend(Review, is_published=True)
+        self.authors = mixer.cycle(5).blend(get_user_model())
+        self.comments = [
+            Comment.objects.create(
+                review=self.review, author=self.authors[i % 5],
+                text=f'Comment {i}')
+            for i in range(25)
+        ]
+        self.url = reverse(
+            'review:review_comments',
+            kwargs={'review_slug': self.review.slug})
+
+    def test_detail_embeds_newest_page(self):
+        response = self.client.get(self.review.get_absolute_url())
+        page = list(response.context['comments_page'])
+        self.assertEqual(
+            [comment.text for comment in page],
+            [f'Comment {i}' for i in range(24, 4, -1)])
+        self.assertContains(response, 'review__comments-more-link')
+
+    def test_load_more_fragment(self):
+        first = self.client.get(
+            self.url, headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertContains(first, 'Comment 24')
+        self.assertContains(first, 'Load more')
+
+        cursor = first.context['comments_page'].next_cursor
+        second = self.client.get(
+            self.url, {'cursor': cursor},
+            headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertContains(second, 'Comment 4')
+        self.assertContains(second, 'Comment 0')
+        self.assertNotContains(second, 'Comment 5<')
+        self.assertNotContains(second, 'Load more')
+
+    def test_load_more_without_javascript_opens_review_page(self):
+        first = self.client.get(
+            self.url, headers={'X-Requested-With': 'XMLHttpRequest'})
+        cursor = first.context['comments_page'].next_cursor
+        response = self.client.get(self.url, {'cursor': cursor}, follow=True)
+        self.assertEqual(
+            response.redirect_chain[0][0],
+            self.review.get_absolute_url() +
+            f'?comments_cursor={cursor}#comments')
+        self.assertTemplateUsed(response, 'review/review_detail.html')
+        self.assertContains(response, 'Comment 4')
+        self.assertNotContains(response, 'Comment 5<')
+
+        # The first page stays cached separately.
+        response = self.client.get(self.review.get_absolute_url())
+        self.assertContains(response, 'Comment 24')
+
+    def test_load_more_json(self):
+        response = self.client.get(
+            self.url, headers={'Accept': 'application/json'})
+        data = response.json()
+        self.assertEqual(len(data['comments']), 20)
+        self.assertEqual(data['comments'][0]['text'], 'Comment 24')
+
+        data = self.client.get(
+            data['next'], headers={'Accept': 'application/json'}).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            [f'Comment {i}' for i in range(4, -1, -1)])
+        self.assertIsNone(data['next'])
+
+    def test_page_loads_authors_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+            self.url, headers={'X-Requested-With': 'XMLHttpRequest'})
+        # The review lookup and one joined query for the page
+        self.assertEqual(len(queries), 2)
+
+
+#  Tests for the stored counters
+
+
+class StoredCountersTestCase(TestCase):
+    def setUp(self):
+        self.user = mixer.blend(get_user_model())
+        self.category = Category.objects.create(
+            name='Counted Category', category_background='background.png')
+        self.review = Review.objects.create(
+            title='Counted Review', category=self.category,
+            is_published=True)
+
+    def refresh(self):
+        self.review.refresh_from_db()
+        self.category.refresh_from_db()
+
+    def test_like_toggle_updates_likes_count(self):
+        url = reverse(
+            'review:review', kwargs={'review_slug': self.review.slug})
+        self.client.force_login(self.user)
+        self.client.post(url, data={'review_id': self.review.id})
+        self.refresh()
+        self.assertEqual(self.review.likes_count, 1)
+
+        self.client.post(url, data={'review_id': self.review.id})
+        self.refresh()
+        self.assertEqual(self.review.likes_count, 0)
+
+    def test_stale_instance_save_keeps_counters(self):
+        stale = Review.objects.get(pk=self.review.pk)
+        Review.objects.get(pk=self.review.pk).likes.add(self.user)
+        Comment.objects.create(
+            review=self.review, author=self.user, text='Comment')
+
+        stale.title = 'Renamed'
+        stale.save()
+        self.refresh()
+        self.assertEqual(self.review.title, 'Renamed')
+        self.assertEqual(self.review.likes_count, 1)
+        self.assertEqual(self.review.comments_count, 1)
+
+    def test_comments_count(self):
+        comment = Comment.objects.create(
+            review=self.review, author=self.user, text='First')
+        Comment.objects.create(
+            review=self.review, author=self.user, text='Second')
+        self.refresh()
+        self.assertEqual(self.review.comments_count, 2)
+
+        comment.delete()
+        self.refresh()
+        self.assertEqual(self.review.comments_count, 1)
+
+    def test_published_reviews_count(self):
+        """
+        Test that publishing, unpublishing, moving and deleting reviews
+        keeps the category counters in step.
+        """
+        self.refresh()
+        self.assertEqual(self.category.published_reviews_count, 1)
+
+        self.review.is_published = False
+        self.review.save()
+        self.refresh()
+        self.assertEqual(self.category.published_reviews_count, 0)
+
+        other_category = Category.objects.create(name='Other Category')
+        review = Review.objects.get(pk=self.review.pk)
+        review.is_published = True
+        review.category = other_category
+        review.save()
+        self.refresh()
+        other_category.refresh_from_db()
+        self.assertEqual(self.category.published_reviews_count, 0)
+        self.assertEqual(other_category.published_reviews_count, 1)
+
+        review.delete()
+        other_category.refresh_from_db()
+        self.assertEqual(other_category.published_reviews_count, 0)
+
+    def test_category_list_issues_no_count_queries(self):
+        mixer.cycle(3).blend(
+            Category, category_background='background.png')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('review:categories'))
+        self.assertFalse(
+            [q for q in queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_recount_command_fixes_drift(self):
+        Comment.objects.create(
+            review=self.review, author=self.user, text='Comment')
+        self.review.likes.add(self.user)
+        Review.objects.update(likes_count=7, comments_count=7)
+        Category.objects.update(published_reviews_count=7)
+
+        call_command('recount_review_counters', stdout=StringIO())
+        self.refresh()
+        self.assertEqual(self.review.likes_count, 1)
+        self.assertEqual(self.review.comments_count, 1)
+        self.assertEqual(self.category.published_reviews_count, 1)
+
+
+#  Tests for the full-text search
+
+
+class SearchReviewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('review:search')
+        self.title_match = Review.objects.create(
+            title='Quantum laptop', description='A portable computer.')
+        self.description_match = Review.objects.create(
+            title='Budget notebook',
+            description='Cheaper than any quantum <b>device</b>.')
+        self.topic_match = Review.objects.create(
+            title='Gaming phone', description='A phone for games.')
+        ReviewTopic.objects.create(
+            review=self.topic_match, review_topic_title='Battery',
+            text_content='The battery uses quantum dots.')
+        self.draft = Review.objects.create(
+            title='Quantum draft', is_published=False)
+
+    def test_search_is_get_based_and_ranked(self):
+        """
+        Test that title matches rank above description matches, which rank
+        above topic matches, and that drafts are excluded.
+        """
+        response = self.client.get(self.url, {'q': 'quantum'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            list(response.context['reviews']),
+            [self.title_match, self.description_match, self.topic_match])
+
+    def test_search_headline_is_highlighted_and_escaped(self):
+        response = self.client.get(self.url, {'q': 'cheaper'})
+        self.assertContains(response, '<mark>Cheaper</mark>')
+        self.assertContains(response, '&lt;b&gt;device&lt;/b&gt;')
+
+    def test_search_index_follows_edits(self):
+        self.title_match.title = 'Classic laptop'
+        self.title_match.save()
+        self.topic_match.topics.all().delete()
+        response = self.client.get(self.url, {'q': 'quantum'})
+        self.assertEqual(
+            list(response.context['reviews']), [self.description_match])
+
+    def test_search_is_paginated(self):
+        for number in range(12):
+            Review.objects.create(title=f'Paged review {number}')
+        response = self.client.get(self.url, {'q': 'paged', 'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        self.assertEqual(len(response.context['reviews']), 2)
+
+    def test_search_ignores_query_syntax(self):
+        response = self.client.get(self.url, {'q': '"quantum AND ('})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_empty_query(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Please provide a keyword')
+
+
+class AsyncReadViewsTestCase(TestCase):
+    """The async views must render the same pages as the sync views."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = mixer.blend(get_user_model())
+        self.category = mixer.blend(Category)
+        self.reviews = mixer.cycle(7).blend(
+            Review, is_published=True, category=self.category,
+            title=mixer.sequence('Async review {0}'))
+        self.reviews[0].likes.add(self.user)
+        self.urls = [
+            reverse('review:all_reviews'),
+            reverse('review:all_reviews') + '?title=review',
+            reverse('review:review', kwargs={
+                'review_slug': self.reviews[0].slug}),
+            reverse('review:categories'),
+            reverse('review:category', kwargs={
+                'category_slug': self.category.slug}),
+            reverse('review:search') + '?q=async',
+            reverse('review:search') + '?q=async&page=2',
+        ]
+
+    @staticmethod
+    def get_page(response) -> str:
+        # CSRF tokens are masked differently on every response.
+        return re.sub(
+            r'name="csrfmiddlewaretoken" value="[^"]*"', '',
+            response.content.decode())
+
+    async def assert_same_pages(self):
+        for url in self.urls:
+            sync_response = await sync_to_async(self.client.get)(url)
+            with override_settings(ASYNC_READ_VIEWS=True):
+                async_response = await self.async_client.get(url)
+            self.assertEqual(
+                async_response.status_code, sync_response.status_code, url)
+            self.assertEqual(
+                self.get_page(async_response), self.get_page(sync_response),
+                url)
+
+    async def test_anonymous_pages_match(self):
+        await self.assert_same_pages()
+
+    async def test_authenticated_pages_match(self):
+        await sync_to_async(self.client.force_login)(self.user)
+        await self.async_client.aforce_login(self.user)
+        await self.assert_same_pages()
+
+    @override_settings(ASYNC_READ_VIEWS=True)
+    async def test_missing_objects_are_not_found(self):
+        for url in (
+                reverse('review:review', kwargs={'review_slug': 'missing'}),
+                reverse('review:category', kwargs={
+                    'category_slug': 'missing'})):
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(ASYNC_READ_VIEWS=True)
+    def test_comments_are_posted_by_the_sync_view(self):
+        self.client.force_login(self.user)
+        path = reverse(
+            'review:review', kwargs={'review_slug': self.reviews[0].slug})
+        response = self.client.post(path, {'text': 'From the async view'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertTrue(
+            self.reviews[0].comments.filter(
+                text='From the async view').exists())
+
+
+#  Tests for the similarity-ranked filters
+
+
+class SimilarityRankedFilterTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.contains = Review.objects.create(title='My new phone case')
+        self.prefix = Review.objects.create(title='Phone stand')
+        self.exact = Review.objects.create(title='Phone')
+
+    def test_default_ordering_is_unchanged(self):
+        filterset = ReviewFilter({'title': 'phone'}, Review.published.all())
+        self.assertEqual(
+            list(filterset.qs), [self.exact, self.prefix, self.contains])
+
+    def test_ranked_ordering(self):
+        """
+        Test that `ranked=true` puts the closest matches first even when
+        they are older.
+        """
+        Review.objects.filter(pk=self.contains.pk).update(
+            time_created=self.exact.time_created + timedelta(days=1))
+        filterset = ReviewFilter(
+            {'title': 'phone', 'ranked': 'true'}, Review.published.all())
+        self.assertEqual(
+            list(filterset.qs), [self.exact, self.prefix, self.contains])
+
+    def test_ranked_category_filter(self):
+        Category.objects.create(name='Smart phones')
+        exact = Category.objects.create(name='Phones')
+        filterset = CategoryFilter(
+            {'name': 'phones', 'ranked': 'true'}, Category.objects.all())
+        self.assertEqual(filterset.qs.first(), exact)
+
+    def test_ranked_ordering_with_keyset_pages(self):
+        filterset = ReviewFilter(
+            {'title': 'phone', 'ranked': 'true'}, Review.published.all())
+        paginator = KeysetPaginator(filterset.qs, 1)
+        page = paginator.get_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, [self.exact, self.prefix, self.contains])
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reviews = mixer.cycle(12).blend(Review, is_published=True)
+        # Equal creation times must be ordered by the id tie-breaker.
+        Review.objects.filter(pk__in=[r.pk for r in self.reviews[3:8]]).update(
+            time_created=self.reviews[3].time_created)
+        self.expected = list(Review.published.all())
+        self.url = reverse('review:all_reviews')
+
+    def get_cursor(self, page_url):
+        return page_url.split('cursor=')[1]
+
+    def test_pages_follow_ordering(self):
+        """
+        Test that following the next cursors returns every review once,
+        in the order of Review.Meta.ordering, and that the previous cursor
+        leads back to the same page.
+        """
+        seen, pages = [], []
+        params = {}
+        while True:
+            response = self.client.get(self.url, params)
+            page = list(response.context_data['reviews'])
+            pages.append(page)
+            seen.extend(page)
+            next_url = response.context_data['next_page_url']
+            if next_url is None:
+                break
+            params = {'cursor': self.get_cursor(next_url)}
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+
+        previous_url = response.context_data['previous_page_url']
+        response = self.client.get(
+            self.url, {'cursor': self.get_cursor(previous_url)})
+        self.assertEqual(list(response.context_data['reviews']), pages[1])
+        self.assertIsNotNone(response.context_data['previous_page_url'])
+
+    def test_deep_page_query_has_no_offset(self):
+        response = self.client.get(self.url)
+        cursor = self.get_cursor(response.context_data['next_page_url'])
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'cursor': cursor})
+        page_queries = [
+            query['sql'] for query in queries
+            if 'FROM "review_review"' in query['sql']
+            and 'LIMIT' in query['sql']]
+        self.assertTrue(page_queries)
+        self.assertNotIn('OFFSET', page_queries[0])
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(
+            list(response.context_data['reviews']), self.expected[:5])
+
+    def test_heading_does_not_depend_on_the_page(self):
+        response = self.client.get(self.url)
+        cursor = self.get_cursor(response.context_data['next_page_url'])
+        for params in ({}, {'cursor': cursor}, {'page': '2'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(
+                response.context_data['info_heading'], 'All Reviews')
+
+    def test_cursor_keeps_filter_parameters(self):
+        response = self.client.get(self.url, {'description': ''})
+        self.assertIn(
+            'description=', response.context_data['next_page_url'])
+
+    def test_xhr_request_renders_list_items(self):
+        response = self.client.get(
+            self.url, headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertTemplateUsed(response, 'review/review_list_items.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'data-next-url')
+
+
+class ReviewCSVImportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = mixer.blend(
+            Category, name='Phones', slug='phones')
+        self.author = mixer.blend(get_user_model(), username='writer')
+        mixer.blend(Review, slug='existing-review')
+
+    def make_csv(self, rows):
+        lines = ['title,description,is_published,category,author']
+        lines.extend(rows)
+        return StringIO('\n'.join(lines) + '\n')
+
+    def test_import_resolves_references_and_slugs(self):
+        csv_file = self.make_csv([
+            'Existing review,First,1,phones,writer',
+            'Existing review,Second,0,Phones,',
+            'New phone,Third,,,writer',
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            result = ReviewCSVImporter(batch_size=2).import_file(csv_file)
+        self.assertEqual((result.rows, result.created), (3, 3))
+        self.assertEqual(result.error_count, 0)
+
+        first, second, third = Review.objects.order_by('pk')[1:]
+        self.assertEqual(first.slug, 'existing-review-2')
+        self.assertEqual(second.slug, 'existing-review-3')
+        self.assertEqual(third.slug, 'new-phone')
+        self.assertEqual(first.category, self.category)
+        self.assertEqual(second.category, self.category)
+        self.assertEqual(first.author, self.author)
+        self.assertFalse(second.is_published)
+        self.assertTrue(third.is_published)
+
+        # The cached references are not looked up again in the 2nd batch.
+        user_table = get_user_model()._meta.db_table
+        self.assertEqual(
+            sum(f'FROM "{user_table}"' in q['sql'] for q in queries), 1)
+
+        self.category.refresh_from_db()
+        self.assertEqual(self.category.published_reviews_count, 1)
+
+    def test_invalid_rows_are_reported(self):
+        csv_file = self.make_csv([
+            ',No title,1,,',
+            'Unknown category,Text,1,tablets,',
+            'Bad status,Text,maybe,,',
+            'Valid,Text,1,,',
+        ])
+        result = ReviewCSVImporter().import_file(csv_file)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.error_count, 3)
+        self.assertEqual([line for line, _ in result.errors], [2, 3, 4])
+        self.assertIn('tablets', result.errors[1][1])
+
+    def test_management_command(self):
+        path = Path(self.enterContext(TemporaryDirectory())) / 'reviews.csv'
+        path.write_text(self.make_csv(['Imported,Text,1,,']).getvalue())
+        out = StringIO()
+        call_command('import_reviews_csv', str(path), stdout=out)
+        self.assertIn('Imported 1 of 1 reviews', out.getvalue())
+        self.assertTrue(Review.objects.filter(slug='imported').exists())
+
+    def test_admin_import(self):
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'adminpass123')
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile(
+            'reviews.csv',
+            self.make_csv(['From admin,Text,1,phones,writer']).getvalue()
+            .encode())
+        response = self.client.post(
+            reverse('admin:import_review_csv'), {'csv_file': upload})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertTrue(Review.objects.filter(slug='from-admin').exists())
+
+
+class ReviewExportTestCase(TestCase):
+    def setUp(self):
+        category = mixer.blend(Category, name='Phones', slug='phones')
+        author = mixer.blend(get_user_model(), username='writer')
+        self.reviews = mixer.cycle(5).blend(
+            Review, category=category, author=author,
+            title=mixer.sequence('Review {0}'))
+        for review in self.reviews:
+            mixer.cycle(2).blend(ReviewTopic, review=review)
+
+    def test_ndjson_loads_topics_per_chunk(self):
+        exporter = ReviewExporter(Review.objects.all(), chunk_size=2)
+        with CaptureQueriesContext(connection) as queries:
+            lines = ''.join(exporter.stream('ndjson')).splitlines()
+        # One query for the reviews and one for the topics of each chunk.
+        self.assertEqual(len(queries), 4)
+
+        exported = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [review['slug'] for review in exported],
+            list(Review.objects.values_list('slug', flat=True)))
+        self.assertEqual(exported[0]['category'], 'phones')
+        self.assertEqual(exported[0]['author'], 'writer')
+        self.assertEqual(len(exported[0]['topics']), 2)
+
+    def test_csv_export_can_be_imported(self):
+        exported = ''.join(
+            ReviewExporter(Review.objects.all()).stream('csv'))
+        Review.objects.all().delete()
+
+        result = ReviewCSVImporter().import_file(StringIO(exported))
+        self.assertEqual((result.created, result.error_count), (5, 0))
+        self.assertEqual(
+            set(Review.objects.values_list('slug', 'category__slug')),
+            {(review.slug, 'phones') for review in self.reviews})
+
+    def test_admin_action_streams(self):
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'adminpass123')
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse('admin:review_review_changelist'), {
+                'action': 'export_csv',
+                '_selected_action': [self.reviews[0].pk],
+            })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(
+            b''.join(response.streaming_content).decode())))
+        self.assertEqual(
+            [row['slug'] for row in rows], [self.reviews[0].slug])
+
+
+class ImageRenditionsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = self.enterContext(TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=self.media_root))
+        buffer = BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(buffer, 'JPEG')
+        with self.captureOnCommitCallbacks():
+            self.review = Review.objects.create(
+                title='Camera', main_image=SimpleUploadedFile(
+                    'photo.jpg', buffer.getvalue(), 'image/jpeg'))
+
+    def test_renditions_are_written_next_to_the_original(self):
+        image = self.review.main_image
+        renditions = generate_renditions(
+            image.storage, image.name, RENDITION_WIDTHS['main_image'])
+        # 1280 is wider than the original, which is not upscaled.
+        self.assertEqual([w for w, _ in renditions['webp']], [320, 640, 800])
+        self.assertEqual(
+            renditions['jpeg'][0][1],
+            'review_main_images/Camera/renditions/photo.jpg-320w.jpg')
+        with image.storage.open(renditions['webp'][0][1]) as file:
+            self.assertEqual(Image.open(file).size, (320, 160))
+
+    def test_originals_sharing_a_stem_have_distinct_renditions(self):
+        image = self.review.main_image
+        buffer = BytesIO()
+        Image.new('RGBA', (400, 200), 'blue').save(buffer, 'PNG')
+        png_name = image.storage.save(
+            posixpath.join(posixpath.dirname(image.name), 'photo.png'),
+            ContentFile(buffer.getvalue()))
+
+        jpg_renditions = generate_renditions(image.storage, image.name, (320,))
+        png_renditions = generate_renditions(image.storage, png_name, (320,))
+        self.assertNotEqual(
+            jpg_renditions['webp'][0][1], png_renditions['webp'][0][1])
+        self.assertEqual(
+            png_renditions['png'][0][1],
+            'review_main_images/Camera/renditions/photo.png-320w.png')
+        with image.storage.open(jpg_renditions['webp'][0][1]) as file:
+            self.assertEqual(Image.open(file).size, (320, 160))
+        cache.clear()
+        self.assertEqual(
+            renditions._find_renditions(image.storage, image.name),
+            jpg_renditions)
+
+    def test_missing_renditions_are_scheduled_once(self):
+        executor = mock.Mock()
+        with mock.patch(
+                'review.renditions._get_executor', return_value=executor), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(
+                get_renditions(self.review.main_image, (320,)), {})
+        executor.submit.assert_called_once()
+        renditions._pending.clear()
+
+    def test_picture_tag_and_api_field(self):
+        template = Template(
+            '{% load renditions %}{% picture review.main_image alt="A" %}')
+        html = template.render(Context({'review': self.review}))
+        self.assertTrue(html.startswith('<img'))
+
+        image = self.review.main_image
+        generate_renditions(
+            image.storage, image.name, RENDITION_WIDTHS['main_image'])
+        # Found in the storage even when the cached availability is gone.
+        cache.clear()
+        html = template.render(Context({'review': self.review}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('photo.jpg-640w.webp 640w', html)
+
+        data = ReviewSerializer(self.review).data
+        self.assertIn(
+            'photo.jpg-320w.jpg 320w', data['main_image_renditions']['jpeg'])
+
+
+class SitemapTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reviews = mixer.cycle(3).blend(Review, is_published=True)
+        self.draft = mixer.blend(Review, is_published=False)
+        self.index_url = reverse('sitemap_index')
+        self.section_url = reverse('sitemap_section', kwargs={'section': 0})
+
+    def test_index_lists_sections(self):
+        response = self.client.get(self.index_url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Last-Modified', response.headers)
+        self.assertContains(response, 'sitemap-reviews-0.xml')
+
+    def test_section_lists_published_reviews(self):
+        response = self.client.get(self.section_url)
+        for review in self.reviews:
+            self.assertContains(response, review.get_absolute_url())
+        self.assertNotContains(response, self.draft.get_absolute_url())
+        self.assertEqual(
+            self.client.get(reverse(
+                'sitemap_section', kwargs={'section': 99})).status_code,
+            HTTPStatus.NOT_FOUND)
+
+    def test_cached_section_skips_queries(self):
+        self.client.get(self.section_url)
+        with self.assertNumQueries(0):
+            self.client.get(self.section_url)
+
+    def test_conditional_request(self):
+        response = self.client.get(self.section_url)
+        response = self.client.get(
+            self.section_url,
+            headers={'If-Modified-Since': response.headers['Last-Modified']})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_unpublishing_regenerates_section(self):
+        self.client.get(self.section_url)
+        review = self.reviews[0]
+        review.is_published = False
+        review.save()
+        response = self.client.get(self.section_url)
+        self.assertNotContains(response, review.get_absolute_url())
+
+
+class BenchmarkTestCase(TestCase):
+    def test_seed_reviews_grows_the_dataset(self):
+        self.assertEqual(seed_reviews(5), 5)
+        self.assertEqual(seed_reviews(8), 3)
+        self.assertEqual(seed_reviews(8), 0)
+        review = Review.published.first()
+        self.assertEqual(review.comments_count, 3)
+        self.assertEqual(review.topics.count(), 2)
+
+    def test_command_writes_json_report(self):
+        seed_reviews(3)
+        with TemporaryDirectory() as folder:
+            path = Path(folder) / 'report.json'
+            call_command(
+                'benchmark', '--no-seed', '--requests', '4', '--warmup', '1',
+                '--concurrency', '1', '--output', str(path), stdout=StringIO())
+            report = json.loads(path.read_text())
+
+        results = {result['endpoint']: result for result in report['results']}
+        self.assertEqual(set(results), set(ENDPOINTS))
+        for result in results.values():
+            self.assertEqual(result['requests'], 4)
+            self.assertEqual(result['errors'], 0)
+            self.assertLessEqual(result['p50'], result['p99'])
+
+    def test_async_mode(self):
+        seed_reviews(3)
+        result = run_endpoint(
+            'reviews', reverse('review:all_reviews'), 4, 2, warmup=1,
+            mode='async')
+        self.assertEqual(result.mode, 'async')
+        self.assertEqual(result.requests, 4)
+        self.assertEqual(result.errors, 0)
+        self.assertGreater(result.queries_per_request, 0)
+
+    def test_compare_reports_flags_regressions(self):
+        baseline = {'results': [{
+            'endpoint': 'reviews', 'size': 100, 'concurrency': 1,
+            'p95': 10.0, 'requests_per_second': 100.0,
+            'queries_per_request': 3.0}]}
+        current = {'results': [dict(baseline['results'][0])]}
+        self.assertEqual(compare_reports(baseline, current), [])
+
+        current['results'][0].update(p95=12.0, queries_per_request=4.0)
+        self.assertEqual(len(compare_reports(baseline, current)), 2)
+        self.assertEqual(
+            compare_reports(baseline, current, threshold=0.5), [
+                'reviews (size 100, concurrency 1, sync): 3.0 -> 4.0 '
+                'queries/request'])
+
+
+class SyntheticDataTestCase(TestCase):
+    def generate(self, **kwargs):
+        options = dict(
+            users=20, categories=4, reviews=50, comments=300, likes=200,
+            workers=1, batch_size=100)
+        options.update(kwargs)
+        return SyntheticDataGenerator(**options).run()
+
+    def test_generates_consistent_rows(self):
+        counts = self.generate()
+        self.assertEqual(counts['users'], 20)
+        self.assertEqual(Review.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), counts['comments'])
+        self.assertEqual(
+            Review.likes.through.objects.count(), counts['likes'])
+
+        for review in Review.objects.all():
+            self.assertEqual(review.comments_count, review.comments.count())
+            self.assertEqual(review.likes_count, review.likes.count())
+        self.assertEqual(
+            sum(Category.objects.values_list(
+                'published_reviews_count', flat=True)),
+            Review.published.count())
+
+    def test_popularity_is_skewed(self):
+        self.generate()
+        likes = sorted(
+            Review.objects.values_list('likes_count', flat=True),
+            reverse=True)
+        self.assertGreater(likes[0], 4 * sum(likes) / len(likes))
+
+    def test_regular_writes_follow_generated_rows(self):
+        self.generate()
+        review = Review.objects.create(title='Written after the load')
+        self.assertGreater(review.pk, 50)
+        self.generate(comments=0, likes=0)
+        self.assertEqual(Review.objects.count(), 101)
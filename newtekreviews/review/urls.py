@@ -1,8 +1,10 @@
 from django.urls import path
 from django.views.decorators.cache import cache_page
 
+from . import async_views
+from .async_views import read_path
 from .views import (
-    index, about, search_reviews,
+    index, about, search_reviews, like_review, review_comments,
     ReviewListView, ArchivedReviewListView,
     ReviewDetailView, ReviewCreateView, ReviewUpdateView, ReviewDeleteView,
     ReviewTopicCreateView, ReviewTopicUpdateView, ReviewTopicDeleteView,
@@ -18,21 +20,37 @@ urlpatterns = [
     path('', index, name='main'),
     path('about/', about, name='about'),
     path('contact/', ContactFormView.as_view(), name='contact'),
-    path('search-results/', search_reviews, name='search'),
+    read_path(
+        'search-results/', search_reviews, async_views.search_reviews,
+        name='search'),
 
     # Review URLs
-    path(
+    read_path(
         'reviews/', ReviewListView.as_view(),
+        async_views.AsyncReviewListView.as_view(),
         name='all_reviews'
         ),
     path(
         'archived_reviews/', ArchivedReviewListView.as_view(),
         name='archived_reviews'
         ),
-    path(
+    read_path(
         'review/<slug:review_slug>/', ReviewDetailView.as_view(),
+        async_views.AsyncReviewDetailView.as_view(),
         name='review'
         ),
+    path(
+        'review/<slug:review_slug>/like/', like_review, {'liked': True},
+        name='review_like'
+        ),
+    path(
+        'review/<slug:review_slug>/unlike/', like_review, {'liked': False},
+        name='review_unlike'
+        ),
+    path(
+        'review/<slug:review_slug>/comments/', review_comments,
+        name='review_comments'
+        ),
     path(
         'create/', ReviewCreateView.as_view(),
         name='review_create'
@@ -61,12 +79,14 @@ urlpatterns = [
         ),
 
     # Category URLs
-    path(
+    read_path(
         'categories/', CategoryListView.as_view(),
+        async_views.AsyncCategoryListView.as_view(),
         name='categories'
         ),
-    path(
+    read_path(
         'categories/<slug:category_slug>/', CategoryDetailView.as_view(),
+        async_views.AsyncCategoryDetailView.as_view(),
         name='category'
         ),
     path(
@@ -1,6 +1,5 @@
-from django.utils.text import slugify
-
 from .models import Review, ReviewTopic
+from .slugs import assign_slugs
 
 
 class DataMixin:
@@ -41,10 +40,8 @@ class DataMixin:
         Returns a string that describes the current filter applied to the
         list view.
 
-        If a page number is provided in the query string, the method returns
-        a string of the form 'All reviews <page number> page' or 'Archived
-        reviews <page number> page', depending on whether the view is showing
-        archived or published reviews.
+        The lists are paginated by an opaque `cursor`, which has no page
+        number, so the heading is the same on every page.
 
         If a title, description, or creation date is provided in the query
         string, the method returns a string describing the filter, for example
@@ -62,15 +59,12 @@ class DataMixin:
         :rtype: str
         """
         filter_data = self.request.GET.dict()
-        page = filter_data.get("page", '')
         title = filter_data.get("title", '')
         description = filter_data.get("description", '')
         time_created = filter_data.get("time_created", '')
 
         info_parts = []
 
-        if page:
-            return f'{'All reviews' if not archived else 'Archived reviews'} {page} page'
         if title:
             info_parts.append(f'title: {title}')
         if description:
@@ -92,7 +86,8 @@ def update_slug(old, new) -> str:
     This function checks if the title of the given `old` and `new` instances
     of either the `Review` or `ReviewTopic` class has changed. If the title
     of the `Review` instance or the `review_topic_title` of the `ReviewTopic`
-    instance has changed, it generates a new slug using the updated title(s).
+    instance has changed, a unique slug is allocated from the updated
+    title(s). The instance's own current slug may be reused.
 
     Args:
         old: The original instance of either `Review` or `ReviewTopic`.
@@ -104,10 +99,12 @@ def update_slug(old, new) -> str:
 
     if isinstance(old, Review) and \
             old.title != new.title:
-        return slugify(new.title)
+        text = new.title
     elif isinstance(old, ReviewTopic) \
             and old.review_topic_title != new.review_topic_title:
-        return slugify(
-            f"{new.review.title}-{new.review_topic_title}")
+        text = new.get_slug_text()
+    else:
+        return old.slug
 
-    return old.slug
+    assign_slugs([new], [text], exclude_pk=old.pk)
+    return new.slug
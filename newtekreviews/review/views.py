@@ -1,9 +1,10 @@
 import logging
 
 from typing import Any
+from django.db.models import Prefetch
 from django.db.models.base import Model as Model
 from django.db.models.query import QuerySet
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.urls import reverse, reverse_lazy
 from django.shortcuts import get_object_or_404, render, redirect
 from django.views.generic import (
@@ -12,19 +13,36 @@ from django.views.generic import (
 from django.contrib.auth.mixins import (
     LoginRequiredMixin, PermissionRequiredMixin
     )
-from django.core.cache import cache
-
+from django.core.paginator import Paginator
+from django.utils.cache import get_conditional_response
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date, urlencode
+from django.views.decorators.http import require_POST
+
+from .caching import (
+    GenerationCachedListMixin, get_cached_count, get_review_version,
+    FRAGMENT_CACHE_TIMEOUT)
+from .counters import set_like, toggle_like
+from .paginators import KeysetPaginationMixin, KeysetPaginator
+from .slugs import assign_slugs
 from .utils import DataMixin, update_slug
-from .models import Review, ReviewTopic, Category
+from .models import Review, ReviewTopic, Category, Comment
 from .forms import (
     AddReviewForm, ContactForm, AddCategoryForm,
     AddReviewTopicForm, EditReviewTopicForm,
     ReviewTopicFormSet, UpdateReviewTopicFormSet,
     CommentForm, LikeForm)
 from .filters import ReviewFilter, CategoryFilter
+from .search import search_reviews as search
+from .sitemaps import get_section_sitemap, get_sitemap_index
 
 logger = logging.getLogger(__name__)
 
+SEARCH_PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+# The query parameter of the review page opening a later page of comments.
+COMMENTS_CURSOR_PARAM = 'comments_cursor'
+
 
 def index(request) -> HttpResponse:
     return render(
@@ -44,48 +62,85 @@ def contact(request) -> HttpResponse:
         )
 
 
+def _sitemap_response(request, entry) -> HttpResponse:
+    """
+    Returns the cached sitemap XML with a Last-Modified header, or
+    304 Not Modified for a conditional request that is up to date.
+    """
+    last_modified = int(entry['lastmod'].timestamp())
+    response = get_conditional_response(request, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(entry['xml'], content_type='application/xml')
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    return response
+
+
+def sitemap_index(request) -> HttpResponse:
+    """Serves the sitemap index listing the review sections."""
+    return _sitemap_response(request, get_sitemap_index(request))
+
+
+def sitemap_section(request, section: int) -> HttpResponse:
+    """Serves one section of the review sitemap."""
+    entry = get_section_sitemap(request, section)
+    if entry is None:
+        raise Http404('No such sitemap section.')
+    return _sitemap_response(request, entry)
+
+
 def search_reviews(request) -> HttpResponse:
-    if request.method == 'POST':
-        searched = request.POST['searched']
-        reviews = Review.published.filter(title__icontains=searched)
-        return render(
-            request, 'review/search_reviews.html',
-            {'searched': searched, 'reviews': reviews}
-            )
-    else:
-        return render(
-            request, 'review/search_reviews.html', {}
-            )
-
-
-class ReviewListView(DataMixin, ListView):
+    """
+    Renders the ranked full-text search results for the `q` GET parameter.
+
+    The search covers the title, description and topics of published
+    reviews. Because it is a GET request, result pages can be linked and
+    the results are cached by SearchResults.
+    """
+    searched = request.GET.get('q', '').strip()
+    page_obj = None
+    if searched:
+        paginator = Paginator(search(searched), SEARCH_PAGE_SIZE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+
+    return render(
+        request, 'review/search_reviews.html',
+        {
+            'searched': searched,
+            'page_obj': page_obj,
+            'reviews': page_obj.object_list if page_obj else [],
+        }
+        )
+
+
+class ReviewListView(DataMixin, KeysetPaginationMixin, ListView):
     model = Review
     page_title = 'All Reviews'
     info_heading = 'Reviews'
     context_object_name = 'reviews'
     template_name = 'review/review_list.html'
+    fragment_template_name = 'review/review_list_items.html'
     paginate_by = 5
+    cache_prefix = 'reviews:published'
+    cache_models = (Review,)
 
     def get_queryset(self):
         """
-        Retrieves all published reviews from the cache or database.
-
-        If the reviews are not in the cache, it retrieves all published reviews
-        from the database and caches them.
+        Retrieves all published reviews filtered by the GET parameters.
 
         The reviews are filtered using the ReviewFilter class, which filters
         the reviews based on the GET parameters passed in the request.
+        The queryset is paginated by KeysetPaginationMixin, which caches
+        the primary keys of each page, so only the rows of the requested
+        page are loaded from the database.
 
         Returns:
             QuerySet: A queryset of all published reviews filtered by the GET
             parameters.
         """
 
-        review_list = cache.get('all_reviews')
-        if not review_list:
-            review_list = Review.published.all().select_related(
-                'category').select_related('author')
-            cache.set('all_reviews', review_list, 60)
+        review_list = Review.published.all().select_related(
+            'category').select_related('author')
 
         self.filterset = ReviewFilter(self.request.GET, queryset=review_list)
 
@@ -108,8 +163,7 @@ class ReviewListView(DataMixin, ListView):
         dict: The updated context dictionary.
         """
         context = super().get_context_data(**kwargs)
-        context['reviews_count'] = Review.published.count()
-        context['filtered_reviews_count'] = len(self.filterset.qs)
+        context.update(self.get_counts())
         context['filter'] = self.filterset
 
         headings = self.get_filter_headings()  # from DataMixin
@@ -119,20 +173,32 @@ class ReviewListView(DataMixin, ListView):
         return context
 
 
-class ArchivedReviewListView(DataMixin, LoginRequiredMixin, ListView):
+    def get_counts(self) -> dict:
+        """Returns the cached total and filtered numbers of reviews."""
+        return {
+            'reviews_count': get_cached_count(
+                'reviews:published', Review.published.all(), Review),
+            'filtered_reviews_count': get_cached_count(
+                'reviews:published', self.filterset.qs, Review,
+                params=self.request.GET),
+        }
+
+
+class ArchivedReviewListView(
+        DataMixin, LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Review
     info_heading = 'Archived reviews'
     page_title = 'Archived Reviews'
     context_object_name = 'reviews'
     template_name = 'review/review_list.html'
+    fragment_template_name = 'review/review_list_items.html'
     paginate_by = 5
+    cache_prefix = 'reviews:archived'
+    cache_models = (Review,)
 
     def get_queryset(self):
-        review_list = cache.get('archived_reviews')
-        if not review_list:
-            review_list = Review.archived.all().select_related(
-                'category').select_related('author')
-            cache.set('archived_reviews', review_list, 60)
+        review_list = Review.archived.all().select_related(
+            'category').select_related('author')
 
         self.filterset = ReviewFilter(self.request.GET, queryset=review_list)
 
@@ -154,8 +220,11 @@ class ArchivedReviewListView(DataMixin, LoginRequiredMixin, ListView):
         dict: The updated context dictionary.
         """
         context = super().get_context_data(**kwargs)
-        context['reviews_count'] = Review.archived.count()
-        context['filtered_reviews_count'] = len(self.filterset.qs)
+        context['reviews_count'] = get_cached_count(
+            'reviews:archived', Review.archived.all(), Review)
+        context['filtered_reviews_count'] = get_cached_count(
+            'reviews:archived', self.filterset.qs, Review,
+            params=self.request.GET)
         context['filter'] = self.filterset
 
         headings = self.get_filter_headings(archived=True)  # from DataMixin
@@ -167,6 +236,69 @@ class ArchivedReviewListView(DataMixin, LoginRequiredMixin, ListView):
 
 # Review CRUD views
 
+def get_comments_paginator(review) -> KeysetPaginator:
+    """
+    Returns a paginator over the comments of `review`, newest first.
+    The authors and their profiles are joined into the page query.
+    """
+    return KeysetPaginator(
+        Comment.objects.filter(review=review).select_related(
+            'author__profile'),
+        COMMENTS_PAGE_SIZE, ordering=['-time_created'])
+
+
+def serialize_comment(comment: Comment) -> dict:
+    author = comment.author
+    profile = getattr(author, 'profile', None) if author else None
+    photo = profile.profile_photo if profile else None
+    return {
+        'id': comment.pk,
+        'author': author.username if author else None,
+        'author_photo': photo.url if photo else None,
+        'text': comment.text,
+        'time_created': comment.time_created.isoformat(),
+    }
+
+
+def review_comments(request, review_slug: str) -> HttpResponse:
+    """
+    Returns the page of comments of a review after the `cursor` GET
+    parameter, for the "Load more" button of the review page.
+
+    The page is rendered as an HTML fragment for `fetch` requests, or
+    as JSON when the client asks for `application/json`:
+    `{"comments": [...], "next": url or null}`. Other requests, e.g. the
+    link followed without JavaScript, are redirected to the review page
+    showing the same page of comments.
+    """
+    review = get_object_or_404(
+        Review.objects.only('pk', 'slug'), slug=review_slug)
+    cursor = request.GET.get('cursor')
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    if not wants_json and \
+            request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        query = '?' + urlencode({COMMENTS_CURSOR_PARAM: cursor}) \
+            if cursor else ''
+        return redirect(review.get_absolute_url() + query + '#comments')
+
+    page = get_comments_paginator(review).get_page(cursor)
+    next_url = None
+    if page.has_next():
+        next_url = reverse(
+            'review:review_comments', kwargs={'review_slug': review.slug}
+        ) + '?' + urlencode({'cursor': page.next_cursor})
+
+    if wants_json:
+        return JsonResponse({
+            'comments': [serialize_comment(comment) for comment in page],
+            'next': next_url,
+        })
+    return render(request, 'review/comment_list_items.html', {
+        'comments_page': page,
+        'comments_url': request.path,
+    })
+
+
 class ReviewDetailView(DataMixin, DetailView):
     model = Review
     template_name = 'review/review_detail.html'
@@ -174,22 +306,51 @@ class ReviewDetailView(DataMixin, DetailView):
     context_object_name = 'review'
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        """
+        Adds the data needed by the cached fragments of the template.
+
+        The topics and the first page of comments are cached as template
+        fragments under the review's version, so the comment page is
+        passed lazily and only loaded on a cache miss.
+        The like button state and the edit links depend on the current
+        user and are computed per request.
+        """
         context = super().get_context_data(**kwargs)
+        review = context['review']
+        user = self.request.user
         context['comment_form'] = CommentForm()
+        # Set when the "Load more" link is followed without JavaScript.
+        comments_cursor = self.request.GET.get(COMMENTS_CURSOR_PARAM, '')
+        context['comments_cursor'] = comments_cursor
+        context['comments_page'] = SimpleLazyObject(
+            lambda: get_comments_paginator(review).get_page(comments_cursor))
+        context['comments_url'] = reverse(
+            'review:review_comments', kwargs={'review_slug': review.slug})
+        context.update(self.get_review_state(review, user))
+        context['fragment_cache_timeout'] = FRAGMENT_CACHE_TIMEOUT
+        context['can_edit'] = user.is_authenticated and \
+            (user == review.author or user.is_superuser)
         return self.get_mixin_context(
-            context, page_title="NewTekReviews - " + context['review'].title)
+            context, page_title="NewTekReviews - " + review.title)
+
+    def get_review_state(self, review, user) -> dict:
+        """
+        Returns the version of the review's cached fragments and whether
+        `user` likes the review.
+        """
+        return {
+            'review_version': get_review_version(review.pk),
+            'user_liked': user.is_authenticated and
+            review.likes.filter(pk=user.pk).exists(),
+        }
 
     def get_object(self, queryset: QuerySet[Any] | None = ...) -> Model:
-        logger.info(
-            f'Retrieving review: {get_object_or_404(
-                Review, slug=self.kwargs[self.slug_url_kwarg]).title}'
-            )
-        return get_object_or_404(
-            Review.objects.prefetch_related(
-                'likes', 'comments')
-            .select_related('author')
+        review = get_object_or_404(
+            Review.objects.select_related('author')
             .select_related('category'),
             slug=self.kwargs[self.slug_url_kwarg])
+        logger.info(f'Retrieving review: {review.title}')
+        return review
 
     def post(self, request, *args, **kwargs):
         """
@@ -228,16 +389,32 @@ class ReviewDetailView(DataMixin, DetailView):
             if like_form.is_valid():
                 review = get_object_or_404(
                     Review, id=like_form.cleaned_data['review_id'])
-                if request.user in review.likes.all():
-                    review.likes.remove(request.user)
-                else:
-                    review.likes.add(request.user)
+                toggle_like(review, request.user)
                 return redirect('review:review', review_slug=review.slug)
 
         context = self.get_context_data(comment_form=comment_form)
         return self.render_to_response(context)
 
 
+@require_POST
+def like_review(request, review_slug: str, liked: bool) -> JsonResponse:
+    """
+    Likes or unlikes a review for the current user and returns the new
+    state as JSON, e.g. `{"liked": true, "likes_count": 12}`.
+
+    The endpoint is idempotent: liking a review twice keeps one like.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Authentication required.'}, status=403)
+    review = get_object_or_404(Review.objects.only('pk'), slug=review_slug)
+    try:
+        likes_count = set_like(review, request.user, liked)
+    except Review.DoesNotExist:
+        raise Http404
+    return JsonResponse({'liked': liked, 'likes_count': likes_count})
+
+
 class ReviewCreateView(
         PermissionRequiredMixin, LoginRequiredMixin, CreateView):
     form_class = AddReviewForm
@@ -274,7 +451,8 @@ class ReviewCreateView(
             - Initializes a `review_topic` instance
             without saving to the database.
             - Links `review_topic` to the main `review` object (`self.object`).
-            - Saves each `review_topic` instance.
+        The slugs of all topics are allocated with a single query,
+        then each `review_topic` instance is saved.
 
         Redirects to `self.success_url` upon successful form processing,
         otherwise calls `self.form_invalid(form)` if any form validation fails.
@@ -296,11 +474,18 @@ class ReviewCreateView(
             review.author = self.request.user
             self.object = form.save()
 
+            review_topics = []
             for review_topic_form in review_topic_formset:
                 if review_topic_form.cleaned_data:
                     review_topic = review_topic_form.save(commit=False)
                     review_topic.review = self.object
-                    review_topic.save()
+                    review_topics.append(review_topic)
+
+            assign_slugs(
+                review_topics,
+                [topic.get_slug_text() for topic in review_topics])
+            for review_topic in review_topics:
+                review_topic.save()
 
             return redirect(self.success_url)
         else:
@@ -457,33 +642,31 @@ class ReviewTopicDeleteView(
             ReviewTopic, slug=self.kwargs['topic_slug'])
 
 
-class CategoryListView(DataMixin, ListView):
+class CategoryListView(DataMixin, GenerationCachedListMixin, ListView):
     model = Category
     page_title = 'Categories'
     info_heading = 'Categories'
     context_object_name = 'categories'
     template_name = 'review/category_list.html'
     paginate_by = 10
+    cache_prefix = 'categories'
+    cache_models = (Category,)
 
     def get_queryset(self):
         """
-        Retrieves all published categories from the cache or database.
-
-        If the categories are not in the cache, it retrieves all published
-        categories from the database and caches them.
+        Retrieves all categories filtered by the GET parameters.
 
         The categories are filtered using the CategoryFilter class, which
         filters the categories based on the GET parameters passed in the
-        request.
+        request. The primary keys of the filtered categories are cached by
+        GenerationCachedListMixin, so only the rows of the requested page
+        are loaded from the database.
 
         Returns:
-            QuerySet: A queryset of all published categories filtered by the
+            QuerySet: A queryset of all categories filtered by the
             GET parameters.
         """
-        category_list = cache.get('categories')
-        if category_list is None:
-            category_list = Category.objects.prefetch_related('reviews').all()
-            cache.set('categories', category_list, timeout=60)
+        category_list = Category.objects.all()
         self.filterset = CategoryFilter(
             self.request.GET, queryset=category_list)
 
@@ -524,9 +707,11 @@ class CategoryDetailView(DataMixin, DetailView):
             Model: The Category object retrieved based on the category slug.
         """
         return get_object_or_404(
-            Category.objects.prefetch_related('reviews'),
-            slug=self.kwargs[self.slug_url_kwarg]
-            )
+            self.get_queryset(), slug=self.kwargs[self.slug_url_kwarg])
+
+    def get_queryset(self) -> QuerySet[Category]:
+        return Category.objects.prefetch_related(Prefetch(
+            'reviews', queryset=Review.objects.select_related('author')))
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -1,5 +1,15 @@
 from django.contrib import admin
 
-from .models import Profile
+from .models import Profile, OutgoingEmail
 
 admin.site.register(Profile)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "subject", "to", "status", "attempts", "next_attempt_at",
+        "sent_at",
+        )
+    list_filter = ("status",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
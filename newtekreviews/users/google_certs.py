@@ -0,0 +1,189 @@
+"""
+Local verification of Google ID tokens against a cached copy of
+Google's public certificates.
+
+`id_token.verify_oauth2_token()` downloads the certificates on every
+call. `GoogleCertificateStore` keeps them for the lifetime announced in
+the `Cache-Control` header of the response, refreshes them in a
+background thread shortly before they expire, and refetches them at
+once only when it has none, or when a token is signed with a key it
+does not know yet, e.g. after a rotation.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from http import HTTPStatus
+
+from google.auth import exceptions, jwt
+from google.auth.transport import requests
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+DEFAULT_MAX_AGE = 5 * 60  # seconds, without a usable Cache-Control
+REFRESH_MARGIN = 5 * 60  # seconds before expiry to refresh in background
+MIN_FETCH_INTERVAL = 30  # seconds between fetches on demand
+
+
+class CertificatesUnavailable(Exception):
+    """The certificates could not be fetched and none are cached."""
+
+
+def get_max_age(headers) -> int:
+    """
+    Returns the seconds a response stays fresh, from its
+    `Cache-Control: max-age` directive less its `Age`.
+    """
+    headers = {name.lower(): value for name, value in headers.items()}
+    match = re.search(
+        r'(?:^|[,\s])max-age=(\d+)', headers.get('cache-control', ''))
+    if match is None or 'no-store' in headers.get('cache-control', ''):
+        return DEFAULT_MAX_AGE
+    try:
+        age = int(headers.get('age', 0))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+
+class GoogleCertificateStore:
+    """
+    A thread-safe, per-process cache of the certificates published at
+    `certs_url`, as a mapping of key id to x509 certificate.
+
+    `request` is a google-auth transport and `clock` returns the current
+    time in seconds; both can be replaced in tests.
+    """
+
+    def __init__(self, certs_url: str = GOOGLE_CERTS_URL, request=None,
+                 clock=time.time):
+        self.certs_url = certs_url
+        self.request = request or requests.Request()
+        self.clock = clock
+        self.certs = {}
+        self.expires_at = 0.0
+        self.attempted_at = 0.0
+        self.refresh_thread = None
+        self._lock = threading.Lock()
+        # Held while fetching, so concurrent requests fetch only once.
+        self._fetch_lock = threading.Lock()
+
+    def fetch(self) -> dict:
+        """
+        Downloads the certificates and stores them with their lifetime.
+
+        Raises:
+            CertificatesUnavailable: If the download fails.
+        """
+        self.attempted_at = self.clock()
+        try:
+            response = self.request(self.certs_url, method='GET')
+            if response.status != HTTPStatus.OK:
+                raise exceptions.TransportError(
+                    f'Status {response.status} from {self.certs_url}')
+            certs = json.loads(response.data.decode('utf-8'))
+        except (exceptions.TransportError, ValueError) as exc:
+            raise CertificatesUnavailable(
+                f'Could not fetch the certificates: {exc}') from exc
+
+        now = self.clock()
+        with self._lock:
+            self.certs = certs
+            self.expires_at = now + get_max_age(response.headers)
+        return certs
+
+    def get_certs(self) -> dict:
+        """
+        Returns the cached certificates, fetching them first if they
+        expired, and starting a background refresh if they are about to.
+        """
+        now = self.clock()
+        if now >= self.expires_at:
+            return self.refetch(expired=True)
+        if now >= self.expires_at - REFRESH_MARGIN:
+            self.refresh_in_background()
+        return self.certs
+
+    def refetch(self, expired: bool = False) -> dict:
+        """
+        Fetches the certificates and returns them, one thread at a time.
+
+        Cached certificates are returned instead when the fetch fails,
+        as Google keeps publishing a key well after it stops signing
+        with it, and without fetching when a fetch was attempted less
+        than MIN_FETCH_INTERVAL ago, so an outage of Google does not
+        make every request wait for a timeout. With `expired`, the
+        certificates fetched by another thread meanwhile are returned.
+
+        Raises:
+            CertificatesUnavailable: If the fetch fails and no
+                certificates are cached.
+        """
+        with self._fetch_lock:
+            now = self.clock()
+            if expired and now < self.expires_at:
+                return self.certs
+            if self.certs and now - self.attempted_at < MIN_FETCH_INTERVAL:
+                return self.certs
+            try:
+                return self.fetch()
+            except CertificatesUnavailable:
+                if not self.certs:
+                    raise
+                logger.warning(
+                    'Using the cached Google certificates', exc_info=True)
+                return self.certs
+
+    def refresh_in_background(self) -> None:
+        """Fetches the certificates in a thread, unless one is running."""
+        with self._lock:
+            if self.refresh_thread is not None and \
+                    self.refresh_thread.is_alive():
+                return
+            self.refresh_thread = threading.Thread(
+                target=self._refresh, daemon=True)
+            self.refresh_thread.start()
+
+    def _refresh(self) -> None:
+        with self._fetch_lock:
+            try:
+                self.fetch()
+            except CertificatesUnavailable:
+                logger.warning(
+                    'Could not refresh the Google certificates',
+                    exc_info=True)
+
+    def verify_token(self, token, audience=None,
+                     clock_skew_in_seconds: int = 0) -> dict:
+        """
+        Verifies the signature, expiry, audience and issuer of a Google
+        ID token, like `id_token.verify_oauth2_token()`.
+
+        Returns:
+            dict: The claims of the token.
+
+        Raises:
+            ValueError: If the token is invalid.
+            CertificatesUnavailable: If no certificates are cached and
+                none can be fetched.
+        """
+        certs = self.get_certs()
+        key_id = jwt.decode_header(token).get('kid')
+        if key_id and key_id not in certs:
+            # Google may have rotated its keys since the last fetch. If
+            # it cannot be reached, the cached keys reject the token.
+            certs = self.refetch()
+
+        claims = jwt.decode(
+            token, certs=certs, audience=audience,
+            clock_skew_in_seconds=clock_skew_in_seconds)
+        if claims.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError(f'Wrong issuer: {claims.get("iss")}')
+        return claims
+
+
+google_certificates = GoogleCertificateStore()
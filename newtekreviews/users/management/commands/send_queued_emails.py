@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import MAX_ATTEMPTS, send_queued_emails
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers the emails queued in the outbox in batches over a "
+        "single email connection, retrying failures with backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of emails claimed per transaction.')
+        parser.add_argument(
+            '--max-attempts', type=int, default=MAX_ATTEMPTS,
+            help='Attempts before an email is marked as failed.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the outbox instead of exiting when empty.')
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            report = send_queued_emails(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'])
+            if report.connection_error:
+                # With --loop the next poll tries to connect again.
+                self.stderr.write(
+                    f'Cannot connect to the email server: '
+                    f'{report.connection_error}')
+            if report.processed or not options['loop']:
+                self.stdout.write(
+                    f'Sent {report.sent} emails, {report.retried} '
+                    f'scheduled for retry, {report.failed} failed')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
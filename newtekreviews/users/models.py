@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from django.templatetags.static import static
 from django.db import models
+from django.utils import timezone
 
 
 class Profile(models.Model):
@@ -22,3 +23,41 @@ class Profile(models.Model):
 
     def __str__(self):
         return self.user.username
+
+
+class OutgoingEmail(models.Model):
+    """
+    An email waiting in the outbox.
+
+    Rows are written in the same transaction as the change that triggers
+    the email and are delivered later by the `send_queued_emails` command,
+    so requests never wait for the SMTP server.
+    """
+    class Status(models.IntegerChoices):
+        PENDING = 0, "Pending"
+        SENT = 1, "Sent"
+        FAILED = 2, "Failed"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField(default=list, verbose_name="Recipients")
+    status = models.PositiveSmallIntegerField(
+        choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Outgoing email"
+        verbose_name_plural = "Outbox"
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"],
+                name="users_outbox_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)}"
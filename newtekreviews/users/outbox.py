@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 60  # seconds before the first retry, doubled on every failure
+MAX_RETRY_DELAY = 60 * 60
+# Seconds a claimed email is hidden from other workers while it is sent.
+# An email whose worker died before recording the result is sent again
+# after this lease.
+CLAIM_TIMEOUT = 10 * 60
+
+
+def queue_email(subject: str, message: str, from_email: str,
+                recipient_list) -> OutgoingEmail:
+    """
+    Stores an email in the outbox instead of sending it.
+
+    The row is written in the caller's transaction, so the email is only
+    delivered if that transaction commits.
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject, body=message, from_email=from_email or '',
+        to=list(recipient_list))
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """Returns the exponential backoff after `attempts` failed attempts."""
+    return timedelta(
+        seconds=min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def _reopen(connection) -> None:
+    """Replaces an email connection whose session may be broken."""
+    connection.close()
+    try:
+        connection.open()
+    except Exception:
+        pass  # The next send opens a connection again.
+
+
+@dataclass
+class DeliveryReport:
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    # Why the email connection could not be opened, if it could not.
+    connection_error: str = ''
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.retried + self.failed
+
+
+def _record_failure(email: OutgoingEmail, error: str, max_attempts: int,
+                    report: DeliveryReport) -> None:
+    """Reschedules a failed email with backoff, or marks it as failed."""
+    email.last_error = error
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.Status.FAILED
+        report.failed += 1
+    else:
+        email.next_attempt_at = timezone.now() + \
+            get_retry_delay(email.attempts)
+        report.retried += 1
+
+
+def claim_batch(batch_size: int = 100) -> list:
+    """
+    Claims up to `batch_size` due emails in a short transaction, by
+    moving their next attempt past the claim timeout.
+
+    The rows are selected with `SELECT ... FOR UPDATE SKIP LOCKED` where
+    the database supports it, so several workers can drain the outbox
+    without claiming an email twice. No lock is held after the claim.
+    """
+    with transaction.atomic():
+        emails = OutgoingEmail.objects.filter(
+            status=OutgoingEmail.Status.PENDING,
+            next_attempt_at__lte=timezone.now(),
+        ).order_by('next_attempt_at')
+        if db_connection.features.has_select_for_update_skip_locked:
+            emails = emails.select_for_update(skip_locked=True)
+        batch = list(emails[:batch_size])
+        if batch:
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in batch]).update(
+                    next_attempt_at=timezone.now() + timedelta(
+                        seconds=CLAIM_TIMEOUT))
+    return batch
+
+
+def send_batch(connection, batch_size: int = 100,
+               max_attempts: int = MAX_ATTEMPTS) -> DeliveryReport:
+    """
+    Delivers up to `batch_size` due emails over an email connection,
+    which is opened only when an email is due.
+
+    The emails are claimed first, and sent and recorded one by one
+    outside of any transaction. A failed email is rescheduled with
+    exponential backoff and marked as failed after `max_attempts`. When
+    the connection cannot be opened, the batch is rescheduled without
+    counting an attempt, so an outage of the email server does not fail
+    the queue, and the report holds the error.
+    """
+    report = DeliveryReport()
+    batch = claim_batch(batch_size)
+    if not batch:
+        return report
+
+    try:
+        connection.open()
+    except Exception as exc:
+        report.connection_error = f'{type(exc).__name__}: {exc}'
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=timezone.now() + timedelta(
+                    seconds=RETRY_DELAY),
+                last_error=report.connection_error)
+        report.retried += len(batch)
+        return report
+
+    for email in batch:
+        message = EmailMessage(
+            email.subject, email.body, email.from_email or None,
+            email.to, connection=connection)
+        email.attempts += 1
+        try:
+            message.send()
+        except Exception as exc:
+            _record_failure(
+                email, f'{type(exc).__name__}: {exc}', max_attempts,
+                report)
+            _reopen(connection)
+        else:
+            email.status = OutgoingEmail.Status.SENT
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            report.sent += 1
+        email.save(update_fields=[
+            'status', 'attempts', 'next_attempt_at', 'last_error',
+            'sent_at'])
+    return report
+
+
+def send_queued_emails(batch_size: int = 100,
+                       max_attempts: int = MAX_ATTEMPTS) -> DeliveryReport:
+    """
+    Drains every due email from the outbox in batches, reusing a single
+    connection of the configured email backend. Stops at the first batch
+    for which the connection cannot be opened.
+    """
+    total = DeliveryReport()
+    connection = get_connection()
+    try:
+        while True:
+            report = send_batch(connection, batch_size, max_attempts)
+            total.sent += report.sent
+            total.retried += report.retried
+            total.failed += report.failed
+            if report.connection_error:
+                total.connection_error = report.connection_error
+                return total
+            if report.processed < batch_size:
+                return total
+    finally:
+        connection.close()
@@ -1,7 +1,30 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
 from django.test import TestCase
 from django.urls import reverse
 from http import HTTPStatus
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMessage, get_connection
+from django.core.management import call_command
+from django.utils import timezone
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+from .google_certs import (
+    DEFAULT_MAX_AGE, CertificatesUnavailable, GoogleCertificateStore,
+    get_max_age)
+from .models import OutgoingEmail
+from .outbox import MAX_ATTEMPTS, claim_batch, send_queued_emails
 
 
 class UserRegisterTestCase(TestCase):
@@ -88,3 +111,298 @@ class UserRegisterTestCase(TestCase):
 
     def tearDown(self):
         pass
+
+
+class EmailOutboxTestCase(TestCase):
+    def create_user(self, username='outbox_user'):
+        return get_user_model().objects.create_user(
+            username=username, email=f'{username}@example.com',
+            password='!b87654321')
+
+    def test_registration_queues_email_without_sending(self):
+        self.create_user()
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.to, ['outbox_user@example.com'])
+        self.assertEqual(email.status, OutgoingEmail.Status.PENDING)
+
+    def test_worker_sends_batches_over_one_connection(self):
+        for i in range(5):
+            self.create_user(f'user_{i}')
+        out = StringIO()
+        with mock.patch(
+                'users.outbox.get_connection',
+                wraps=get_connection) as connection_factory:
+            call_command('send_queued_emails', batch_size=2, stdout=out)
+        self.assertEqual(connection_factory.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertIn('Sent 5 emails', out.getvalue())
+        self.assertFalse(OutgoingEmail.objects.filter(
+            status=OutgoingEmail.Status.PENDING).exists())
+
+    def test_failed_email_is_retried_with_backoff(self):
+        self.create_user()
+        with mock.patch.object(
+                EmailMessage, 'send', side_effect=OSError('timed out')):
+            report = send_queued_emails()
+        self.assertEqual(report.retried, 1)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.status, OutgoingEmail.Status.PENDING)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('timed out', email.last_error)
+
+        # Not due yet.
+        self.assertEqual(send_queued_emails().processed, 0)
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        report = send_queued_emails()
+        self.assertEqual(report.sent, 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_unreachable_server_is_retried_with_backoff(self):
+        self.create_user()
+        out, err = StringIO(), StringIO()
+        with mock.patch(
+                'django.core.mail.backends.locmem.EmailBackend.open',
+                side_effect=ConnectionRefusedError('refused')):
+            call_command('send_queued_emails', stdout=out, stderr=err)
+        self.assertIn('Cannot connect to the email server', err.getvalue())
+        self.assertIn('1 scheduled for retry', out.getvalue())
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.Status.PENDING)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('refused', email.last_error)
+        self.assertEqual(len(mail.outbox), 0)
+
+        # An outage of the server does not use up the attempts.
+        with mock.patch(
+                'django.core.mail.backends.locmem.EmailBackend.open',
+                side_effect=ConnectionRefusedError('refused')):
+            for _ in range(MAX_ATTEMPTS + 1):
+                OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+                send_queued_emails(max_attempts=MAX_ATTEMPTS)
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 0)
+        self.assertEqual(email.status, OutgoingEmail.Status.PENDING)
+
+    def test_claimed_emails_are_hidden_from_other_workers(self):
+        self.create_user()
+        batch = claim_batch()
+        self.assertEqual(len(batch), 1)
+        self.assertGreater(
+            OutgoingEmail.objects.get().next_attempt_at, timezone.now())
+        self.assertEqual(claim_batch(), [])
+
+    def test_connection_is_not_opened_without_due_emails(self):
+        with mock.patch(
+                'django.core.mail.backends.locmem.EmailBackend.open'
+                ) as open_connection:
+            self.assertEqual(send_queued_emails().processed, 0)
+        open_connection.assert_not_called()
+
+    def test_email_fails_after_max_attempts(self):
+        self.create_user()
+        with mock.patch.object(
+                EmailMessage, 'send', side_effect=OSError('refused')):
+            report = send_queued_emails(max_attempts=1)
+        self.assertEqual(report.failed, 1)
+        self.assertEqual(
+            OutgoingEmail.objects.get().status, OutgoingEmail.Status.FAILED)
+
+    def test_file_backend(self):
+        self.create_user()
+        with TemporaryDirectory() as path, self.settings(
+                EMAIL_BACKEND='django.core.mail.backends.filebased.'
+                              'EmailBackend',
+                EMAIL_FILE_PATH=path):
+            send_queued_emails()
+            self.assertEqual(len(os.listdir(path)), 1)
+
+
+class FakeCertsResponse:
+    def __init__(self, certs, status=HTTPStatus.OK, max_age=3600):
+        self.status = status
+        self.headers = {'Cache-Control': f'public, max-age={max_age}'}
+        self.data = json.dumps(certs).encode()
+
+
+class FakeCertsTransport:
+    """Serves locally generated certificates instead of Google's."""
+
+    def __init__(self):
+        self.certs = {}
+        self.status = HTTPStatus.OK
+        self.max_age = 3600
+        self.calls = 0
+
+    def __call__(self, url, method='GET', **kwargs):
+        self.calls += 1
+        return FakeCertsResponse(self.certs, self.status, self.max_age)
+
+
+def make_key_pair(key_id: str):
+    """Returns a signer and its self-signed x509 certificate in PEM."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, key_id)])
+    now = datetime.now()
+    certificate = x509.CertificateBuilder().subject_name(name).issuer_name(
+        name).public_key(key.public_key()).serial_number(
+        x509.random_serial_number()).not_valid_before(
+        now - timedelta(days=1)).not_valid_after(
+        now + timedelta(days=1)).sign(key, hashes.SHA256())
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption())
+    return (
+        crypt.RSASigner.from_string(private_pem, key_id),
+        certificate.public_bytes(serialization.Encoding.PEM).decode())
+
+
+class GoogleCertificateStoreTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.signer, cls.certificate = make_key_pair('key-1')
+
+    def setUp(self):
+        self.now = 1_700_000_000
+        self.transport = FakeCertsTransport()
+        self.transport.certs = {'key-1': self.certificate}
+        self.store = GoogleCertificateStore(
+            request=self.transport, clock=lambda: self.now)
+
+    def freeze_time(self):
+        """Makes google-auth check `iat` and `exp` against `self.now`."""
+        return mock.patch(
+            'google.auth._helpers.utcnow', return_value=datetime.fromtimestamp(
+                self.now, dt_timezone.utc).replace(tzinfo=None))
+
+    def make_token(self, signer=None, **claims):
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': 'client-id',
+            'email': 'google_user@example.com', 'email_verified': True,
+            'name': 'Google User', 'iat': self.now - 10,
+            'exp': self.now + 600, **claims}
+        with self.freeze_time():
+            return jwt.encode(signer or self.signer, payload).decode()
+
+    def verify(self, token, audience='client-id'):
+        with self.freeze_time():
+            return self.store.verify_token(token, audience)
+
+    def test_certificates_are_fetched_once_while_fresh(self):
+        token = self.make_token()
+        for _ in range(3):
+            claims = self.verify(token)
+        self.assertEqual(claims['email'], 'google_user@example.com')
+        self.assertEqual(self.transport.calls, 1)
+
+        self.now += 3600
+        self.verify(self.make_token())
+        self.assertEqual(self.transport.calls, 2)
+
+    def test_certificates_are_refreshed_in_background_before_expiry(self):
+        self.verify(self.make_token())
+        self.now += 3600 - 60
+        self.verify(self.make_token())
+        self.store.refresh_thread.join()
+        self.assertEqual(self.transport.calls, 2)
+        self.assertEqual(self.store.expires_at, self.now + 3600)
+
+    def test_unknown_key_id_refetches_certificates(self):
+        self.verify(self.make_token())
+        signer, certificate = make_key_pair('key-2')
+        self.transport.certs['key-2'] = certificate
+        self.now += 60
+        self.verify(self.make_token(signer))
+        self.assertEqual(self.transport.calls, 2)
+
+    def test_unknown_key_id_is_rejected_when_google_is_down(self):
+        self.verify(self.make_token())
+        signer, _ = make_key_pair('forged-key')
+        self.transport.status = HTTPStatus.SERVICE_UNAVAILABLE
+        self.now += 60
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.verify(self.make_token(signer))
+        # Failed fetches are rate limited too.
+        self.assertEqual(self.transport.calls, 2)
+
+    def test_invalid_tokens_are_rejected(self):
+        other_signer, _ = make_key_pair('key-1')
+        for token, audience in (
+                (self.make_token(), 'other-client-id'),
+                (self.make_token(iss='https://example.com'), 'client-id'),
+                (self.make_token(exp=self.now - 600), 'client-id'),
+                (self.make_token(other_signer), 'client-id'),
+                ('not-a-token', 'client-id')):
+            with self.assertRaises(ValueError):
+                self.verify(token, audience)
+
+    def test_expired_certificates_are_used_when_google_is_down(self):
+        self.verify(self.make_token())
+        self.transport.status = HTTPStatus.SERVICE_UNAVAILABLE
+        self.now += 7200
+        self.assertEqual(
+            self.verify(self.make_token())['name'], 'Google User')
+        self.assertEqual(self.transport.calls, 2)
+
+        # Further requests do not wait for Google until the interval.
+        self.now += 10
+        self.verify(self.make_token())
+        self.assertEqual(self.transport.calls, 2)
+        self.now += 30
+        self.verify(self.make_token())
+        self.assertEqual(self.transport.calls, 3)
+
+    def test_concurrent_requests_fetch_once(self):
+        fetching, release = threading.Event(), threading.Event()
+        respond = self.transport.__call__
+
+        def slow_transport(url, method='GET', **kwargs):
+            fetching.set()
+            release.wait(5)
+            return respond(url, method)
+
+        self.store.request = slow_transport
+        threads = [
+            threading.Thread(target=self.store.get_certs) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        fetching.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.transport.calls, 1)
+
+    def test_no_certificates(self):
+        self.transport.status = HTTPStatus.SERVICE_UNAVAILABLE
+        with self.assertRaises(CertificatesUnavailable):
+            self.verify(self.make_token())
+
+    def test_max_age(self):
+        self.assertEqual(
+            get_max_age({'Cache-Control': 'public, max-age=100',
+                         'Age': '40'}), 60)
+        self.assertEqual(get_max_age({}), DEFAULT_MAX_AGE)
+        self.assertEqual(
+            get_max_age({'cache-control': 'no-store, max-age=100'}),
+            DEFAULT_MAX_AGE)
+
+    def test_google_sign_in(self):
+        url = reverse('users:login')
+        with mock.patch('users.views.google_certificates', self.store), \
+                mock.patch.dict(
+                    os.environ, {'GOOGLE_CLIENT_ID': 'client-id'}), \
+                self.freeze_time():
+            response = self.client.post(url, {'token': self.make_token()})
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertTrue(response.json()['success'])
+            self.assertTrue(get_user_model().objects.filter(
+                email='google_user@example.com').exists())
+
+            response = self.client.post(
+                url, {'token': self.make_token(aud='other-client-id')})
+            self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(self.transport.calls, 1)
@@ -11,10 +11,9 @@ from django.contrib.auth.views import LogoutView
 from django.views.generic import DetailView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView, PasswordChangeView
-from google.oauth2 import id_token
-from google.auth.transport import requests
 from django.http import JsonResponse
 
+from .google_certs import CertificatesUnavailable, google_certificates
 from .models import Profile
 
 from .forms import (
@@ -64,8 +63,8 @@ class UserLoginView(LoginView):
     def google_sign_in(self, request):
         token = request.POST['token']
         try:
-            idinfo = id_token.verify_oauth2_token(
-                token, requests.Request(), os.environ.get('GOOGLE_CLIENT_ID'))
+            idinfo = google_certificates.verify_token(
+                token, os.environ.get('GOOGLE_CLIENT_ID'))
 
             user_email = idinfo['email']
             email_verified = idinfo.get('email_verified', False)
@@ -99,6 +98,12 @@ class UserLoginView(LoginView):
         except ValueError:
             return JsonResponse(
                 {'success': False, 'message': 'Invalid token'}, status=400)
+        except CertificatesUnavailable:
+            logger.exception('Cannot verify Google sign-in')
+            return JsonResponse(
+                {'success': False,
+                 'message': 'Google sign-in is unavailable'},
+                status=503)
 
 
 class UserLogoutView(LogoutView):